@@ -0,0 +1,256 @@
+"""
+    Benchmark de cada etapa do source/carregar_dados.py sobre CSVs sintéticos do INPE
+    (benchmarks/gerador_inpe.py): leitura, filtragem, imputação, agregação, categorização,
+    engenharia de features e inserção no banco.
+
+    Cada etapa é executada separadamente e medida duas vezes: uma para o tempo (perf_counter) e
+    outra com tracemalloc para o pico de memória, porque o tracemalloc deixa o código mais lento.
+    Os resultados são gravados em data/benchmark/resultados/ (um JSON por execução e o historico.csv)
+    junto com o commit atual, e comparados com a última execução de outro commit.
+
+    Uso:
+        python -m benchmarks.bench_etapas --linhas 100000 1000000
+        python -m benchmarks.bench_etapas --linhas 10000000 --sem-memoria
+"""
+import argparse
+import csv
+import json
+import platform
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+from benchmarks.gerador_inpe import gravar_csv
+from source.core.settings import PROJECT_ROOT, Settings
+from source.carregar_dados import (
+    CAMPOS_COM_ERROS,
+    agregar_por_dia_municipio,
+    create_table,
+    criar_categorias_risco,
+    engenharia_features,
+    ler_csv,
+    preparar_dados,
+    separar_linhas_validas,
+)
+from source.imputacao import imputar_valores_invalidos
+from source.tabela_dados import gravar_dados
+from source.resources.perfil import perfil
+
+
+ETAPAS = [
+    'leitura',
+    'filtragem',
+    'imputacao',
+    'agregacao',
+    'categorizacao',
+    'features',
+    'insercao',
+]
+
+PASTA_DADOS = PROJECT_ROOT / 'data' / 'benchmark'
+PASTA_RESULTADOS = PASTA_DADOS / 'resultados'
+
+CAMPOS_HISTORICO = [
+    'data', 'commit', 'linhas', 'etapa', 'segundos',
+    'linhas_entrada', 'linhas_saida', 'linhas_por_s', 'pico_tracemalloc_mb', 'pico_rss_mb',
+]
+
+
+def _commit_atual() -> str:
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        alterado = subprocess.run(['git', 'diff', '--quiet', 'HEAD'], cwd=PROJECT_ROOT).returncode != 0
+    except (OSError, subprocess.CalledProcessError):
+        return 'desconhecido'
+
+    return f"{commit}-alterado" if alterado else commit
+
+
+def _executar_etapas(csv_path: Path, url_banco: str, settings: Settings):
+    """
+        Executa as etapas em sequência, cada uma dentro do seu próprio span do ´perfil´.
+        O resultado de uma etapa é a entrada da próxima, igual ao ´carregar_dados´.
+    """
+    with perfil.span('leitura') as span:
+        df = preparar_dados(ler_csv(csv_path=csv_path, settings=settings))
+        span.linhas_saida = len(df)
+
+    with perfil.span('filtragem', linhas_entrada=len(df)) as span:
+        df_validos, df_invalidos = separar_linhas_validas(df)
+        span.linhas_saida = len(df_validos) + len(df_invalidos)
+    del df
+
+    with perfil.span('imputacao', linhas_entrada=len(df_invalidos)) as span:
+        df_imputados = imputar_valores_invalidos(
+            df_invalidos=df_invalidos,
+            df_validos=df_validos,
+            campos_com_erros=CAMPOS_COM_ERROS,
+        )
+        df = pd.concat([df_validos, df_imputados], join='outer', ignore_index=True, sort=False)
+        span.linhas_saida = len(df)
+    del df_validos, df_invalidos, df_imputados
+
+    with perfil.span('agregacao', linhas_entrada=len(df)) as span:
+        df = agregar_por_dia_municipio(df=df)
+        span.linhas_saida = len(df)
+
+    with perfil.span('categorizacao', linhas_entrada=len(df)) as span:
+        df = criar_categorias_risco(df=df)
+        span.linhas_saida = len(df)
+
+    with perfil.span('features', linhas_entrada=len(df)) as span:
+        df = engenharia_features(df=df)
+        span.linhas_saida = len(df)
+
+    engine = create_engine(url_banco)
+    try:
+        create_table(engine)
+        with perfil.span('insercao', linhas_entrada=len(df)) as span, engine.begin() as conn:
+            span.linhas_saida = gravar_dados(conn, df)
+    finally:
+        engine.dispose()
+
+
+def medir(csv_path: Path, url_banco: str, repeticoes: int, memoria: bool) -> dict[str, dict]:
+    """
+        Mede cada etapa: o menor tempo de ´repeticoes´ execuções e, com ´memoria´, o pico do
+        tracemalloc de uma execução a mais.
+
+    Returns:
+        dict[str, dict]: Resultado de cada etapa (tempo, linhas, linhas/s e memória).
+    """
+    settings = Settings(CACHE_PARQUET=False, INGESTAO_STREAMING=False)
+    resultados = {}
+
+    for _ in range(repeticoes):
+        _limpar_banco(url_banco)
+        perfil.iniciar(ativo=True)
+        _executar_etapas(csv_path, url_banco, settings)
+
+        for span in perfil.exportar():
+            anterior = resultados.get(span['nome'])
+            if anterior is None or span['duracao_s'] < anterior['segundos']:
+                resultados[span['nome']] = {
+                    'segundos': span['duracao_s'],
+                    'linhas_entrada': span['linhas_entrada'],
+                    'linhas_saida': span['linhas_saida'],
+                    'linhas_por_s': span['linhas_por_s'],
+                    'pico_rss_mb': span['pico_rss_mb'],
+                    'pico_tracemalloc_mb': None,
+                }
+
+    if memoria:
+        _limpar_banco(url_banco)
+        perfil.iniciar(ativo=True, tracemalloc_ativo=True)
+        _executar_etapas(csv_path, url_banco, settings)
+
+        for span in perfil.exportar():
+            resultados[span['nome']]['pico_tracemalloc_mb'] = span['pico_tracemalloc_mb']
+
+    perfil.encerrar()
+
+    return {etapa: resultados[etapa] for etapa in ETAPAS}
+
+
+def _limpar_banco(url_banco: str):
+    engine = create_engine(url_banco)
+    try:
+        with engine.begin() as conn:
+            conn.exec_driver_sql('DROP TABLE IF EXISTS dados_csv')
+    finally:
+        engine.dispose()
+
+
+def _ultima_execucao_anterior(commit: str, pasta_resultados: Path) -> dict[tuple[int, str], float]:
+    """Tempo de cada (linhas, etapa) na última execução gravada de um commit diferente do atual."""
+    historico = pasta_resultados / 'historico.csv'
+    if not historico.exists():
+        return {}
+
+    anteriores = {}
+    with open(historico, newline='', encoding='utf-8') as arquivo:
+        for linha in csv.DictReader(arquivo):
+            if linha['commit'] != commit:
+                anteriores[(int(linha['linhas']), linha['etapa'])] = float(linha['segundos'])
+
+    return anteriores
+
+
+def salvar(resultados: dict[int, dict[str, dict]], commit: str, seed: int, pasta_resultados: Path) -> Path:
+    pasta_resultados.mkdir(parents=True, exist_ok=True)
+    data = datetime.now().strftime('%Y-%m-%dT%H:%M:%S')
+
+    relatorio = pasta_resultados / f"{data.replace(':', '')}_{commit}.json"
+    relatorio.write_text(json.dumps({
+        'data': data,
+        'commit': commit,
+        'seed': seed,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'maquina': platform.platform(),
+        'resultados': {str(linhas): etapas for linhas, etapas in resultados.items()},
+    }, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    historico = pasta_resultados / 'historico.csv'
+    novo = not historico.exists()
+
+    with open(historico, 'a', newline='', encoding='utf-8') as arquivo:
+        escritor = csv.DictWriter(arquivo, fieldnames=CAMPOS_HISTORICO)
+        if novo:
+            escritor.writeheader()
+        for linhas, etapas in resultados.items():
+            for etapa, valores in etapas.items():
+                escritor.writerow({'data': data, 'commit': commit, 'linhas': linhas, 'etapa': etapa, **valores})
+
+    return relatorio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, nargs='+', default=[100_000, 1_000_000], help="Tamanhos dos CSVs sintéticos.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeticoes", type=int, default=1, help="Execuções por tamanho (vale o menor tempo).")
+    parser.add_argument("--sem-memoria", action='store_true', help="Não executa a medição com tracemalloc.")
+    parser.add_argument("--pasta-dados", type=Path, default=PASTA_DADOS, help="Onde ficam os CSVs gerados.")
+    parser.add_argument("--pasta-resultados", type=Path, default=PASTA_RESULTADOS, help="Onde ficam os relatórios e o historico.csv.")
+    parser.add_argument("--banco", default=None, help="URL do banco da inserção (padrão: SQLite em --pasta-dados).")
+    args = parser.parse_args()
+
+    args.pasta_dados.mkdir(parents=True, exist_ok=True)
+    url_banco = args.banco or f"sqlite:///{args.pasta_dados / 'bench.db'}"
+    commit = _commit_atual()
+    anteriores = _ultima_execucao_anterior(commit, args.pasta_resultados)
+    resultados = {}
+
+    for linhas in args.linhas:
+        csv_path = args.pasta_dados / f"inpe_{linhas}_seed{args.seed}.csv"
+        if not csv_path.exists():
+            print(f"Gerando {csv_path.name}...")
+            gravar_csv(csv_path, linhas=linhas, seed=args.seed)
+
+        resultados[linhas] = medir(csv_path, url_banco, args.repeticoes, memoria=not args.sem_memoria)
+
+        print(f"\n{linhas:,} linhas ({commit})")
+        print(f"  {'etapa':<14}{'segundos':>10}{'linhas/s':>14}{'tracemalloc MB':>16}{'vs anterior':>13}")
+        for etapa, valores in resultados[linhas].items():
+            anterior = anteriores.get((linhas, etapa))
+            variacao = f"{(valores['segundos'] / anterior - 1) * 100:+.1f}%" if anterior else '-'
+            memoria = valores['pico_tracemalloc_mb']
+            print(
+                f"  {etapa:<14}{valores['segundos']:>10.3f}{valores['linhas_por_s'] or 0:>14,.0f}"
+                f"{memoria if memoria is not None else '-':>16}{variacao:>13}"
+            )
+
+    print(f"\nResultados gravados em {salvar(resultados, commit, args.seed, args.pasta_resultados)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+    Micro-benchmark da distância haversine: versão escalar (math, um par por vez)
+    contra a versão vetorizada de source/resources/haversine.py.
+
+    Uso:
+        python -m benchmarks.bench_haversine --pontos 100000
+"""
+import argparse
+import time
+from math import radians, cos, sin, asin, sqrt
+
+import numpy as np
+
+from source.resources.haversine import (
+    distancia_haversine,
+    distancia_um_para_muitos,
+    matriz_distancias,
+    matriz_dentro_do_raio,
+)
+
+
+def distancia_haversine_escalar(lat1, lon1, lat2, lon2):
+    # Implementação antiga do source/carregar_dados.py, usada somente como referência.
+    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 6371 * 2 * asin(sqrt(a))
+
+
+def _medir(func, repeticoes: int = 3) -> float:
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        func()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pontos", type=int, default=100_000, help="Quantidade de pares de pontos.")
+    parser.add_argument("--matriz", type=int, default=2_000, help="Lado da matriz no modo par a par.")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    # Coordenadas dentro da Amazônia Legal.
+    lat1, lat2 = rng.uniform(-18, 5, (2, args.pontos))
+    lon1, lon2 = rng.uniform(-74, -44, (2, args.pontos))
+
+    escalar = _medir(lambda: [
+        distancia_haversine_escalar(a, b, c, d)
+        for a, b, c, d in zip(lat1.tolist(), lon1.tolist(), lat2.tolist(), lon2.tolist())
+    ])
+    vetorizado = _medir(lambda: distancia_haversine(lat1, lon1, lat2, lon2))
+
+    esperado = np.array([
+        distancia_haversine_escalar(a, b, c, d)
+        for a, b, c, d in zip(lat1[:1000], lon1[:1000], lat2[:1000], lon2[:1000])
+    ])
+    np.testing.assert_allclose(distancia_haversine(lat1[:1000], lon1[:1000], lat2[:1000], lon2[:1000]), esperado)
+
+    um_para_muitos = _medir(lambda: distancia_um_para_muitos(lat1[0], lon1[0], lat2, lon2))
+
+    n = args.matriz
+    matriz = _medir(lambda: matriz_distancias(lat1[:n], lon1[:n], lat2[:n], lon2[:n]))
+    matriz_raio = _medir(lambda: matriz_dentro_do_raio(lat1[:n], lon1[:n], lat2[:n], lon2[:n], raio_km=5))
+
+    print(f"Pares: {args.pontos:,}")
+    print(f"  escalar (math)      : {escalar:10.4f} s")
+    print(f"  vetorizado (numpy)  : {vetorizado:10.4f} s  ({escalar / vetorizado:,.1f}x)")
+    print(f"  um para muitos      : {um_para_muitos:10.4f} s")
+    print(f"Matriz {n:,} x {n:,}:")
+    print(f"  distâncias          : {matriz:10.4f} s")
+    print(f"  dentro do raio      : {matriz_raio:10.4f} s")
+
+
+if __name__ == "__main__":
+    main()
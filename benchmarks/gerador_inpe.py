@@ -0,0 +1,214 @@
+"""
+    Gerador de CSVs sintéticos no formato do BDQueimadas (INPE), reprodutível pela seed.
+
+    Os focos são distribuídos em municípios reais do Bioma Amazônia (com peso maior para os
+    municípios que mais queimam), com a sazonalidade da estação seca (pico em agosto/setembro),
+    satélites do BDQueimadas, coordenadas em volta da sede de cada município e valores -999
+    nas colunas em que o INPE usa esse valor para dado ausente.
+
+    Uso:
+        python -m benchmarks.gerador_inpe --linhas 1000000 --saida data/benchmark/inpe_1000000.csv
+"""
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+# (Município, Estado, Latitude, Longitude) da sede, com o nome como vem no CSV do INPE.
+MUNICIPIOS = [
+    ('ALTAMIRA', 'PARÁ', -3.20, -52.21),
+    ('SÃO FÉLIX DO XINGU', 'PARÁ', -6.64, -51.99),
+    ('NOVO PROGRESSO', 'PARÁ', -7.14, -55.38),
+    ('ITAITUBA', 'PARÁ', -4.27, -55.98),
+    ('PACAJÁ', 'PARÁ', -3.84, -50.64),
+    ('NOVO REPARTIMENTO', 'PARÁ', -4.25, -49.95),
+    ('PORTEL', 'PARÁ', -1.94, -50.82),
+    ('JACAREACANGA', 'PARÁ', -6.22, -57.75),
+    ('MARABÁ', 'PARÁ', -5.37, -49.12),
+    ('PARAGOMINAS', 'PARÁ', -2.99, -47.35),
+    ('URUARÁ', 'PARÁ', -3.72, -53.74),
+    ('RURÓPOLIS', 'PARÁ', -4.10, -54.91),
+    ('PORTO VELHO', 'RONDÔNIA', -8.76, -63.90),
+    ('CANDEIAS DO JAMARI', 'RONDÔNIA', -8.79, -63.70),
+    ('NOVA MAMORÉ', 'RONDÔNIA', -10.41, -65.33),
+    ('BURITIS', 'RONDÔNIA', -10.21, -63.83),
+    ("MACHADINHO D'OESTE", 'RONDÔNIA', -9.44, -61.98),
+    ('LÁBREA', 'AMAZONAS', -7.26, -64.80),
+    ('APUÍ', 'AMAZONAS', -7.19, -59.89),
+    ('HUMAITÁ', 'AMAZONAS', -7.51, -63.02),
+    ('MANICORÉ', 'AMAZONAS', -5.81, -61.30),
+    ('BOCA DO ACRE', 'AMAZONAS', -8.75, -67.39),
+    ('NOVO ARIPUANÃ', 'AMAZONAS', -5.12, -60.38),
+    ('CANUTAMA', 'AMAZONAS', -6.53, -64.38),
+    ('COLNIZA', 'MATO GROSSO', -9.40, -59.03),
+    ('ARIPUANÃ', 'MATO GROSSO', -10.17, -59.46),
+    ('COTRIGUAÇU', 'MATO GROSSO', -9.86, -58.42),
+    ('JUARA', 'MATO GROSSO', -11.26, -57.52),
+    ('FELIZ NATAL', 'MATO GROSSO', -12.38, -54.92),
+    ('MARCELÂNDIA', 'MATO GROSSO', -11.05, -54.43),
+    ('PEIXOTO DE AZEVEDO', 'MATO GROSSO', -10.23, -54.98),
+    ('FEIJÓ', 'ACRE', -8.16, -70.35),
+    ('TARAUACÁ', 'ACRE', -8.16, -70.77),
+    ('SENA MADUREIRA', 'ACRE', -9.07, -68.66),
+    ('RIO BRANCO', 'ACRE', -9.97, -67.81),
+    ('CARACARAÍ', 'RORAIMA', -1.82, -61.13),
+    ('MUCAJAÍ', 'RORAIMA', -2.44, -60.91),
+    ('AMARANTE DO MARANHÃO', 'MARANHÃO', -5.57, -46.74),
+]
+
+# Satélites do BDQueimadas e a fração aproximada dos focos de cada um.
+SATELITES = {
+    'NPP-375': 0.22,
+    'NPP-375D': 0.18,
+    'NOAA-20': 0.18,
+    'NOAA-21': 0.10,
+    'GOES-16': 0.14,
+    'AQUA_M-T': 0.06,
+    'TERRA_M-T': 0.05,
+    'METOP-B': 0.04,
+    'METOP-C': 0.03,
+}
+
+# Fração de linhas com -999 em cada coluna.
+TAXAS_SENTINELA = {
+    'DiaSemChuva': 0.08,
+    'Precipitacao': 0.05,
+    'RiscoFogo': 0.10,
+    'FRP': 0.03,
+}
+
+# Fração de focos fora da região estudada (outro país ou outro bioma).
+TAXA_FORA_DO_PAIS = 0.02
+TAXA_FORA_DO_BIOMA = 0.08
+
+# Desvio (em graus) dos focos em volta da sede do município.
+DESVIO_COORDENADAS = 0.25
+
+# Linhas geradas e gravadas por vez. Faz parte da reprodutibilidade: cada bloco tem a sua própria seed.
+LINHAS_POR_BLOCO = 1_000_000
+
+COLUNAS = [
+    'DataHora', 'Satelite', 'Pais', 'Estado', 'Municipio', 'Bioma',
+    'DiaSemChuva', 'Precipitacao', 'RiscoFogo', 'FRP', 'Latitude', 'Longitude',
+]
+
+
+def _pesos_dias(dias: int, inicio: pd.Timestamp) -> np.ndarray:
+    # Estação seca: poucos focos no começo do ano e pico por volta do dia 245 (início de setembro).
+    dia_ano = (inicio + pd.to_timedelta(np.arange(dias), 'D')).dayofyear.to_numpy()
+    pesos = 0.05 + np.exp(-0.5 * ((dia_ano - 245) / 35) ** 2)
+    return pesos / pesos.sum()
+
+
+def _pesos_municipios(quantidade: int) -> np.ndarray:
+    # Poucos municípios concentram a maior parte dos focos (distribuição de Zipf).
+    pesos = 1 / np.arange(1, quantidade + 1)
+    return pesos / pesos.sum()
+
+
+def _instantes(linhas: int, seed: int, dias: int, inicio: pd.Timestamp) -> np.ndarray:
+    """Segundos desde ´inicio´ de cada foco, já em ordem (o CSV do INPE vem ordenado por DataHora)."""
+    rng = np.random.default_rng([seed, 0])
+    contagem = rng.multinomial(linhas, _pesos_dias(dias, inicio))
+    dia = np.repeat(np.arange(dias, dtype=np.int64), contagem)
+    instantes = dia * 86_400 + rng.integers(0, 86_400, linhas)
+    instantes.sort()
+    return instantes
+
+
+def _gerar_bloco(instantes: np.ndarray, rng: np.random.Generator, inicio: pd.Timestamp) -> pd.DataFrame:
+    linhas = len(instantes)
+
+    indice = rng.choice(len(MUNICIPIOS), size=linhas, p=_pesos_municipios(len(MUNICIPIOS)))
+    municipio, estado, latitude, longitude = (np.array(coluna, dtype=object) for coluna in zip(*MUNICIPIOS))
+
+    data_hora = inicio + pd.to_timedelta(instantes, 's')
+    dia_ano = data_hora.dayofyear.to_numpy()
+    seca = np.exp(-0.5 * ((dia_ano - 245) / 45) ** 2)
+
+    df = pd.DataFrame({
+        'DataHora': data_hora.strftime('%Y/%m/%d %H:%M:%S'),
+        'Satelite': rng.choice(list(SATELITES), size=linhas, p=list(SATELITES.values())),
+        'Pais': 'Brasil',
+        'Estado': estado[indice],
+        'Municipio': municipio[indice],
+        'Bioma': 'Amazônia',
+        # Na seca os dias sem chuva e o risco de fogo sobem e a precipitação cai.
+        'DiaSemChuva': np.minimum(rng.poisson(2 + 60 * seca), 120).astype(np.int64),
+        'Precipitacao': np.round(rng.gamma(0.6, 12 * (1.05 - seca)), 1),
+        'RiscoFogo': np.round(np.clip(rng.beta(2, 2, linhas) * 0.5 + 0.5 * seca, 0, 1), 2),
+        'FRP': np.round(rng.lognormal(3.0, 1.2, linhas), 1),
+        'Latitude': np.round(latitude[indice].astype(float) + rng.normal(0, DESVIO_COORDENADAS, linhas), 5),
+        'Longitude': np.round(longitude[indice].astype(float) + rng.normal(0, DESVIO_COORDENADAS, linhas), 5),
+    })
+
+    fora_do_pais = rng.random(linhas) < TAXA_FORA_DO_PAIS
+    df.loc[fora_do_pais, ['Pais', 'Estado', 'Municipio']] = ['Bolívia', 'BENI', 'RIBERALTA']
+
+    df.loc[rng.random(linhas) < TAXA_FORA_DO_BIOMA, 'Bioma'] = 'Cerrado'
+
+    for coluna, taxa in TAXAS_SENTINELA.items():
+        df.loc[rng.random(linhas) < taxa, coluna] = -999
+
+    return df[COLUNAS]
+
+
+def gerar_blocos(linhas: int, seed: int = 42, dias: int = 365, inicio: str = '2024-01-01'):
+    """
+        Gera o conjunto sintético em blocos de ´LINHAS_POR_BLOCO´ linhas, em ordem de ´DataHora´.
+        A mesma combinação de (linhas, seed, dias, inicio) sempre gera exatamente os mesmos dados.
+
+    Args:
+        linhas (int): Quantidade total de focos.
+        seed (int): Seed do gerador.
+        dias (int): Quantidade de dias cobertos a partir de ´inicio´.
+        inicio (str): Primeiro dia dos dados.
+
+    Yields:
+        pd.DataFrame: Blocos com as colunas do CSV do INPE.
+    """
+    inicio = pd.Timestamp(inicio)
+    instantes = _instantes(linhas, seed, dias, inicio)
+
+    for numero, posicao in enumerate(range(0, linhas, LINHAS_POR_BLOCO)):
+        rng = np.random.default_rng([seed, numero + 1])
+        yield _gerar_bloco(instantes[posicao:posicao + LINHAS_POR_BLOCO], rng, inicio)
+
+
+def gerar_inpe(linhas: int, seed: int = 42, dias: int = 365, inicio: str = '2024-01-01') -> pd.DataFrame:
+    """Mesmo resultado de ´gerar_blocos´, em um único DataFreme."""
+    return pd.concat(gerar_blocos(linhas, seed, dias, inicio), ignore_index=True)
+
+
+def gravar_csv(caminho: Path, linhas: int, seed: int = 42, dias: int = 365, inicio: str = '2024-01-01') -> Path:
+    """
+        Grava o conjunto sintético em ´caminho´, bloco a bloco (10M de linhas não ficam inteiras em memória).
+    """
+    caminho = Path(caminho)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+
+    temporario = caminho.with_suffix('.tmp')
+    for numero, bloco in enumerate(gerar_blocos(linhas, seed, dias, inicio)):
+        bloco.to_csv(temporario, mode='w' if numero == 0 else 'a', header=numero == 0, index=False)
+    temporario.replace(caminho)
+
+    return caminho
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=100_000, help="Quantidade de focos.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--dias", type=int, default=365, help="Dias cobertos pelos dados.")
+    parser.add_argument("--inicio", default="2024-01-01", help="Primeiro dia dos dados.")
+    parser.add_argument("--saida", type=Path, required=True, help="Caminho do CSV gerado.")
+    args = parser.parse_args()
+
+    caminho = gravar_csv(args.saida, args.linhas, args.seed, args.dias, args.inicio)
+    print(f"{args.linhas:,} linhas gravadas em {caminho}")
+
+
+if __name__ == "__main__":
+    main()
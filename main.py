@@ -4,30 +4,26 @@ from sqlalchemy import select, text
 from sqlalchemy.orm import Session
 from source.core.settings import settings
 from source.core.database import Base, get_sync_engine, get_db
+from source.core.bulk_insert import bulk_insert
 from source.resources.logging import get_logger
-from source.resources.tools import _time_run
+from source.resources.perfil import perfilado
 import sqlite3
 
 logging = get_logger()
 
-@_time_run
-def insert_fast(engine, csv_path: Path):
-    conn = engine.raw_connection()
-    cur = conn.cursor()
+# Focos brutos, exatamente como no CSV. A dados_csv é a tabela de features do source/carregar_dados.py.
+TABELA_FOCOS = "focos_brutos"
 
-    for chunk in pd.read_csv(csv_path, chunksize=5000):
-        values = chunk.values.tolist()
-        cur.executemany(
-            "INSERT INTO dados_csv VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-            values
-        )
-    conn.commit()
+@perfilado
+def insert_fast(engine, csv_path: Path):
+    for chunk in pd.read_csv(csv_path, chunksize=100_000):
+        bulk_insert(engine, chunk, table_name=TABELA_FOCOS)
 
-@_time_run
+@perfilado
 def create_table(engine):
     with engine.begin() as conn:
-        conn.execute(text("""
-        CREATE TABLE IF NOT EXISTS dados_csv (
+        conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {TABELA_FOCOS} (
             DataHora TEXT,
             Satelite TEXT,
             Pais TEXT,
@@ -59,7 +55,7 @@ for csv_path in files:
     logging.info(f"{csv_path.name} finalizado.")
 
 
-df_banco = pd.read_sql("SELECT * FROM dados_csv", engine)
+df_banco = pd.read_sql(f"SELECT * FROM {TABELA_FOCOS}", engine)
     
 print(df_banco.head())
 print(df_banco.shape)
\ No newline at end of file
@@ -0,0 +1,322 @@
+"""
+    Armazém local das features da ´dados_csv´ em arrays NumPy (´.npy´), um arquivo por coluna.
+
+    As linhas ficam ordenadas por município e data, então as linhas de um município são um intervalo
+    contínuo dos arrays: ´inicio_municipio´ guarda onde cada município começa e as datas do intervalo
+    são buscadas por busca binária (´np.searchsorted´). Os arquivos são abertos com ´mmap_mode='r'´:
+    só as páginas usadas são lidas do disco e processos diferentes (treino, pontuação, notebooks)
+    compartilham as mesmas páginas do cache do sistema operacional, sem cópia.
+
+    Estrutura da pasta:
+        meta.json              colunas, número de linhas, municípios (o índice é o código) e período
+        codigo.npy             código do município de cada linha (int32)
+        Data.npy               data de cada linha (datetime64[D])
+        inicio_municipio.npy   primeira linha de cada município, mais o total de linhas no final (int64)
+        <feature>.npy          features em float32 (nulos como NaN)
+        Categoria_Risco.npy    código da categoria (int8, -1 quando nulo)
+
+    Uso:
+        python -m source.armazem_features
+"""
+import json
+import os
+import shutil
+from datetime import date, datetime
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Engine, text
+
+from source.core.database import get_sync_engine
+from source.core.settings import Settings
+from source.leitura_treino import COLUNA_TARGET, COLUNAS_FEATURES, LINHAS_POR_LOTE, LoteTreino
+from source.resources.logging import get_logger
+from source.tabela_dados import TABELA_DADOS, consulta_dados
+
+
+logger = get_logger()
+
+ARQUIVO_META = "meta.json"
+
+# Valor gravado no ´Categoria_Risco.npy´ para linhas sem categoria.
+TARGET_AUSENTE = -1
+
+DataLimite = date | str | pd.Timestamp | None
+
+
+def _dia(data: DataLimite) -> np.datetime64 | None:
+    return None if data is None else np.datetime64(pd.Timestamp(data).date(), 'D')
+
+
+def construir_armazem(
+    engine: Engine,
+    pasta: Path,
+    linhas_por_lote: int = LINHAS_POR_LOTE,
+) -> int:
+    """
+        Grava o armazém a partir da ´dados_csv´, lida em lotes na ordem da chave (município e data),
+        direto nos arrays mapeados em memória. Os arquivos são gravados em uma pasta temporária que
+        substitui a anterior no final: quem estiver com o armazém antigo aberto continua lendo os
+        arquivos antigos, e nenhum processo vê um armazém pela metade.
+
+    Args:
+        engine (Engine): Engine do banco de dados.
+        pasta (Path): Pasta do armazém.
+        linhas_por_lote (int): Linhas lidas do banco por vez.
+
+    Returns:
+        int: Número de linhas gravadas.
+    """
+    pasta = Path(pasta)
+    temporaria = pasta.with_name(f"{pasta.name}.{os.getpid()}.tmp")
+    shutil.rmtree(temporaria, ignore_errors=True)
+    temporaria.mkdir(parents=True)
+
+    colunas = ['Municipio', 'Ano', 'DiaAno', *[c for c in COLUNAS_FEATURES if c not in ('Ano', 'DiaAno')], COLUNA_TARGET]
+    features = list(COLUNAS_FEATURES)
+
+    with engine.connect() as conn:
+        total = conn.execute(text(f"SELECT COUNT(*) FROM {TABELA_DADOS}")).scalar_one()
+
+        arrays = {
+            'codigo': np.lib.format.open_memmap(temporaria / "codigo.npy", mode='w+', dtype=np.int32, shape=(total,)),
+            'Data': np.lib.format.open_memmap(temporaria / "Data.npy", mode='w+', dtype='datetime64[D]', shape=(total,)),
+            COLUNA_TARGET: np.lib.format.open_memmap(temporaria / f"{COLUNA_TARGET}.npy", mode='w+', dtype=np.int8, shape=(total,)),
+            **{
+                coluna: np.lib.format.open_memmap(temporaria / f"{coluna}.npy", mode='w+', dtype=np.float32, shape=(total,))
+                for coluna in features
+            },
+        }
+
+        resultado = conn.execution_options(
+            stream_results=True,
+            max_row_buffer=linhas_por_lote,
+        ).execute(consulta_dados(colunas=colunas, por_municipio=True))
+
+        # O código de cada município é a ordem em que ele aparece na leitura, que já é a ordem da
+        # chave: os códigos ficam crescentes sem depender da collation do banco.
+        codigos: dict[str, int] = {}
+        linha = 0
+
+        for linhas in resultado.partitions(linhas_por_lote):
+            lote = pd.DataFrame(linhas, columns=colunas)
+            fim = linha + len(lote)
+
+            if fim > total:
+                raise RuntimeError(f"A {TABELA_DADOS} mudou durante a gravação do armazém.")
+
+            for municipio in lote['Municipio'].unique():
+                codigos.setdefault(municipio, len(codigos))
+
+            arrays['codigo'][linha:fim] = lote['Municipio'].map(codigos).to_numpy(np.int32)
+            arrays['Data'][linha:fim] = pd.to_datetime(
+                lote['Ano'].astype(np.int64) * 1000 + lote['DiaAno'].astype(np.int64), format='%Y%j',
+            ).to_numpy('datetime64[D]')
+            arrays[COLUNA_TARGET][linha:fim] = lote[COLUNA_TARGET].fillna(TARGET_AUSENTE).to_numpy(np.int8)
+
+            for coluna in features:
+                arrays[coluna][linha:fim] = pd.to_numeric(lote[coluna]).to_numpy(np.float32, na_value=np.nan)
+
+            linha = fim
+
+    if linha != total:
+        raise RuntimeError(f"A {TABELA_DADOS} mudou durante a gravação do armazém.")
+
+    inicio_municipio = np.searchsorted(arrays['codigo'], np.arange(len(codigos) + 1)).astype(np.int64)
+    np.save(temporaria / "inicio_municipio.npy", inicio_municipio)
+
+    for array in arrays.values():
+        array.flush()
+
+    datas = arrays['Data']
+    meta = {
+        'linhas': int(total),
+        'colunas': features,
+        'municipios': list(codigos),
+        'inicio': str(datas.min()) if total else None,
+        'fim': str(datas.max()) if total else None,
+        'criado_em': datetime.now().isoformat(timespec='seconds'),
+    }
+    (temporaria / ARQUIVO_META).write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding='utf-8')
+    del arrays, datas
+
+    antiga = pasta.with_name(f"{pasta.name}.{os.getpid()}.old")
+    if pasta.exists():
+        os.replace(pasta, antiga)
+    os.replace(temporaria, pasta)
+    shutil.rmtree(antiga, ignore_errors=True)
+
+    logger.info(f"Armazém de features gravado em {pasta}: {total} linhas, {len(codigos)} municípios.")
+
+    return int(total)
+
+
+class ArmazemFeatures:
+    """
+        Leitura do armazém gravado pelo ´construir_armazem´. Os arrays são abertos uma vez, sob demanda,
+        como ´np.memmap´ somente leitura.
+
+        ´fatia´ devolve views dos arrays (sem cópia) de um município. ´ler´ monta um DataFrame de
+        vários municípios e guarda os últimos ´tamanho_cache´ resultados (LRU): o mesmo DataFrame é
+        devolvido a cada chamada repetida, então ele não deve ser alterado (use ´.copy()´ para isso).
+    """
+
+    def __init__(self, pasta: Path, tamanho_cache: int = 64):
+        self.pasta = Path(pasta)
+        self.meta = json.loads((self.pasta / ARQUIVO_META).read_text(encoding='utf-8'))
+        self.municipios: list[str] = self.meta['municipios']
+        self.colunas: list[str] = self.meta['colunas']
+
+        self._codigos = {municipio: codigo for codigo, municipio in enumerate(self.municipios)}
+        self._arrays: dict[str, np.ndarray] = {}
+        self._inicio_municipio = self._array("inicio_municipio")
+        self._ler = lru_cache(maxsize=tamanho_cache)(self._ler_sem_cache)
+
+    def __len__(self) -> int:
+        return self.meta['linhas']
+
+    def _array(self, nome: str) -> np.ndarray:
+        if nome not in self._arrays:
+            self._arrays[nome] = np.load(self.pasta / f"{nome}.npy", mmap_mode='r')
+        return self._arrays[nome]
+
+    def _validar_colunas(self, colunas) -> list[str]:
+        colunas = [*self.colunas, COLUNA_TARGET] if colunas is None else list(colunas)
+
+        desconhecidas = [coluna for coluna in colunas if coluna not in self.colunas and coluna != COLUNA_TARGET]
+        if desconhecidas:
+            raise ValueError(f"Colunas que não estão no armazém: {desconhecidas}")
+
+        return colunas
+
+    def intervalo(self, municipio: str, inicio: DataLimite = None, fim: DataLimite = None) -> slice:
+        """
+            Linhas de um município entre ´inicio´ e ´fim´ (com as duas datas incluídas), por busca
+            binária nas datas do município.
+        """
+        if municipio not in self._codigos:
+            raise KeyError(f"Município fora do armazém: {municipio}")
+
+        codigo = self._codigos[municipio]
+        primeira, ultima = int(self._inicio_municipio[codigo]), int(self._inicio_municipio[codigo + 1])
+        datas = self._array('Data')[primeira:ultima]
+
+        depois = 0 if inicio is None else int(np.searchsorted(datas, _dia(inicio), side='left'))
+        ate = len(datas) if fim is None else int(np.searchsorted(datas, _dia(fim), side='right'))
+
+        return slice(primeira + depois, primeira + max(depois, ate))
+
+    def fatia(
+        self,
+        municipio: str,
+        inicio: DataLimite = None,
+        fim: DataLimite = None,
+        colunas: list[str] | None = None,
+    ) -> dict[str, np.ndarray]:
+        """
+            Arrays de um município no período, como views somente leitura dos arquivos (sem cópia).
+
+        Returns:
+            dict[str, np.ndarray]: ´Data´ e cada coluna pedida.
+        """
+        colunas = self._validar_colunas(colunas)
+        linhas = self.intervalo(municipio, inicio, fim)
+
+        return {coluna: self._array(coluna)[linhas] for coluna in ['Data', *colunas]}
+
+    def ler(
+        self,
+        municipios: list[str] | None = None,
+        inicio: DataLimite = None,
+        fim: DataLimite = None,
+        colunas: list[str] | None = None,
+    ) -> pd.DataFrame:
+        """
+            DataFrame dos municípios no período, ordenado por município e data, com ´Municipio´
+            categórico. Resultados repetidos vêm do cache (ver a descrição da classe).
+
+        Args:
+            municipios (list[str] | None): Municípios, None para todos.
+            inicio: Primeira data, None para não limitar.
+            fim: Última data, None para não limitar.
+            colunas (list[str] | None): Colunas, None para todas as features e a ´Categoria_Risco´.
+
+        Returns:
+            pd.DataFrame: Colunas ´Municipio´, ´Data´ e as pedidas.
+        """
+        return self._ler(
+            None if municipios is None else tuple(municipios),
+            _dia(inicio),
+            _dia(fim),
+            tuple(self._validar_colunas(colunas)),
+        )
+
+    def info_cache(self):
+        return self._ler.cache_info()
+
+    def _linhas(self, municipios, inicio, fim) -> slice | np.ndarray:
+        if municipios is None:
+            if inicio is None and fim is None:
+                return slice(0, len(self))
+
+            datas = self._array('Data')
+            selecionadas = np.ones(len(self), dtype=bool)
+            if inicio is not None:
+                selecionadas &= datas >= inicio
+            if fim is not None:
+                selecionadas &= datas <= fim
+            return np.flatnonzero(selecionadas)
+
+        intervalos = [self.intervalo(municipio, inicio, fim) for municipio in municipios]
+        if len(intervalos) == 1:
+            return intervalos[0]
+
+        return np.concatenate([np.arange(linhas.start, linhas.stop) for linhas in intervalos])
+
+    def _ler_sem_cache(self, municipios, inicio, fim, colunas) -> pd.DataFrame:
+        linhas = self._linhas(municipios, inicio, fim)
+        codigos = self._array('codigo')[linhas]
+
+        df = pd.DataFrame({
+            'Municipio': pd.Categorical.from_codes(codigos, categories=self.municipios),
+            'Data': self._array('Data')[linhas].astype('datetime64[ns]'),
+            **{coluna: self._array(coluna)[linhas] for coluna in colunas},
+        })
+
+        if COLUNA_TARGET in df.columns:
+            df[COLUNA_TARGET] = df[COLUNA_TARGET].astype('Int8').replace(TARGET_AUSENTE, pd.NA)
+
+        return df
+
+    def lote_treino(
+        self,
+        inicio: DataLimite = None,
+        fim: DataLimite = None,
+        colunas: list[str] | None = None,
+    ) -> LoteTreino:
+        """
+            ´LoteTreino´ com as linhas do período (todos os municípios), no mesmo formato dos lotes do
+            ´ler_lotes_treino´. Linhas sem ´Categoria_Risco´ ficam de fora.
+        """
+        colunas = [coluna for coluna in self._validar_colunas(colunas) if coluna != COLUNA_TARGET]
+        linhas = self._linhas(None, _dia(inicio), _dia(fim))
+
+        y = self._array(COLUNA_TARGET)[linhas]
+        com_target = y != TARGET_AUSENTE
+
+        X = np.empty((int(com_target.sum()), len(colunas)), dtype=np.float32)
+        for indice, coluna in enumerate(colunas):
+            X[:, indice] = self._array(coluna)[linhas][com_target]
+
+        return LoteTreino(X=X, y=np.ascontiguousarray(y[com_target]), colunas=tuple(colunas))
+
+
+def main():
+    settings = Settings()
+    construir_armazem(get_sync_engine(), Path(settings.PATH_ARMAZEM_FEATURES), settings.TREINO_LINHAS_POR_LOTE)
+
+
+if __name__ == "__main__":
+    main()
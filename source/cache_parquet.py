@@ -0,0 +1,147 @@
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from source.resources.logging import get_logger
+
+
+logger = get_logger()
+
+# Colunas do CSV da INPE que são usadas pelo pipeline (projeção na leitura do cache).
+COLUNAS_UTILIZADAS = [
+    'DataHora',
+    'Satelite',
+    'Pais',
+    'Estado',
+    'Municipio',
+    'Bioma',
+    'DiaSemChuva',
+    'Precipitacao',
+    'RiscoFogo',
+    'FRP',
+    'Latitude',
+    'Longitude',
+]
+
+# Colunas de texto com poucos valores distintos, guardadas como categóricas.
+COLUNAS_CATEGORICAS = ['Pais', 'Estado', 'Municipio', 'Bioma', 'Satelite']
+
+# Filtro da região estudada, aplicado direto na leitura do Parquet (predicate pushdown).
+FILTRO_REGIAO = [('Pais', '==', 'Brasil'), ('Bioma', '==', 'Amazônia')]
+
+# Metadados gravados no Parquet para saber de qual versão do CSV o cache foi gerado.
+_META_TAMANHO = b'fonte_tamanho'
+_META_MTIME = b'fonte_mtime_ns'
+
+
+def caminho_cache(csv_path: Path, pasta_cache: Path) -> Path:
+    return Path(pasta_cache) / f"{Path(csv_path).stem}.parquet"
+
+
+def ler_csv_tipado(csv_path: Path) -> pd.DataFrame:
+    """
+        Lê o CSV da INPE já com os tipos finais: ´DataHora´ como datetime, colunas de texto repetitivas
+        como categóricas, coordenadas numéricas e inteiros no menor tipo (mínimo int32).
+        As colunas float continuam em float64 para que nenhum valor mude em relação ao CSV.
+
+    Args:
+        csv_path (Path): Caminho do CSV.
+
+    Returns:
+        pd.DataFrame: DataFreme tipado.
+    """
+    df = pd.read_csv(
+        csv_path,
+        sep=",",
+        usecols=lambda coluna: coluna in COLUNAS_UTILIZADAS,
+        dtype={coluna: 'category' for coluna in COLUNAS_CATEGORICAS},
+    )
+
+    df['DataHora'] = pd.to_datetime(df['DataHora'])
+    df['Latitude'] = pd.to_numeric(df['Latitude'], errors='coerce')
+    df['Longitude'] = pd.to_numeric(df['Longitude'], errors='coerce')
+
+    for coluna in df.select_dtypes(include='integer').columns:
+        # int32 é o menor tipo usado: as features elevam alguns inteiros ao quadrado.
+        menor = pd.to_numeric(df[coluna], downcast='integer')
+        if menor.dtype.itemsize < 4:
+            menor = menor.astype('int32')
+        df[coluna] = menor
+
+    return df
+
+
+def _cache_valido(arquivo_cache: Path, stat: os.stat_result) -> bool:
+    if not arquivo_cache.exists():
+        return False
+
+    metadados = pq.read_schema(arquivo_cache).metadata or {}
+
+    return (
+        metadados.get(_META_TAMANHO) == str(stat.st_size).encode() and
+        metadados.get(_META_MTIME) == str(stat.st_mtime_ns).encode()
+    )
+
+
+def _gravar_cache(df: pd.DataFrame, arquivo_cache: Path, stat: os.stat_result):
+    arquivo_cache.parent.mkdir(parents=True, exist_ok=True)
+
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    tabela = tabela.replace_schema_metadata({
+        **(tabela.schema.metadata or {}),
+        _META_TAMANHO: str(stat.st_size).encode(),
+        _META_MTIME: str(stat.st_mtime_ns).encode(),
+    })
+
+    # Grava em um arquivo temporário e renomeia, assim outro processo nunca lê um cache pela metade.
+    temporario = arquivo_cache.with_suffix(f".{os.getpid()}.tmp")
+    pq.write_table(tabela, temporario)
+    os.replace(temporario, arquivo_cache)
+
+
+def ler_csv_com_cache(
+    csv_path: Path,
+    pasta_cache: Path,
+    colunas: list[str] | None = None,
+    filtros: list[tuple] | None = FILTRO_REGIAO,
+) -> pd.DataFrame:
+    """
+        Lê o CSV a partir do cache em Parquet. Se o cache não existir, ou se o CSV mudou
+        (tamanho ou data de modificação diferentes dos gravados no cache), o CSV é lido
+        com ´ler_csv_tipado´ e o cache é gravado novamente.
+
+    Args:
+        csv_path (Path): Caminho do CSV.
+        pasta_cache (Path): Pasta onde ficam os arquivos Parquet.
+        colunas (list[str] | None): Colunas lidas do cache (todas quando None).
+        filtros (list[tuple] | None): Filtros no formato do pyarrow, aplicados na leitura.
+
+    Returns:
+        pd.DataFrame: DataFreme tipado, somente com as colunas e linhas pedidas.
+    """
+    csv_path = Path(csv_path)
+    arquivo_cache = caminho_cache(csv_path, pasta_cache)
+    stat = csv_path.stat()
+
+    if _cache_valido(arquivo_cache, stat):
+        logger.info(f"Lendo {csv_path.name} do cache {arquivo_cache.name}")
+        return pd.read_parquet(arquivo_cache, columns=colunas, filters=filtros)
+
+    logger.info(f"Cache de {csv_path.name} inexistente ou desatualizado, lendo o CSV...")
+
+    df = ler_csv_tipado(csv_path)
+    _gravar_cache(df, arquivo_cache, stat)
+
+    # Mesmo resultado da leitura pelo cache: aplica os filtros e a projeção em memória.
+    for coluna, operador, valor in filtros or []:
+        if operador != '==':
+            raise ValueError(f"Operador não suportado no filtro em memória: {operador}")
+        df = df.loc[df[coluna] == valor]
+
+    if colunas is not None:
+        df = df[colunas]
+
+    return df.reset_index(drop=True)
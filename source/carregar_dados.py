@@ -1,261 +1,646 @@
+import asyncio
 import numpy as np
 from pathlib import Path
-from math import radians, cos, sin, asin, sqrt
+from typing import Iterable
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
 
 import pandas as pd
-from sqlalchemy import text
+from sqlalchemy import Engine, text
 
 from source.core.settings import Settings
-from source.resources.tools import _time_run
+from source.resources.perfil import perfil, perfilado
 from source.resources.logging import get_logger
 from source.core.database import get_sync_engine
+from source.registro_features import FEATURES_PADRAO, calcular_features
+from source.cubo_diario import CuboDiario
+from source.imputacao import imputar_valores_invalidos
+from source.deduplicacao import COLUNAS_PROCEDENCIA, deduplicar_focos
+from source.manifesto import (
+    ArquivoCSV,
+    arquivos_pendentes,
+    create_table_manifesto,
+    marcar_erro,
+    substituir_dados_arquivo,
+    todos_arquivos,
+)
+from source.tabela_dados import TABELA_GRADE, create_table_dados, gravar_dados
+from source.grade import (
+    celulas,
+    create_table_celulas,
+    municipio_predominante,
+    substituir_dados_grade,
+    tabela_celula_municipio,
+)
+from source.estado_features import (
+    COLUNAS_ESTADO,
+    REGISTROS_POR_MUNICIPIO,
+    atualizar_estado,
+    atualizar_historico,
+    calcular_limites_geograficos,
+    carregar_estado,
+    create_table_estado,
+    validar_continuacao,
+)
+from source.cache_parquet import COLUNAS_UTILIZADAS, ler_csv_com_cache
+from source.leitura_em_blocos import agrupar_blocos_por_data, estimar_linhas_por_bloco
+from source.memoria_enxuta import (
+    COLUNAS_FLOAT64_LEITURA,
+    copy_on_write,
+    copia_defensiva,
+    ler_csv_enxuto,
+    memoria_mb,
+    reduzir_tipos,
+)
 
 
 logger = get_logger()
 
 
-@_time_run
+@perfilado
 def create_table(engine):
+    # Esquema da ´dados_csv´ (chave, índices e partições) fica em source/tabela_dados.py.
+    create_table_dados(engine)
+
+
+def gravar_categorias_risco(engine):
+    """
+        Grava a tabela de consulta ´categorias_risco´ (código, nome e intervalo de FRP), usada para
+        traduzir os códigos da coluna ´Categoria_Risco´ da ´dados_csv´.
+    """
     with engine.begin() as conn:
         conn.execute(text("""
-        CREATE TABLE IF NOT EXISTS dados_csv (
-            Ano INTEGER,
-            Mes INTEGER,
-            Dia INTEGER,
-            DiaAno INTEGER,
-            Mes_cos FLOAT,
-            Mes_sin FLOAT,
-            Municipio TEXT,
-            RiscoFogo FLOAT,
-            DiaAno_sin FLOAT,
-            DiaAno_cos FLOAT,
-            DiaSemChuva INTEGER,
-            Precipitacao FLOAT,
-            Latitude_norm FLOAT,
-            Longitude_norm FLOAT,
-            RiscoFogo_max_14 FLOAT,
-            RiscoFogo_squared FLOAT,
-            Precipitacao_min_7 FLOAT,
-            DiaSemChuva_squared FLOAT,
-            RiscoFogo_x_DiaSemChuva FLOAT,
-            RiscoFogo_media_movel_7 FLOAT,
-            Precipitacao_acumulada_7 FLOAT,
-            Precipitacao_acumulada_30 FLOAT,
-            DiaSemChuva_media_movel_14 FLOAT,
-            Precipitacao_media_movel_7 FLOAT
+        CREATE TABLE IF NOT EXISTS categorias_risco (
+            Codigo SMALLINT,
+            Categoria TEXT,
+            FRP_min FLOAT,
+            FRP_max FLOAT
+        )
+    """))
+        conn.execute(text("DELETE FROM categorias_risco"))
+        conn.execute(
+            text(
+                "INSERT INTO categorias_risco (Codigo, Categoria, FRP_min, FRP_max) "
+                "VALUES (:Codigo, :Categoria, :FRP_min, :FRP_max)"
+            ),
+            [
+                {
+                    'Codigo': int(linha.Codigo),
+                    'Categoria': linha.Categoria,
+                    # Os limites abertos ficam nulos (nem todo banco aceita infinito).
+                    'FRP_min': None if np.isinf(linha.FRP_min) else float(linha.FRP_min),
+                    'FRP_max': None if np.isinf(linha.FRP_max) else float(linha.FRP_max),
+                }
+                for linha in tabela_categorias_risco().itertuples()
+            ],
         )
-    """)) 
 
 
-def distancia_haversine(lat1, lon1, lat2, lon2):
-    # Raio da Terra em km
-    # A Terra é como se fosse uma bola, então ela tem um raio, 
-    # que é a distancia do centro até a superficie.
-    # O valor 6471 é um valor padrão usado em cálculos de distância geográfica.
-    R = 6371
-    
-    # Latitude e longitude são dados em graus (0-360°), mas a trigonometria (sin, cos) trabalha com radianos (0-2π). Por isso convertemos.
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    
-    # Tiramos a diferença para consegue calcular em KM
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    
-    # Essa fórmula calcula a diferença angular entre os dois pontos na esfera terrestre:
-    # sin(dlat/2)**2 → quanto você subiu/desceu (latitude)
-    # cos(lat1) * cos(lat2) * sin(dlon/2)**2 → quanto você se moveu lateralmente (longitude)
-    # O cos(lat1) e cos(lat2) aparecem porque as linhas de longitude ficam mais próximas perto dos polos
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-
-    # Se você sabe o ângulo entre dois pontos na esfera (em radianos), multiplica pelo raio da Terra para ter a distância em km.
-    c = 2 * asin(sqrt(a)) # 'c' é o ângulo em radianos
-    
-    return R * c  # Transforma ângulo em quilômetros
+CAMPOS_COM_ERROS = [
+    'FRP', 
+    'DiaSemChuva', 
+    'Precipitacao', 
+    'RiscoFogo',
+]
 
+CAMPOS_OBRIGATORIOS = CAMPOS_COM_ERROS + [ 
+    'Latitude', 
+    'Longitude', 
+    'DataHora', 
+    'Satelite'
+]
 
-def verificar_menor_distancia(df_dados_localizados: pd.DataFrame, row:pd.Series):
-    
-    distancia = {}
-    
-    for _, rows in df_dados_localizados.iterrows():
+# Limites de FRP que separam as categorias de risco e o nome de cada categoria (o código é a posição).
+LIMITES_FRP = (100, 500)
+CATEGORIAS_RISCO = ('Baixo', 'Médio', 'Alto')
+
+
+def preparar_dados(df: pd.DataFrame, enxuto: bool = False) -> pd.DataFrame:
+    """
+        Converte as coordenadas para número e cria a coluna ´Data´ (somente a data da coluna ´DataHora´).
+
+    Args:
+        df (pd.DataFrame): DataFreme lido do CSV.
+        enxuto (bool): Modo de memória enxuta: a ´Data´ fica como datetime64 (8 bytes por linha) em vez
+            de um objeto ´date´ por linha, e as colunas ficam nos tipos do ´reduzir_tipos´.
+
+    Returns:
+        pd.DataFrame: O mesmo DataFreme com as colunas convertidas.
+    """
+    df['Latitude'] = pd.to_numeric(df['Latitude'], errors='coerce')
+    df['Longitude'] = pd.to_numeric(df['Longitude'], errors='coerce')
+
+    if enxuto:
+        df['Data'] = pd.to_datetime(df['DataHora']).dt.normalize()
+        return reduzir_tipos(df, manter_float64=COLUNAS_FLOAT64_LEITURA)
+
+    df['Data'] = pd.to_datetime(df['DataHora']).dt.date
+
+    return df
+
+
+def ler_csv(csv_path: Path, settings: Settings) -> pd.DataFrame:
+    """
+        Lê o CSV inteiro. Com ´CACHE_PARQUET´ ativo a leitura é feita pelo cache em Parquet
+        (tipado e já filtrado para Brasil/Amazônia), que é gerado na primeira leitura do arquivo.
+        Com ´MEMORIA_ENXUTA´ somente as colunas usadas são lidas, em blocos já convertidos para os
+        tipos reduzidos (´ler_csv_enxuto´).
 
-        distancia[_] = distancia_haversine(
-            lat1=float(row['Latitude']),
-            lon1=float(rows['Longitude']),
-            lat2=float(rows['Latitude']),
-            lon2=float(row['Longitude']),
+    Args:
+        csv_path (Path): Caminho do CSV.
+        settings (Settings): Configurações da aplicação.
+
+    Returns:
+        pd.DataFrame: DataFreme com os dados do arquivo.
+    """
+    if settings.CACHE_PARQUET:
+        return ler_csv_com_cache(
+            csv_path=csv_path,
+            pasta_cache=Path(settings.PATH_CACHE_PARQUET),
+            colunas=COLUNAS_UTILIZADAS,
         )
 
-    distancia = dict(sorted(distancia.items(), key=lambda x: x[1]))
+    if settings.MEMORIA_ENXUTA:
+        return ler_csv_enxuto(csv_path)
 
-    return next(iter(distancia.items()))
+    return pd.read_csv(csv_path, sep=",")
 
 
-def inserir_dados(row: pd.Series, df_dados_localizados: pd.Series, campos_com_erros: list[str]):
-    
-    for campo in campos_com_erros:
+def filtrar_regiao(df: pd.DataFrame) -> pd.DataFrame:
+    """Somente as linhas da região estudada (Brasil/Amazônia)."""
+    return df.loc[
+        (df['Pais'] == 'Brasil') &
+        (df['Bioma'] == 'Amazônia')
+    ]
 
-        if row[campo] == -999:
 
-            row[campo] = df_dados_localizados[campo]
-    
-    return row
+def deduplicar_na_regiao(df: pd.DataFrame, settings: Settings) -> pd.DataFrame:
+    """
+        Filtra a região estudada e remove os focos repetidos por outros satélites (´DEDUP_FOCOS´).
+        O filtro vem antes para que o resultado seja o mesmo com ou sem o ´CACHE_PARQUET´ (que já lê
+        somente a região): um foco de fora da região não pode ficar no lugar de um foco da Amazônia.
+    """
+    return deduplicar_focos(
+        filtrar_regiao(df),
+        distancia_km=settings.DEDUP_DISTANCIA_KM,
+        janela_minutos=settings.DEDUP_JANELA_MINUTOS,
+    )
 
 
-def buscar_por_valor(row, df: pd.DataFrame, campos_com_erros: list[str]) -> bool | list:
-    
-    df_dados_localizados = df.loc[
-        (df['Data'] == row['Data']) &
-        (df['Municipio'] == row['Municipio'])
-    ].reset_index(drop=True)
+def separar_linhas_validas(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+        Filtra a região estudada (Brasil/Amazônia) e separa as linhas válidas das linhas com algum
+        campo obrigatório nulo ou com o valor -999.
 
-    if df_dados_localizados.empty:
-        return None
-    
-    distancia = None
+    Args:
+        df (pd.DataFrame): DataFreme já preparado pelo ´preparar_dados´.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: Linhas válidas e linhas inválidas.
+    """
+    # Somente as linhas da região estudada são consideradas, válidas ou não.
+    df = filtrar_regiao(df)
+
+    df_dados_utilizados = df.loc[
+        (df[CAMPOS_OBRIGATORIOS].notnull().all(axis=1)) &
+        (df[CAMPOS_COM_ERROS] >= 0).all(axis=1)
+    ]
+
+    df = df.drop(
+        df_dados_utilizados.index\
+    ).reset_index(drop=True)
+
+    return df_dados_utilizados, df
+
+
+@perfilado
+def tratar_valores_invalidos(df: pd.DataFrame) -> pd.DataFrame:
+    """
+        Separa as linhas válidas das inválidas, preenche as inválidas com o vizinho válido mais próximo
+        e junta tudo novamente em um único DataFreme.
+
+    Args:
+        df (pd.DataFrame): DataFreme já preparado pelo ´preparar_dados´.
+
+    Returns:
+        pd.DataFrame: DataFreme com as linhas válidas e as linhas inválidas que foram preenchidas.
+    """
+    df_dados_utilizados, df = separar_linhas_validas(df)
+
+    # Preenche os valores -999 das linhas inválidas com a linha válida mais próxima (até 5 km)
+    # do mesmo dia e município, usando um índice espacial em vez de buscar linha a linha.
+    df = imputar_valores_invalidos(
+        df_invalidos=df,
+        df_validos=df_dados_utilizados,
+        campos_com_erros=CAMPOS_COM_ERROS,
+    )
     
-    if len(df_dados_localizados) == 1:
-
-        if (row['Latitude'] == df_dados_localizados['Latitude'].iloc[0]) and \
-            (row['Longitude'] == df_dados_localizados['Longitude'].iloc[0]):
-
-            row = inserir_dados(
-                row=row,
-                df_dados_localizados=df_dados_localizados.loc[0],
-                campos_com_erros=campos_com_erros,
-            )
-
-            return row
-            
-        distancia = distancia_haversine(
-                lat1=float(row['Latitude']),
-                lon1=float(df_dados_localizados['Longitude'].iloc[0]),
-                lat2=float(df_dados_localizados['Latitude'].iloc[0]),
-                lon2=float(row['Longitude']),
-        )
+    return pd.concat(
+        [df_dados_utilizados, df], 
+        join='outer', 
+        ignore_index=True,
+        sort=False
+    )
 
-        if distancia <= 5:
 
-            row = inserir_dados(
-                row=row,
-                df_dados_localizados=df_dados_localizados.loc[0],
-                campos_com_erros=campos_com_erros,
-            )
+@perfilado
+def agregar_csv_em_blocos(csv_path: Path, settings: Settings) -> pd.DataFrame:
+    """
+        Versão em streaming da leitura + tratamento + agregação de um CSV.
+        O arquivo é lido em blocos cujo tamanho é calculado a partir do ´INGESTAO_MEMORIA_MB´,
+        e os grupos (Data, Municipio) que ficam divididos entre dois blocos são levados para o bloco seguinte.
+        O resultado é igual ao da leitura do arquivo inteiro em memória.
+        Com ´AGREGACAO_GRADE´ a agregação é por dia e célula da grade.
 
-            return row
+    Args:
+        csv_path (Path): Caminho do CSV.
+        settings (Settings): Configurações da aplicação.
 
-        return None
+    Returns:
+        pd.DataFrame: DataFreme com os dados agregados por dia e município.
+    """
+    linhas_por_bloco = estimar_linhas_por_bloco(
+        csv_path=csv_path,
+        memoria_mb=settings.INGESTAO_MEMORIA_MB,
+    )
+
+    logger.info(f"Lendo {csv_path.name} em blocos de {linhas_por_bloco} linhas...")
 
-    distancia = verificar_menor_distancia(
-                        df_dados_localizados=df_dados_localizados,
-                        row=row,
-                    )
+    blocos = (
+        preparar_dados(bloco)
+        for bloco in pd.read_csv(csv_path, sep=",", chunksize=linhas_por_bloco)
+    )
 
-    if distancia[1] <= 5:
+    agregados = []
+    for bloco in agrupar_blocos_por_data(blocos):
+        # Os blocos têm dias completos, então a deduplicação (sempre dentro do mesmo dia) fica igual à do arquivo inteiro.
+        if settings.DEDUP_FOCOS:
+            bloco = deduplicar_na_regiao(bloco, settings)
+        agregados.append(agregar(df=tratar_valores_invalidos(bloco), settings=settings))
+
+    return pd.concat(agregados, ignore_index=True).sort_values(
+        ['Data', 'Celula' if settings.AGREGACAO_GRADE else 'Municipio'],
+        kind='stable',
+        ignore_index=True,
+    )
 
-        row = inserir_dados(
-                row=row,
-                df_dados_localizados=df_dados_localizados.loc[distancia[0]],
-                campos_com_erros=campos_com_erros,
-        )
 
-        return row
+def processar_arquivo(csv_path: Path, settings: Settings) -> pd.DataFrame:
+    """
+        Faz a leitura, o tratamento e a agregação de um único CSV.
+        Não acessa o banco de dados, então pode ser executada em outro processo.
+
+    Args:
+        csv_path (Path): Caminho do CSV.
+        settings (Settings): Configurações da aplicação.
+
+    Returns:
+        pd.DataFrame: DataFreme agregado por dia e município (ou por dia e célula com ´AGREGACAO_GRADE´).
+    """
+    with perfil.span(csv_path.name) as span_arquivo:
+
+        if settings.INGESTAO_STREAMING:
+            # Lê, trata e agrega o arquivo em blocos, mantendo a memória limitada pelo ´INGESTAO_MEMORIA_MB´.
+            df = agregar_csv_em_blocos(csv_path=csv_path, settings=settings)
+
+        else:
+            with perfil.span('leitura') as span:
+                df = preparar_dados(ler_csv(csv_path=csv_path, settings=settings), enxuto=settings.MEMORIA_ENXUTA)
+                span.linhas_saida = len(df)
+                span.memoria_saida_mb = memoria_mb(df) if perfil.ativo else None
+
+            logger.info(f"{csv_path.name} - {len(df)} linhas")
+
+            span_arquivo.linhas_entrada = len(df)
+
+            # Focos do mesmo fogo vistos por outros satélites saem antes do tratamento e da agregação.
+            if settings.DEDUP_FOCOS:
+                df = deduplicar_na_regiao(df, settings)
+
+            df = tratar_valores_invalidos(df=df)
+
+            # Função que faz a agregação dos dados por dia e municipio (ou célula da grade).
+            df = agregar(df=df, settings=settings)
+
+        if settings.MEMORIA_ENXUTA:
+            df = reduzir_tipos(df)
+
+        span_arquivo.linhas_saida = len(df)
+
+    return df
+
+
+def _processar_arquivo_em_processo(csv_path: Path, settings: Settings) -> tuple[pd.DataFrame, list[dict]]:
+    # Cada processo do pool tem o seu próprio perfil, os spans voltam junto com o resultado.
+    perfil.iniciar(ativo=settings.PERFIL_ATIVO, tracemalloc_ativo=settings.PERFIL_TRACEMALLOC)
+    with copy_on_write(settings.MEMORIA_ENXUTA):
+        df = processar_arquivo(csv_path, settings)
+    return df, perfil.exportar()
+
+
+def processar_arquivos(files: list[Path], settings: Settings) -> list[pd.DataFrame]:
+    """
+        Executa o ´processar_arquivo´ para todos os CSVs. Com ´INGESTAO_WORKERS´ maior que 1
+        os arquivos são processados em paralelo em um pool de processos.
+
+    Args:
+        files (list[Path]): Caminhos dos CSVs.
+        settings (Settings): Configurações da aplicação.
+
+    Returns:
+        list[pd.DataFrame]: DataFremes agregados, na mesma ordem de ´files´.
+    """
+    workers = min(settings.INGESTAO_WORKERS, len(files))
+    agregados = [None] * len(files)
+
+    if workers <= 1:
+        for indice, csv_path in enumerate(files):
+            logger.info(f"Arquivo encontrado: {csv_path.name}")
+            agregados[indice] = processar_arquivo(csv_path, settings)
+            logger.info(f"{csv_path.name} finalizado ({len(agregados[indice])} linhas agregadas)")
+
+        return agregados
+
+    logger.info(f"Processando {len(files)} arquivos com {workers} processos...")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_processar_arquivo_em_processo, csv_path, settings): indice
+            for indice, csv_path in enumerate(files)
+        }
+
+        for future in as_completed(futures):
+            indice = futures[future]
+            agregados[indice], spans = future.result()
+            perfil.anexar(spans)
+            logger.info(f"{files[indice].name} finalizado ({len(agregados[indice])} linhas agregadas)")
+
+    return agregados
 
-    return None
 
-@_time_run
 def carregar_dados(settings: Settings):
-    logger.info(f"{settings.APP_NAME} - v{settings.APP_VERSION}")
+    """
+        Executa a carga completa. Com ´PERFIL_ATIVO´ o tempo, as linhas e a memória de cada etapa
+        são gravados em ´PATH_PERFIL´ no arquivo ´<UUID>.json´ (e ´<UUID>.folded´ para flamegraph).
+        Com ´MEMORIA_ENXUTA´ o copy-on-write do pandas fica ativo somente durante a carga.
+    """
+    perfil.iniciar(ativo=settings.PERFIL_ATIVO, tracemalloc_ativo=settings.PERFIL_TRACEMALLOC)
+
+    try:
+        with perfil.span('carregar_dados'), copy_on_write(settings.MEMORIA_ENXUTA):
+            _carregar_dados(settings)
+    finally:
+        perfil.finalizar(pasta=Path(settings.PATH_PERFIL), uuid=settings.UUID)
+
 
+def preparar_carga(settings: Settings) -> tuple[Engine, list[Path], list[ArquivoCSV]]:
+    """
+        Cria as tabelas que ainda não existem e compara os CSVs com o manifesto.
+
+        Sem o ´FEATURES_INCREMENTAIS´ as janelas móveis e a normalização da Latitude e Longitude são
+        calculadas somente com os dados da carga. Por isso, se algum arquivo mudou, todos os arquivos
+        são processados de novo: com somente os arquivos novos as janelas das primeiras linhas e os
+        limites da normalização ficariam diferentes dos de uma carga completa.
+
+    Returns:
+        tuple[Engine, list[Path], list[ArquivoCSV]]: Engine, todos os CSVs e os CSVs que serão processados.
+    """
     engine = get_sync_engine()
     create_table(engine)
+    gravar_categorias_risco(engine)
+    create_table_manifesto(engine)
+    create_table_estado(engine)
 
     path_resources = Path(settings.PATH_ARQUIVOS_CSV)
-    files = list(path_resources.glob("*.csv"))
+    files = sorted(path_resources.glob("*.csv"))
 
-    for csv_path in files:
+    if not files:
+        logger.warning(f"Nenhum arquivo CSV encontrado em {path_resources}")
+        return engine, files, []
 
-        df = pd.read_csv(csv_path, sep=",")
+    # Somente os arquivos novos ou alterados desde a última carga são processados.
+    pendentes = arquivos_pendentes(engine=engine, files=files)
 
-        df['Latitude'] = pd.to_numeric(df['Latitude'], errors='coerce')
-        df['Longitude'] = pd.to_numeric(df['Longitude'], errors='coerce')
+    if not pendentes:
+        logger.info("Todos os arquivos já foram carregados.")
+    elif len(pendentes) < len(files) and not settings.FEATURES_INCREMENTAIS:
+        logger.info(
+            f"{len(pendentes)} de {len(files)} arquivos mudaram. Sem o FEATURES_INCREMENTAIS as features "
+            "precisam de todos os dados, então todos os arquivos serão processados."
+        )
+        pendentes = todos_arquivos(files=files, pendentes=pendentes)
 
-        df['Data'] = pd.to_datetime(df['DataHora']).dt.date
+    return engine, files, pendentes
 
-        logger.info(f"Arquivo encontrado: {csv_path.name} - {len(df)}")
 
-        campos_com_erros = [
-            'FRP', 
-            'DiaSemChuva', 
-            'Precipitacao', 
-            'RiscoFogo',
-        ]
+def _carregar_dados(settings: Settings):
+    logger.info(f"{settings.APP_NAME} - v{settings.APP_VERSION}")
 
-        campos_obrigatorios = campos_com_erros + [ 
-            'Latitude', 
-            'Longitude', 
-            'DataHora', 
-            'Satelite'
-        ]
+    if settings.AGREGACAO_GRADE:
+        _carregar_grade(settings)
+        return
 
-        df_dados_utilizados = df.loc[
-            (df['Pais'] == 'Brasil') &
-            (df['Bioma'] == 'Amazônia') &
-            (df[campos_obrigatorios].notnull().all(axis=1)) &
-            (df[campos_com_erros] >= 0).all(axis=1)
-        ]
+    if settings.INGESTAO_ASYNC:
+        # Importado aqui porque o módulo assíncrono usa as funções deste módulo.
+        from source.ingestao_async import carregar_dados_async
 
-        df = df.drop(
-            df_dados_utilizados.index\
-        ).reset_index(drop=True)
+        asyncio.run(carregar_dados_async(settings))
+        return
 
-        print(len(df))
+    engine, files, pendentes = preparar_carga(settings)
 
-        df = df.apply(
-            buscar_por_valor, 
-            axis=1, 
-            args=(df_dados_utilizados, campos_com_erros)
-        ).dropna(inplace=True)
-        
-        df = pd.concat(
-            [df_dados_utilizados, df], 
-            join='outer', 
-            ignore_index=True,
-            sort=False
+    if not pendentes:
+        return
+
+    # Leitura, tratamento e agregação de cada arquivo (em paralelo quando ´INGESTAO_WORKERS´ > 1).
+    with perfil.span('processar_arquivos'):
+        agregados = processar_arquivos(files=[arquivo.caminho for arquivo in pendentes], settings=settings)
+
+    for arquivo, df in zip(pendentes, agregados):
+        df['Arquivo'] = str(arquivo.caminho)
+
+    # As médias móveis são calculadas depois de juntar todos os arquivos, assim as janelas
+    # que atravessam a divisa entre dois arquivos (ex.: dezembro -> janeiro) ficam corretas.
+    df = pd.concat(agregados, ignore_index=True).sort_values(
+        ['Data', 'Municipio'],
+        kind='stable',
+        ignore_index=True,
+    )
+    del agregados
+
+    if settings.MEMORIA_ENXUTA:
+        # Categóricas com categorias diferentes em cada arquivo voltam a ser texto no concat.
+        df = reduzir_tipos(df)
+
+    # Função que cria uma coluna no DataFreme com base no valor de FRP.
+    df = criar_categorias_risco(df=df)
+
+    # Estado da última carga: últimos registros de cada município e limites da normalização.
+    historico, limites = carregar_estado(engine)
+
+    cubo = None
+    if settings.JANELAS_CALENDARIO:
+        # O cubo diário é montado uma única vez com os dados agregados (e o histórico salvo, no modo
+        # incremental) e usado por todas as janelas móveis. Com ´SALVAR_CUBO_DIARIO´ o cubo de uma carga
+        # completa é gravado depois dos dados.
+        cubo = CuboDiario.construir(
+            df,
+            colunas=COLUNAS_ESTADO,
+            historico=historico if settings.FEATURES_INCREMENTAIS else None,
+            dias_anteriores=REGISTROS_POR_MUNICIPIO,
+        )
+
+    if settings.FEATURES_INCREMENTAIS:
+        # Somente as linhas novas recebem features, as janelas são completadas com o histórico salvo.
+        validar_continuacao(historico=historico, df=df)
+        limites = calcular_limites_geograficos(df=df, anteriores=limites)
+        df = engenharia_features(
+            df=df,
+            historico=historico,
+            limites_geograficos=limites,
+            janelas_calendario=settings.JANELAS_CALENDARIO,
+            cubo=cubo,
+        )
+    else:
+        limites = calcular_limites_geograficos(df=df)
+        df = engenharia_features(
+            df=df,
+            limites_geograficos=limites,
+            janelas_calendario=settings.JANELAS_CALENDARIO,
+            cubo=cubo,
         )
+        # A carga completa tem todos os arquivos, então o estado é montado somente com as linhas dela
+        # (o estado salvo pode ter as mesmas datas).
+        historico = historico.iloc[0:0]
 
-        # Função que faz a agregação dos dados por dia e municipio.
-        df = agregar_por_dia_municipio(df=df)
+    cubo_salvo = cubo if settings.SALVAR_CUBO_DIARIO and not settings.FEATURES_INCREMENTAIS else None
+    del cubo
 
-        # Função que cria uma coluna no DataFreme com base no valor de FRP.
-        df = criar_categorias_risco(df=df)
+    if settings.MEMORIA_ENXUTA:
+        df = reduzir_tipos(df)
 
-        # Função que faz a criação das features.
-        df = engenharia_features(df=df)
+    # Somente este processo acessa o banco de dados. Cada arquivo troca somente as suas próprias
+    # linhas, em uma transação junto com o manifesto e com o estado das janelas dessas linhas.
+    linhas_por_arquivo = dict(tuple(df.groupby('Arquivo', sort=False, observed=True)))
 
-        insert_fast(engine, df)
-        logger.info(f"{csv_path.name} finalizado.")
+    with perfil.span('gravacao', linhas_entrada=len(df)):
+        for arquivo in pendentes:
+            df_arquivo = linhas_por_arquivo.get(str(arquivo.caminho), df.iloc[0:0])
 
-        print()
+            try:
+                substituir_dados_arquivo(
+                    engine=engine,
+                    arquivo=arquivo,
+                    df=df_arquivo,
+                    na_transacao=partial(atualizar_estado, historico=historico, df=df_arquivo, limites=limites),
+                )
+            except Exception:
+                # Como na carga assíncrona, a carga para no primeiro erro: o estado salvo fica igual ao
+                # dos arquivos gravados e os próximos arquivos continuam pendentes no manifesto.
+                logger.exception(f"Erro ao gravar {arquivo.caminho.name}")
+                marcar_erro(engine=engine, arquivo=arquivo)
+                raise
 
-    print()
+            historico = atualizar_historico(historico, df_arquivo)
 
-@_time_run
-def insert_fast(engine, df: pd.DataFrame):
-    conn = engine.raw_connection()
-    cur = conn.cursor()
-
-    for i in range(0, len(df), 5000):
-        chunk = df.iloc[i:i+5000]
-        values = chunk.values.tolist()
-        cur.executemany(
-            "INSERT INTO dados_csv VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-            values
+    if cubo_salvo is not None:
+        cubo_salvo.salvar(Path(settings.PATH_CUBO_DIARIO))
+
+    logger.info(f"{len(pendentes)} de {len(files)} arquivos carregados.")
+
+
+def _carregar_grade(settings: Settings):
+    """
+        Carga com ´AGREGACAO_GRADE´: mesma leitura, tratamento, categorias e features da carga por
+        município, com as séries separadas por célula da grade. O estado das janelas e o manifesto são
+        por município, então toda carga em grade processa todos os CSVs e troca o conteúdo inteiro da
+        ´dados_grade´ e da ´celulas_municipio´.
+    """
+    if settings.FEATURES_INCREMENTAIS or settings.INGESTAO_ASYNC:
+        raise ValueError(
+            "A AGREGACAO_GRADE não usa o estado das janelas por município, "
+            "desative o FEATURES_INCREMENTAIS e o INGESTAO_ASYNC."
+        )
+
+    engine = get_sync_engine()
+    create_table_dados(engine, table_name=TABELA_GRADE)
+    create_table_celulas(engine)
+    gravar_categorias_risco(engine)
+
+    path_resources = Path(settings.PATH_ARQUIVOS_CSV)
+    files = sorted(caminho.resolve() for caminho in path_resources.glob("*.csv"))
+
+    if not files:
+        logger.warning(f"Nenhum arquivo CSV encontrado em {path_resources}")
+        return
+
+    logger.info(f"Agregando {len(files)} arquivos em uma grade de {settings.GRADE_TAMANHO_GRAUS}°...")
+
+    with perfil.span('processar_arquivos'):
+        agregados = processar_arquivos(files=files, settings=settings)
+
+    for csv_path, df in zip(files, agregados):
+        df['Arquivo'] = str(csv_path)
+
+    df = pd.concat(agregados, ignore_index=True).sort_values(
+        ['Data', 'Celula'],
+        kind='stable',
+        ignore_index=True,
+    )
+    del agregados
+
+    if settings.MEMORIA_ENXUTA:
+        df = reduzir_tipos(df)
+
+    df = criar_categorias_risco(df=df)
+
+    cubo = None
+    if settings.JANELAS_CALENDARIO:
+        # Mesmo cubo da carga por município, com uma linha por célula.
+        cubo = CuboDiario.construir(
+            df,
+            colunas=COLUNAS_ESTADO,
+            dias_anteriores=REGISTROS_POR_MUNICIPIO,
+            coluna_grupo='Celula',
+        )
+
+    df = engenharia_features(
+        df=df,
+        limites_geograficos=calcular_limites_geograficos(df=df),
+        janelas_calendario=settings.JANELAS_CALENDARIO,
+        cubo=cubo,
+        coluna_grupo='Celula',
+    )
+    del cubo
+
+    if settings.MEMORIA_ENXUTA:
+        df = reduzir_tipos(df)
+
+    with perfil.span('gravacao', linhas_entrada=len(df)):
+        substituir_dados_grade(
+            engine,
+            df=df,
+            celulas_municipio=tabela_celula_municipio(df, tamanho_graus=settings.GRADE_TAMANHO_GRAUS),
         )
-    conn.commit()
 
-@_time_run
-def agregar_por_dia_municipio(df: pd.DataFrame) -> pd.DataFrame:
+    logger.info(f"{len(files)} arquivos carregados na {TABELA_GRADE}.")
+
+@perfilado
+def insert_fast(engine, df: pd.DataFrame):
+    # Upsert pela chave (Municipio, Ano, DiaAno): no Postgres é usado COPY e nos demais bancos INSERTs em lote.
+    with engine.begin() as conn:
+        return gravar_dados(conn, df)
+
+def agregar(df: pd.DataFrame, settings: Settings) -> pd.DataFrame:
+    """Agrega ´df´ por dia e município ou, com ´AGREGACAO_GRADE´, por dia e célula da grade."""
+    if settings.AGREGACAO_GRADE:
+        return agregar_por_dia_celula(df=df, tamanho_graus=settings.GRADE_TAMANHO_GRAUS)
+
+    return agregar_por_dia_municipio(df=df)
+
+
+@perfilado
+def agregar_por_dia_municipio(df: pd.DataFrame, coluna_grupo: str = 'Municipio') -> pd.DataFrame:
     """
         Nesta função será feito a agregação dos dados apartir de dia por data e municipio, ou seja, 
         para cada dia que o datafreme tem ele vai separar as linhas de um unico dia e municipio e efetuar
@@ -263,77 +648,182 @@ def agregar_por_dia_municipio(df: pd.DataFrame) -> pd.DataFrame:
 
     Args:
         df (pd.DataFrame): DataFreme onde será feito a agregação dos dados.
+        coluna_grupo (str): Coluna agrupada junto com a ´Data´ (´Celula´ no ´agregar_por_dia_celula´).
 
     Returns:
         pd.DataFrame: DataFreme com os dados agregados.
     """
-    logger.info("Agregando dados por dia e município...")
+    logger.info(f"Agregando dados por dia e {coluna_grupo.lower()}...")
+
+    # A coluna ´DataHora´ tem data e hora, então a ´Data´ pega somente a data. Quando o DataFreme
+    # já vem do ´preparar_dados´ a coluna ´Data´ já existe e não é preciso converter de novo.
+    if 'Data' not in df.columns:
+        df = df.assign(Data=pd.to_datetime(df['DataHora']).dt.date)
+
+    # O valor -999 do DiaSemChuva, RiscoFogo e Precipitacao é trocado por NaN, assim o máximo e as
+    # médias ignoram esses valores sem precisar de uma função em Python para cada grupo.
+    # Procedência dos focos, quando a deduplicação (´DEDUP_FOCOS´) está ativa.
+    procedencia = [coluna for coluna in COLUNAS_PROCEDENCIA if coluna in df.columns]
+
+    df_valido = df[['Data', coluna_grupo, 'FRP', 'Latitude', 'Longitude', *procedencia]].assign(
+        **{
+            campo: df[campo].astype(np.float64).where(df[campo] != -999.0)
+            for campo in ['DiaSemChuva', 'RiscoFogo', 'Precipitacao']
+        },
+    )
 
-    df = df.copy()
-    
-    # Transforma a coluna ´DataHora´ em datetime.
-    df['DataHora'] = pd.to_datetime(df['DataHora'])
-    # A coluna ´DataHora´ tem data e hora, então a linha de código abaixo cria uma coluna chamada ´Data´ que pega somente a data da coluna ´DataHora´.
-    df['Data'] = df['DataHora'].dt.date
-
-    # Essas linhas de código iram fazer a agregação dos dados por dia e muncipio além de fazer alguns calculos que são definidos no metodo agg().
-    df_daily = df.groupby(['Data', 'Municipio']).agg({
-        'FRP': 'sum',
-        
-        # Para RiscoFogo: média apenas dos valores válidos
-        'RiscoFogo': lambda x: x[x != -999.0].mean(),
-        
-        # Para DiaSemChuva: máximo apenas dos valores válidos
-        'DiaSemChuva': lambda x: x[x != -999.0].max(),
-        
-        # Para Precipitacao: média apenas dos valores válidos
-        'Precipitacao': lambda x: x[x != -999.0].mean(),
-        
-        'Latitude': 'mean',
-        'Longitude': 'mean'
-    }).reset_index()
+    grupos = df_valido.groupby(['Data', coluna_grupo], observed=True)
+
+    # FRP: soma, DiaSemChuva: máximo dos valores válidos, RiscoFogo/Precipitacao: média dos valores válidos,
+    # Latitude/Longitude: média.
+    # Deteccoes: total de focos lidos, Satelites: maior quantidade de satélites que viram um mesmo fogo.
+    # A média do groupby soma em outra ordem que o ´Series.mean()´ da versão com lambda por grupo, então
+    # RiscoFogo e Precipitacao podem diferir dela nos últimos bits (alguns ULP, ver docs/TRATAMENTO_DADOS.md).
+    df_daily = grupos.agg(
+        FRP=('FRP', 'sum'),
+        RiscoFogo=('RiscoFogo', 'mean'),
+        DiaSemChuva=('DiaSemChuva', 'max'),
+        Precipitacao=('Precipitacao', 'mean'),
+        Latitude=('Latitude', 'mean'),
+        Longitude=('Longitude', 'mean'),
+        **{coluna: (coluna, COLUNAS_PROCEDENCIA[coluna]) for coluna in procedencia},
+    )
 
-    # Exclui as linhas que tem algum valor como NaN.
-    df_daily = df_daily.dropna()
+    # Se nenhum grupo ficou sem valor válido o máximo continua inteiro, como no CSV.
+    if pd.api.types.is_integer_dtype(df['DiaSemChuva']) and df_daily['DiaSemChuva'].notna().all():
+        df_daily['DiaSemChuva'] = df_daily['DiaSemChuva'].astype(df['DiaSemChuva'].dtype)
 
-    # Transforma a coluna ´Data´ em datetime.
-    df['Data'] = pd.to_datetime(df['Data'])
+    df_daily = df_daily[['FRP', 'RiscoFogo', 'DiaSemChuva', 'Precipitacao', 'Latitude', 'Longitude', *procedencia]].reset_index()
+
+    # Exclui as linhas que tem algum valor como NaN.
+    df_daily = df_daily.dropna().reset_index(drop=True)
 
-    logger.info("✓ Dados agregados por dia e município com sucesso!")
+    logger.info(f"✓ Dados agregados por dia e {coluna_grupo.lower()} com sucesso!")
 
     return df_daily
 
 
-@_time_run
-def criar_categorias_risco(df: pd.DataFrame) -> pd.DataFrame:
+@perfilado
+def agregar_por_dia_celula(df: pd.DataFrame, tamanho_graus: float) -> pd.DataFrame:
+    """
+        Mesma agregação do ´agregar_por_dia_municipio´, mas por dia e célula de uma grade regular de
+        ´tamanho_graus´ (ver source/grade.py). Os focos fora da grade ou sem coordenada são descartados.
+
+    Args:
+        df (pd.DataFrame): DataFreme já tratado, com a coluna ´Data´.
+        tamanho_graus (float): Lado de cada célula, em graus.
+
+    Returns:
+        pd.DataFrame: Um registro por (Data, Celula), com o ´Municipio´ que teve mais focos na célula no dia.
+    """
+    if 'Data' not in df.columns:
+        df = df.assign(Data=pd.to_datetime(df['DataHora']).dt.date)
+
+    # Somente as colunas usadas na agregação, assim o filtro das linhas fora da grade não copia o resto.
+    colunas = ['Data', 'Municipio', 'FRP', 'RiscoFogo', 'DiaSemChuva', 'Precipitacao', 'Latitude', 'Longitude']
+    df = df[[*colunas, *(coluna for coluna in COLUNAS_PROCEDENCIA if coluna in df.columns)]]
+
+    codigos = celulas(df['Latitude'].to_numpy(), df['Longitude'].to_numpy(), tamanho_graus)
+    dentro = codigos >= 0
+    df = df.assign(Celula=codigos) if dentro.all() else df.loc[dentro].assign(Celula=codigos[dentro])
+
+    df_daily = agregar_por_dia_municipio(df=df, coluna_grupo='Celula')
+
+    df_daily = df_daily.merge(municipio_predominante(df), on=['Data', 'Celula'], how='left')
+
+    return df_daily[['Data', 'Celula', 'Municipio', *df_daily.columns.drop(['Data', 'Celula', 'Municipio'])]]
+
+
+@perfilado
+def criar_categorias_risco(
+    df: pd.DataFrame,
+    limites: tuple[float, ...] = LIMITES_FRP,
+    categorias: tuple[str, ...] = CATEGORIAS_RISCO,
+) -> pd.DataFrame:
     """
-        Cria categorias de risco baseado em FRP.
-        Baixo: FRP < 100
-        Médio: 100 <= FRP < 500
-        Alto: FRP >= 500
+        Cria categorias de risco baseado em FRP, em uma única operação para todas as linhas.
+        Com os limites padrão:
+        Baixo (0): FRP < 100
+        Médio (1): 100 <= FRP < 500
+        Alto (2): FRP >= 500
+
+        A coluna ´Categoria_Risco´ guarda o código da categoria (int8), que é o target usado no treino.
+        O nome de cada código está em ´tabela_categorias_risco´ (e na tabela ´categorias_risco´ do banco).
 
     Args:
         df (pd.DataFrame): DataFreme que tem que ser aplicado a cateforia dos dados.
+        limites (tuple[float, ...]): Limites de FRP entre uma categoria e a próxima, em ordem crescente.
+        categorias (tuple[str, ...]): Nome de cada categoria (uma a mais que os limites).
 
     Returns:
-        pd.DataFrame: Retorna o DataFreme recebido com a coluna ´Categoria_Risco´ com a categoria criada.
+        pd.DataFrame: Retorna o DataFreme recebido com a coluna ´Categoria_Risco´ com o código da categoria.
     """
     logger.info("Criando categorias de risco baseadas em FRP...")
 
-    df = df.copy()
+    _validar_categorias(limites, categorias)
+
+    df = copia_defensiva(df)
 
     if 'FRP' in df.columns:
-        df['Categoria_Risco'] = df['FRP'].apply(categorizar_frp)
+        # Quantidade de limites menores ou iguais ao FRP = código da categoria. Um FRP nulo fica na
+        # última categoria, igual à comparação linha a linha (NaN < limite é sempre falso).
+        df['Categoria_Risco'] = np.searchsorted(
+            np.asarray(limites, dtype=np.float64),
+            df['FRP'].to_numpy(dtype=np.float64),
+            side='right',
+        ).astype(np.int8)
     
     logger.info("✓ Categorias de risco criadas com sucesso!")
 
     return df
 
 
-@_time_run
+def _validar_categorias(limites: tuple[float, ...], categorias: tuple[str, ...]):
+    if len(categorias) != len(limites) + 1:
+        raise ValueError(f"São necessárias {len(limites) + 1} categorias para {len(limites)} limites de FRP.")
+    if list(limites) != sorted(limites):
+        raise ValueError(f"Os limites de FRP devem estar em ordem crescente: {limites}")
+    if len(categorias) > np.iinfo(np.int8).max:
+        raise ValueError("Quantidade de categorias maior que o suportado pelo código int8.")
+
+
+def tabela_categorias_risco(
+    limites: tuple[float, ...] = LIMITES_FRP,
+    categorias: tuple[str, ...] = CATEGORIAS_RISCO,
+) -> pd.DataFrame:
+    """
+        Tabela de consulta dos códigos da ´Categoria_Risco´: código, nome e o intervalo de FRP
+        [FRP_min, FRP_max) de cada categoria.
+    """
+    _validar_categorias(limites, categorias)
+
+    return pd.DataFrame({
+        'Codigo': np.arange(len(categorias), dtype=np.int8),
+        'Categoria': list(categorias),
+        'FRP_min': [-np.inf, *limites],
+        'FRP_max': [*limites, np.inf],
+    })
+
+
+def categorias_como_texto(
+    codigos: pd.Series,
+    categorias: tuple[str, ...] = CATEGORIAS_RISCO,
+) -> pd.Series:
+    """
+        Converte os códigos da ´Categoria_Risco´ em uma categórica ordenada (Baixo < Médio < Alto),
+        sem criar uma string por linha.
+    """
+    return pd.Series(
+        pd.Categorical.from_codes(codigos.to_numpy(), categories=list(categorias), ordered=True),
+        index=codigos.index,
+        name=codigos.name,
+    )
+
+
 def categorizar_frp(frp: float) -> str:
     """
         Categoriza o FRP em Baixo, Médio e Alto.
+        Versão de um único valor, com os mesmos limites do ´criar_categorias_risco´.
         
     Args:
         frp (float): Valor do FRP
@@ -341,124 +831,60 @@ def categorizar_frp(frp: float) -> str:
     Returns:
         str: Cateoria do FRP
     """
-    if frp < 100:
-        return 'Baixo'
-    elif frp < 500:
-        return 'Médio'
-    else:
-        return 'Alto'
-
-
-@_time_run
-def engenharia_features(df: pd.DataFrame) -> pd.DataFrame:
+    return CATEGORIAS_RISCO[int(np.searchsorted(LIMITES_FRP, frp, side='right'))]
+
+
+@perfilado
+def engenharia_features(
+    df: pd.DataFrame,
+    historico: pd.DataFrame | None = None,
+    limites_geograficos: dict[str, float] | None = None,
+    features: Iterable[str] = FEATURES_PADRAO,
+    janelas_calendario: bool = False,
+    cubo: CuboDiario | None = None,
+    coluna_grupo: str = 'Municipio',
+) -> pd.DataFrame:
     """
         Está função é utilizada para criar as features com base nas colunas do DataFreme original,
         essas features são criadas para que o modelo tenha mais conhecimento sobre os dados e ele
         consiga predizer o dado determiando como target de uma forma mais eficiente.
 
+        As features são declaradas no ´REGISTRO_FEATURES´ (ver ´registro_features´) e somente as
+        pedidas em ´features´ são criadas, junto com as dependências delas.
+
+        Com ´historico´ e ´limites_geograficos´ as features das linhas de ´df´ ficam iguais às de
+        uma carga completa, sem precisar recalcular as linhas antigas (modo incremental).
+
     Args:
         df (pd.DataFrame): DataFreme que será utilizado para criar as features.
+        historico (pd.DataFrame | None): Últimos registros de cada município, anteriores a ´df´,
+            usados somente para completar as janelas móveis.
+        limites_geograficos (dict[str, float] | None): Mínimo e máximo da Latitude e Longitude usados
+            na normalização. Quando None são usados os limites do próprio ´df´.
+        features (Iterable[str]): Features que devem ser criadas, por padrão as colunas da ´dados_csv´.
+        janelas_calendario (bool): Janelas móveis em dias do calendário (cubo diário) em vez de registros.
+        cubo (CuboDiario | None): Cubo diário já montado, reutilizado pelas janelas em dias do calendário.
+        coluna_grupo (str): Coluna que separa as séries das janelas móveis (´Celula´ na agregação em grade).
 
     Returns:
         pd.DataFrame: DataFreme com as features criadas.
     """
 
     logger.info("Aplicando engenharia de features...")
-    df = df.copy()
+    df = copia_defensiva(df)
 
     df['Data'] = pd.to_datetime(df['Data'])
 
-    # ===== FEATURES TEMPORAIS =====
-    df['Ano'] = df['Data'].dt.year
-    df['Mes'] = df['Data'].dt.month
-    df['Dia'] = df['Data'].dt.day
-    df['DiaAno'] = df['Data'].dt.dayofyear
-
-    # ===== FEATURES LÓGICAS =====
-    # Nós criamos essas features para que o modelo entenda que os valores 'Dia' e 'Mes'
-    # não são valores continuos, eles tem uma lógica por trás. 
-    # A forma com que implementamos isso é como se criassemos um relógio onde cada valor 
-    # tem sua posição dentro dele e toda vez que o ultimo valor do relógio é atingido
-    # o ciclo se reinicia e volta para o valor inicial.
-    # Criamos essa features por que se mantivessemos as features somente como 'Dia' e 'Mes'
-    # o modelo iria entender esses valores como valores continuos, mas na verdade não são.
-    df['Mes_sin'] = np.sin(2 * np.pi * df['Mes'] / 12)
-    df['Mes_cos'] = np.cos(2 * np.pi * df['Mes'] / 12)
-    df['DiaAno_sin'] = np.sin(2 * np.pi * df['DiaAno'] / 365)
-    df['DiaAno_cos'] = np.cos(2 * np.pi * df['DiaAno'] / 365)
-
-    # ===== FEATURES DE INTERAÇÃO =====
-    # Essa feature é importante para determinar o Risco das queimadas, ou seja, se estiver tendo fogo e chuva 
-    # o perigo não é tão alto, agora se estiver com Risco de Fogo e não estiver chovendo o perigo é grande.
-    # Então seria uma forma de entender qual o Risco da queimada que está ou irá acontecer.
-    df['RiscoFogo_x_DiaSemChuva'] = df['RiscoFogo'] * df['DiaSemChuva']
-
-    # ===== FEATURES EXPANÇÃO POLINOMIAL =====
-    # Utilizamos o conceito de expansão polinomial para entendermos a não linearidade dos dados e o modelo 
-    # conseguir predizer de uma forma mais acertiva.
-    df['RiscoFogo_squared'] = df['RiscoFogo'] ** 2
-    df['DiaSemChuva_squared'] = df['DiaSemChuva'] ** 2
-
-    # ===== FEATURES GEOGRÁFICAS NORMALIZADAS =====
-    # Aqui normalizamos a Latitude e Longitude para igualar a importância numérica, assim o modelo não entende que 
-    # a Latitude e Longitude tem mais importância do que os demais parametros.
-    df['Latitude_norm'] = (df['Latitude'] - df['Latitude'].min()) / (df['Latitude'].max() - df['Latitude'].min())
-    df['Longitude_norm'] = (df['Longitude'] - df['Longitude'].min()) / (df['Longitude'].max() - df['Longitude'].min())
-    
-    # ===== FEATURES DE MÉDIA MÓVEL =====
-    # A média móvel nos permite suavizar as flutuações dos dados e capturar tendências locais.
-    # Ao agruparmos por Município, conseguimos entender o comportamento histórico de cada região.
-    # Utilizamos janelas diferentes (7 e 14 dias) para capturar padrões em diferentes escalas de tempo.
-    # Isso ajuda o modelo a identificar se o Risco de Fogo está aumentando ou diminuindo em uma tendência.
-    df['RiscoFogo_media_movel_7'] = df.groupby('Municipio')['RiscoFogo'].transform(
-        lambda x: x.rolling(window=7, min_periods=1).mean()
-    )
-    df['Precipitacao_media_movel_7'] = df.groupby('Municipio')['Precipitacao'].transform(
-        lambda x: x.rolling(window=7, min_periods=1).mean()
-    )
-    df['DiaSemChuva_media_movel_14'] = df.groupby('Municipio')['DiaSemChuva'].transform(
-        lambda x: x.rolling(window=14, min_periods=1).mean()
-    )
-
-    # ===== FEATURES DE VOLATILIDADE =====
-    # A volatilidade mede a variação dos dados em um período de tempo.
-    # Se a volatilidade do Risco de Fogo é alta, significa que os valores estão mudando drasticamente,
-    # o que pode indicar condições instáveis ou críticas para queimadas em um Município.
-    # Da mesma forma, a volatilidade da Precipitação nos ajuda a entender se a chuva está ocorrendo
-    # de forma consistente ou irregular, impactando na prevenção de incêndios.
-    df['RiscoFogo_volatilidade_7'] = df.groupby('Municipio')['RiscoFogo'].transform(
-        lambda x: x.rolling(window=7, min_periods=1).std().fillna(0)
-    )
-    df['Precipitacao_volatilidade_7'] = df.groupby('Municipio')['Precipitacao'].transform(
-        lambda x: x.rolling(window=7, min_periods=1).std().fillna(0)
+    df = calcular_features(
+        df,
+        nomes=features,
+        historico=historico,
+        limites_geograficos=limites_geograficos,
+        janelas_calendario=janelas_calendario,
+        cubo=cubo,
+        coluna_grupo=coluna_grupo,
     )
 
-    # ===== FEATURES DE EXTREMOS =====
-    # Essas features capturam os valores extremos (máximos e mínimos) em janelas de tempo específicas.
-    # O valor máximo do Risco de Fogo em 14 dias nos mostra o pior cenário possível em um Município,
-    # ajudando o modelo a identificar períodos críticos de risco elevado.
-    # O valor mínimo de Precipitação em 7 dias indica períodos de seca, que são condições favoráveis
-    # para o surgimento e propagação de queimadas.
-    df['RiscoFogo_max_14'] = df.groupby('Municipio')['RiscoFogo'].transform(
-        lambda x: x.rolling(window=14, min_periods=1).max()
-    )
-    df['Precipitacao_min_7'] = df.groupby('Municipio')['Precipitacao'].transform(
-        lambda x: x.rolling(window=7, min_periods=1).min()
-    )
-
-    # ===== FEATURES DE ACUMULAÇÃO =====
-    # A acumulação de Precipitação em períodos específicos nos permite entender quanto total de chuva
-    # caiu em um Município ao longo de dias ou meses.
-    # Com uma janela de 7 dias, capturamos o impacto das chuvas recentes na umidade do solo e vegetação.
-    # Com uma janela de 30 dias, capturamos a tendência de precipitação em um período mais longo,
-    # que afeta a disponibilidade de água e a ressecação da vegetação, influenciando o risco de queimadas.
-    df['Precipitacao_acumulada_7'] = df.groupby('Municipio')['Precipitacao'].transform(
-        lambda x: x.rolling(window=7, min_periods=1).sum()
-    )
-    df['Precipitacao_acumulada_30'] = df.groupby('Municipio')['Precipitacao'].transform(
-        lambda x: x.rolling(window=30, min_periods=1).sum()
-    )
-    
     logger.info(f"✓ Features avançadas criadas com sucesso! Total: {df.shape[1]}")
     
     return df
\ No newline at end of file
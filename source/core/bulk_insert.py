@@ -0,0 +1,425 @@
+"""
+Bulk loading of DataFrames into database tables.
+
+PostgreSQL tables are loaded with ``COPY ... FROM STDIN`` fed by an in-memory CSV buffer when the
+DBAPI is psycopg2 (the only driver whose cursor has ``copy_expert``). Other drivers, such as the
+asyncpg adaptor reached through ``AsyncConnection.run_sync``, and other dialects (SQLite for local
+runs and tests) fall back to batched multi-row INSERTs.
+``bulk_insert_async`` does the same on an async connection, using asyncpg's binary
+``copy_records_to_table`` on PostgreSQL.
+
+``bulk_upsert``/``bulk_upsert_async`` replace rows that already exist for a unique key: on
+PostgreSQL the rows are copied into a temporary staging table and merged with
+``INSERT ... SELECT ... ON CONFLICT DO UPDATE``; SQLite appends the same clause to its batches.
+"""
+import io
+import sqlite3
+import time
+from typing import TYPE_CHECKING
+
+import pandas as pd
+from sqlalchemy import Column, Connection, Date, DateTime, Engine, Float, Integer, MetaData, Numeric, Table, text
+
+from source.resources.logging import get_logger
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncConnection
+
+
+logger = get_logger()
+
+# Rows serialized into the CSV buffer per COPY statement.
+COPY_BATCH_ROWS = 100_000
+
+# Dialects with ``INSERT ... ON CONFLICT``, the only ones ``bulk_upsert`` can load.
+UPSERT_DIALECTS = ("postgresql", "sqlite")
+
+# SQLite limits the number of bound parameters per statement (999 before 3.32, 32766 after).
+SQLITE_MAX_VARIABLES = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+
+# Bound parameters per INSERT on the other dialects (asyncpg accepts at most 32767).
+MAX_BIND_PARAMETERS = 32767
+
+
+def _log_load(table_name: str, rows: int, start: float) -> None:
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"{rows} linhas inseridas em {table_name} em {elapsed:.3f}s "
+        f"({rows / elapsed if elapsed > 0 else float('inf'):,.0f} linhas/s)"
+    )
+
+
+def _match_columns(df: pd.DataFrame, table: Table) -> dict[str, str]:
+    """
+    Map DataFrame columns to table columns by name.
+
+    PostgreSQL folds unquoted identifiers to lower case (``Ano`` becomes ``ano``),
+    so the comparison is case-insensitive. DataFrame columns without a matching
+    table column are left out of the load.
+    """
+    table_columns = {column.name.lower(): column.name for column in table.columns}
+    matched = {
+        column: table_columns[str(column).lower()]
+        for column in df.columns
+        if str(column).lower() in table_columns
+    }
+
+    ignored = [column for column in df.columns if column not in matched]
+    if ignored:
+        logger.debug(f"Colunas ignoradas na carga de {table.name}: {ignored}")
+
+    if not matched:
+        raise ValueError(f"Nenhuma coluna do DataFrame corresponde às colunas da tabela {table.name}.")
+
+    return matched
+
+
+def _typed(df: pd.DataFrame, table: Table, columns: dict[str, str]) -> pd.DataFrame:
+    """
+    The matched columns of ``df`` cast to the types of their table columns, for the load paths that
+    do not coerce values: integer columns become ``Int64``, float columns ``float64`` and date columns
+    ``datetime.date`` objects.
+    """
+    typed = {}
+    for df_column, table_column in columns.items():
+        series = df[df_column]
+        column_type = table.c[table_column].type
+
+        if isinstance(column_type, Integer):
+            series = series.astype("Int64")
+        elif isinstance(column_type, (Float, Numeric)):
+            series = series.astype("float64")
+        elif isinstance(column_type, Date) and not isinstance(column_type, DateTime):
+            series = pd.to_datetime(series).dt.date
+
+        typed[df_column] = series
+
+    return pd.DataFrame(typed, index=df.index)
+
+
+def _copy_postgres(conn: Connection, df: pd.DataFrame, table: Table, columns: dict[str, str]) -> None:
+    preparer = conn.dialect.identifier_preparer
+    column_list = ", ".join(preparer.quote(name) for name in columns.values())
+    sql = (
+        f"COPY {preparer.format_table(table)} ({column_list}) "
+        "FROM STDIN WITH (FORMAT csv, NULL '')"
+    )
+
+    # COPY parses the CSV text with the column types: an integer column that became float64 in pandas
+    # (e.g. a group with only missing values) would be written as ``5.0`` and rejected.
+    data = _typed(df, table, columns)
+    # Raw DBAPI cursor on the same connection, so the COPY runs inside the caller's transaction.
+    cursor = conn.connection.cursor()
+    try:
+        for start in range(0, len(data), COPY_BATCH_ROWS):
+            buffer = io.StringIO()
+            data.iloc[start:start + COPY_BATCH_ROWS].to_csv(buffer, index=False, header=False, na_rep='')
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+    finally:
+        cursor.close()
+
+
+def _supports_copy(conn: Connection) -> bool:
+    """``COPY ... FROM STDIN`` through ``cursor.copy_expert`` needs PostgreSQL with psycopg2."""
+    return conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2"
+
+
+def _insert_batches(
+    conn: Connection,
+    df: pd.DataFrame,
+    table: Table,
+    columns: dict[str, str],
+    on_conflict: str = "",
+) -> None:
+    # The Core insert binds through the driver's own types (asyncpg does not coerce strings), the
+    # SQLite statement below stores whatever it receives.
+    data = _typed(df, table, columns) if conn.dialect.name != "sqlite" else df[list(columns)]
+    # NaN/NaT -> None so the driver stores NULL.
+    data = data.astype(object).where(data.notna(), None)
+
+    if conn.dialect.name != "sqlite":
+        records = data.rename(columns=columns).to_dict(orient="records")
+        batch_rows = min(5000, max(1, MAX_BIND_PARAMETERS // len(columns)))
+        for start in range(0, len(records), batch_rows):
+            conn.execute(table.insert().values(records[start:start + batch_rows]))
+        return
+
+    # SQLite: the multi-row statement is built once per batch size and sent straight to the
+    # DBAPI cursor, since compiling a Core insert with thousands of parameters dominates the load.
+    preparer = conn.dialect.identifier_preparer
+    column_list = ", ".join(preparer.quote(name) for name in columns.values())
+    row_placeholder = "(" + ", ".join("?" * len(columns)) + ")"
+    batch_rows = max(1, SQLITE_MAX_VARIABLES // len(columns))
+
+    values = data.to_numpy()
+    cursor = conn.connection.cursor()
+    try:
+        for start in range(0, len(values), batch_rows):
+            batch = values[start:start + batch_rows]
+            cursor.execute(
+                f"INSERT INTO {preparer.format_table(table)} ({column_list}) "
+                f"VALUES {', '.join([row_placeholder] * len(batch))}{on_conflict}",
+                batch.ravel().tolist(),
+            )
+    finally:
+        cursor.close()
+
+
+def bulk_insert(bind: Engine | Connection, df: pd.DataFrame, table_name: str) -> int:
+    """
+    Append ``df`` to ``table_name``, matching columns by name.
+
+    Args:
+        bind: Synchronous engine (the load runs in its own transaction) or a connection
+            (the load joins the connection's current transaction and is not committed here).
+        df: DataFrame to load. Extra columns are ignored and missing columns are stored as NULL.
+        table_name: Destination table (must already exist).
+
+    Returns:
+        int: Number of rows loaded.
+    """
+    if df.empty:
+        return 0
+
+    if isinstance(bind, Engine):
+        with bind.begin() as conn:
+            return bulk_insert(conn, df, table_name)
+
+    table = Table(table_name, MetaData(), autoload_with=bind)
+    columns = _match_columns(df, table)
+
+    start = time.perf_counter()
+
+    if _supports_copy(bind):
+        _copy_postgres(bind, df, table, columns)
+    else:
+        _insert_batches(bind, df, table, columns)
+
+    _log_load(table_name, len(df), start)
+
+    return len(df)
+
+
+def _records(df: pd.DataFrame, table: Table, columns: dict[str, str]) -> list[tuple]:
+    """
+    Rows of ``df`` as tuples of Python values typed for the binary COPY protocol, which does not
+    coerce: integer columns get ``int``, float columns ``float`` and missing values ``None``.
+    """
+    typed = _typed(df, table, columns)
+
+    return list(zip(*(
+        typed[column].astype(object).where(typed[column].notna(), None).tolist()
+        for column in columns
+    )))
+
+
+async def bulk_insert_async(conn: "AsyncConnection", df: pd.DataFrame, table_name: str) -> int:
+    """
+    Async version of ``bulk_insert``: append ``df`` to ``table_name`` inside the connection's
+    current transaction (not committed here).
+
+    On PostgreSQL with asyncpg the rows are sent with ``copy_records_to_table`` (binary COPY).
+    Other dialects run the synchronous ``bulk_insert`` on the underlying connection.
+
+    Returns:
+        int: Number of rows loaded.
+    """
+    if df.empty:
+        return 0
+
+    if conn.dialect.name != "postgresql" or conn.dialect.driver != "asyncpg":
+        return await conn.run_sync(lambda sync_conn: bulk_insert(sync_conn, df, table_name))
+
+    # The reflection runs queries on the connection, which also opens the transaction the COPY joins.
+    table = await conn.run_sync(lambda sync_conn: Table(table_name, MetaData(), autoload_with=sync_conn))
+    columns = _match_columns(df, table)
+
+    raw_connection = await conn.get_raw_connection()
+    driver_connection = raw_connection.driver_connection
+
+    start = time.perf_counter()
+
+    for batch_start in range(0, len(df), COPY_BATCH_ROWS):
+        await driver_connection.copy_records_to_table(
+            table.name,
+            records=_records(df.iloc[batch_start:batch_start + COPY_BATCH_ROWS], table, columns),
+            columns=list(columns.values()),
+            schema_name=table.schema,
+        )
+
+    _log_load(table_name, len(df), start)
+
+    return len(df)
+
+
+def check_upsert_dialect(dialect_name: str) -> None:
+    """Raise ``ValueError`` when ``bulk_upsert`` cannot load into this dialect."""
+    if dialect_name not in UPSERT_DIALECTS:
+        raise ValueError(
+            f"Upsert não suportado no banco '{dialect_name}', use um destes: {', '.join(UPSERT_DIALECTS)}."
+        )
+
+
+def _unique_rows(df: pd.DataFrame, key: tuple[str, ...]) -> pd.DataFrame:
+    """
+    Keep the last row of each key: a single ``ON CONFLICT DO UPDATE`` statement cannot touch
+    the same row twice.
+    """
+    lower = {str(column).lower(): column for column in df.columns}
+    subset = [lower[column.lower()] for column in key]
+
+    duplicated = df.duplicated(subset=subset, keep="last")
+    if duplicated.any():
+        logger.warning(f"{int(duplicated.sum())} linhas com a chave {key} repetida, mantida a última.")
+        df = df.loc[~duplicated]
+
+    return df
+
+
+def _on_conflict(conn: Connection, columns: dict[str, str], key: tuple[str, ...]) -> str:
+    """``ON CONFLICT (key) DO UPDATE`` clause that overwrites every loaded non-key column."""
+    preparer = conn.dialect.identifier_preparer
+    table_columns = {name.lower(): name for name in columns.values()}
+
+    missing = [column for column in key if column.lower() not in table_columns]
+    if missing:
+        raise ValueError(f"Colunas da chave ausentes no DataFrame: {missing}")
+
+    key_columns = [preparer.quote(table_columns[column.lower()]) for column in key]
+    updates = [
+        f"{preparer.quote(name)} = excluded.{preparer.quote(name)}"
+        for name in columns.values()
+        if name.lower() not in {column.lower() for column in key}
+    ]
+
+    action = f"DO UPDATE SET {', '.join(updates)}" if updates else "DO NOTHING"
+    return f" ON CONFLICT ({', '.join(key_columns)}) {action}"
+
+
+def _staging_table(table: Table, columns: dict[str, str]) -> Table:
+    """Temporary table with the loaded columns of ``table``, used to merge a COPY into it."""
+    return Table(
+        f"_carga_{table.name}",
+        MetaData(),
+        *(Column(column.name, column.type) for column in table.columns if column.name in columns.values()),
+    )
+
+
+def _merge_sql(conn: Connection, table: Table, staging: Table, columns: dict[str, str], key: tuple[str, ...]) -> dict[str, str]:
+    preparer = conn.dialect.identifier_preparer
+    column_list = ", ".join(preparer.quote(name) for name in columns.values())
+
+    return {
+        "create": (
+            f"CREATE TEMPORARY TABLE {preparer.format_table(staging)} AS "
+            f"SELECT {column_list} FROM {preparer.format_table(table)} WITH NO DATA"
+        ),
+        "merge": (
+            f"INSERT INTO {preparer.format_table(table)} ({column_list}) "
+            f"SELECT {column_list} FROM {preparer.format_table(staging)}"
+            f"{_on_conflict(conn, columns, key)}"
+        ),
+        "drop": f"DROP TABLE {preparer.format_table(staging)}",
+    }
+
+
+def bulk_upsert(
+    bind: Engine | Connection,
+    df: pd.DataFrame,
+    table_name: str,
+    chave: tuple[str, ...],
+) -> int:
+    """
+    Load ``df`` into ``table_name``, replacing the rows that already exist for ``chave``.
+
+    Args:
+        bind: Synchronous engine or connection, as in ``bulk_insert``.
+        df: DataFrame to load. When a key appears more than once the last row is kept.
+        table_name: Destination table, with a unique constraint on ``chave``.
+        chave: Columns of the unique key.
+
+    Returns:
+        int: Number of rows loaded.
+
+    Raises:
+        ValueError: The dialect is not in ``UPSERT_DIALECTS``.
+    """
+    if df.empty:
+        return 0
+
+    if isinstance(bind, Engine):
+        with bind.begin() as conn:
+            return bulk_upsert(conn, df, table_name, chave)
+
+    check_upsert_dialect(bind.dialect.name)
+
+    df = _unique_rows(df, chave)
+    table = Table(table_name, MetaData(), autoload_with=bind)
+    columns = _match_columns(df, table)
+
+    start = time.perf_counter()
+
+    if bind.dialect.name == "postgresql":
+        staging = _staging_table(table, columns)
+        sql = _merge_sql(bind, table, staging, columns, chave)
+
+        bind.execute(text(sql["create"]))
+        if _supports_copy(bind):
+            _copy_postgres(bind, df, staging, columns)
+        else:
+            _insert_batches(bind, df, staging, columns)
+        bind.execute(text(sql["merge"]))
+        bind.execute(text(sql["drop"]))
+    else:
+        _insert_batches(bind, df, table, columns, on_conflict=_on_conflict(bind, columns, chave))
+
+    _log_load(table_name, len(df), start)
+
+    return len(df)
+
+
+async def bulk_upsert_async(
+    conn: "AsyncConnection",
+    df: pd.DataFrame,
+    table_name: str,
+    chave: tuple[str, ...],
+) -> int:
+    """
+    Async version of ``bulk_upsert``, inside the connection's current transaction.
+
+    On PostgreSQL with asyncpg the staging table is filled with ``copy_records_to_table``.
+
+    Returns:
+        int: Number of rows loaded.
+    """
+    if df.empty:
+        return 0
+
+    if conn.dialect.name != "postgresql" or conn.dialect.driver != "asyncpg":
+        return await conn.run_sync(lambda sync_conn: bulk_upsert(sync_conn, df, table_name, chave))
+
+    df = _unique_rows(df, chave)
+    table = await conn.run_sync(lambda sync_conn: Table(table_name, MetaData(), autoload_with=sync_conn))
+    columns = _match_columns(df, table)
+    staging = _staging_table(table, columns)
+    sql = await conn.run_sync(lambda sync_conn: _merge_sql(sync_conn, table, staging, columns, chave))
+
+    start = time.perf_counter()
+
+    await conn.execute(text(sql["create"]))
+
+    driver_connection = (await conn.get_raw_connection()).driver_connection
+    for batch_start in range(0, len(df), COPY_BATCH_ROWS):
+        await driver_connection.copy_records_to_table(
+            staging.name,
+            records=_records(df.iloc[batch_start:batch_start + COPY_BATCH_ROWS], table, columns),
+            columns=list(columns.values()),
+        )
+
+    await conn.execute(text(sql["merge"]))
+    await conn.execute(text(sql["drop"]))
+
+    _log_load(table_name, len(df), start)
+
+    return len(df)
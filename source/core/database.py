@@ -1,50 +1,113 @@
 """
 Database configuration and session management.
+
+Nothing is created at import time: the engines and the session factory are built on first
+use and cached, one of each per process. A process forked after the engine was created
+(e.g. a ProcessPoolExecutor worker) builds its own engine instead of reusing the parent's
+pooled connections.
 """
-from typing import AsyncGenerator
+import os
+import threading
+from typing import TYPE_CHECKING, AsyncGenerator
 
 from sqlalchemy import Engine, create_engine
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from source.core.settings import settings
 from source.models.base_model import Base
+from source.resources.logging import get_logger
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+
+logger = get_logger()
+
+_lock = threading.Lock()
+_sync_engine: Engine | None = None
+_async_engine: "AsyncEngine | None" = None
+_async_session_factory: "async_sessionmaker[AsyncSession] | None" = None
+_pid: int | None = None
+
+
+def _use_test_db() -> bool:
+    return settings.ENVIRONMENT.upper() == "TEST"
+
 
+def _reset_after_fork():
+    """Drop engines inherited from another process without closing the parent's connections."""
+    global _sync_engine, _async_engine, _async_session_factory, _pid
 
-# Build database URL from separate parameters
-_database_url = settings.get_database_url(
-    async_driver=True,
-    use_test_db=(settings.ENVIRONMENT.upper() == "TEST")
-)
+    if _pid == os.getpid():
+        return
 
-print("\nDatabase URL:", _database_url)
+    if _sync_engine is not None:
+        _sync_engine.dispose(close=False)
 
-# Create async ENGINE
-async_engine = create_async_engine(
-    _database_url,
-    echo=settings.DATABASE_ECHO,
-    future=True,
-    pool_pre_ping=True,
-)
+    _sync_engine = None
+    _async_engine = None
+    _async_session_factory = None
+    _pid = os.getpid()
 
-# Create async SESSION factory
-AsyncSessionLocal = async_sessionmaker(
-    async_engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autocommit=False,
-    autoflush=False,
-)
 
 # ====
-# ASYNC DATABASE SESSION
+# ASYNC DATABASE ENGINE / SESSION
 # ====
 
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
+def get_async_engine() -> "AsyncEngine":
+    """
+    Return the process-wide async engine, creating it on first use.
+    """
+    global _async_engine
+
+    with _lock:
+        _reset_after_fork()
+
+        if _async_engine is None:
+            # Imported here: sqlalchemy.ext.asyncio pulls in the ORM and greenlet.
+            from sqlalchemy.ext.asyncio import create_async_engine
+
+            database_url = settings.get_database_url(async_driver=True, use_test_db=_use_test_db())
+            logger.debug(f"Creating async engine: {database_url}")
+
+            _async_engine = create_async_engine(
+                database_url,
+                echo=settings.DATABASE_ECHO,
+                future=True,
+                pool_pre_ping=True,
+            )
+
+        return _async_engine
+
+
+def get_async_sessionmaker() -> "async_sessionmaker[AsyncSession]":
+    """
+    Return the process-wide async session factory, bound to ``get_async_engine()``.
+    """
+    global _async_session_factory
+
+    engine = get_async_engine()
+
+    with _lock:
+        if _async_session_factory is None:
+            from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+            _async_session_factory = async_sessionmaker(
+                engine,
+                class_=AsyncSession,
+                expire_on_commit=False,
+                autocommit=False,
+                autoflush=False,
+            )
+
+        return _async_session_factory
+
+
+async def get_db() -> AsyncGenerator["AsyncSession", None]:
     """
     For database sessions.
     """
-    async with AsyncSessionLocal() as session:
+    async with get_async_sessionmaker()() as session:
         try:
             yield session
             await session.commit()
@@ -60,17 +123,33 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
 # ====
 def get_sync_engine() -> Engine:
     """
-    Create synchronous engine.
+    Return the process-wide synchronous engine (and its connection pool), creating it on first use.
     """
-    _database_url = settings.get_database_url(
-        async_driver=False,
-        use_test_db=(settings.ENVIRONMENT.upper() == "TEST")
-    )
-    return create_engine(
-        _database_url,
-        echo=settings.DATABASE_ECHO,
-        pool_pre_ping=True,
-    )
+    global _sync_engine
+
+    with _lock:
+        _reset_after_fork()
+
+        if _sync_engine is None:
+            database_url = settings.get_database_url(async_driver=False, use_test_db=_use_test_db())
+            logger.debug(f"Creating sync engine: {database_url}")
+
+            _sync_engine = create_engine(
+                database_url,
+                echo=settings.DATABASE_ECHO,
+                pool_pre_ping=True,
+            )
+
+        return _sync_engine
+
+
+def __getattr__(name: str):
+    # Module attributes kept for existing imports, now resolved lazily.
+    if name == "async_engine":
+        return get_async_engine()
+    if name == "AsyncSessionLocal":
+        return get_async_sessionmaker()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # ====
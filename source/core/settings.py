@@ -1,5 +1,6 @@
 import __main__
 from pathlib import Path
+from typing import Literal, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 from sqlalchemy.engine.url import URL
@@ -8,18 +9,13 @@ from datetime import datetime
 
 
 def get_project_root():
-    p = Path(__file__).resolve()
-    for parent in p.parents:
-        if (parent / "pyproject.toml").exists():
-            root = parent
-            break
-    else:
+    # Este arquivo fica em <raiz>/source/core/settings.py, então a raiz é conhecida sem percorrer
+    # as pastas. Quando o pacote é usado fora do repositório (sem o pyproject.toml) vale a pasta atual.
+    root = Path(__file__).resolve().parents[2]
+
+    if not (root / "pyproject.toml").exists():
         root = Path.cwd()
-            
-    data_dir = root / "data"
-    if not data_dir.exists():
-        print(f"⚠️  Aviso: A pasta 'data/' não foi encontrada em {root}")
-            
+
     return root
 
 PROJECT_ROOT = get_project_root()
@@ -41,7 +37,44 @@ class Settings(BaseSettings):
     ENVIRONMENT: str = Field(default="development", description="Environment (development, production, test)")
     
     PATH_ARQUIVOS_CSV: str = Field(default=str(PROJECT_ROOT / "data/"), description="Path to CSV files")
+
+    # Ingestion
+    INGESTAO_STREAMING: bool = Field(default=False, description="Read, clean and aggregate each CSV in chunks instead of loading it whole")
+    INGESTAO_MEMORIA_MB: int = Field(default=512, gt=0, description="Memory budget (MB) used to size the streaming chunks")
+    INGESTAO_WORKERS: int = Field(default=1, ge=1, description="Number of processes used to ingest CSV files in parallel (1 = sequential)")
+    INGESTAO_ASYNC: bool = Field(default=False, description="Overlap parsing/feature engineering with database writes using asyncio and the async engine (requires FEATURES_INCREMENTAIS)")
+    INGESTAO_FILA: int = Field(default=2, ge=1, description="Max processed files waiting to be written in the async ingestion queue")
+    CACHE_PARQUET: bool = Field(default=False, description="Read CSVs through a typed Parquet cache (written on first read)")
+    PATH_CACHE_PARQUET: str = Field(default=str(PROJECT_ROOT / "data/cache/"), description="Path to the Parquet cache files")
+    DEDUP_FOCOS: bool = Field(default=False, description="Merge detections of the same fire reported by different satellites before aggregation")
+    DEDUP_DISTANCIA_KM: float = Field(default=1.0, gt=0, description="Max distance (km) between two detections of the same fire")
+    DEDUP_JANELA_MINUTOS: float = Field(default=60, gt=0, description="Max time difference (minutes) between two detections of the same fire")
+    AGREGACAO_GRADE: bool = Field(default=False, description="Aggregate detections by (Data, grid cell) into dados_grade instead of by (Data, Municipio)")
+    GRADE_TAMANHO_GRAUS: float = Field(default=0.1, gt=0, description="Side of each regular lat/lon grid cell, in degrees")
+    MEMORIA_ENXUTA: bool = Field(default=False, description="Memory-lean mode: categorical text, float32 features, small-int calendar columns and pandas copy-on-write")
+    FEATURES_INCREMENTAIS: bool = Field(default=False, description="Compute features only for new rows, using the saved per-municipality window state")
+    JANELAS_CALENDARIO: bool = Field(default=False, description="Rolling windows measured in calendar days on a dense municipality x day cube instead of in records")
+    SALVAR_CUBO_DIARIO: bool = Field(default=False, description="Save the municipality x day cube of a full JANELAS_CALENDARIO load to PATH_CUBO_DIARIO after the data is written")
+    PATH_CUBO_DIARIO: str = Field(default=str(PROJECT_ROOT / "data/cubo/"), description="Path to the saved municipality x day cube of the last full load")
     
+    # Profiling
+    PERFIL_ATIVO: bool = Field(default=False, description="Record nested timing/rows/memory spans and write a report at the end of the run")
+    PERFIL_TRACEMALLOC: bool = Field(default=False, description="Also track the tracemalloc peak of each span (slower)")
+    PATH_PERFIL: str = Field(default=str(PROJECT_ROOT / "data/perfil/"), description="Path to the profiling reports")
+
+    # Training
+    TREINO_MODELO: Literal["hgb", "sgd"] = Field(default="hgb", description="hgb: gradient boosting on a pre-binned uint8 matrix, sgd: incremental SGDClassifier.partial_fit")
+    TREINO_LINHAS_POR_LOTE: int = Field(default=65_536, gt=0, description="Rows per batch read from dados_csv")
+    TREINO_FRACAO_VALIDACAO: float = Field(default=0.2, gt=0, lt=1, description="Most recent fraction of the period used for validation")
+    TREINO_DATA_CORTE: Optional[str] = Field(default=None, description="First validation date (YYYY-MM-DD), overrides TREINO_FRACAO_VALIDACAO")
+    TREINO_MAX_BINS: int = Field(default=255, ge=3, le=255, description="Bins per feature of the uint8 matrix (the last one holds missing values)")
+    TREINO_MEMORIA_MB: int = Field(default=1024, gt=0, description="Memory budget (MB) of the hgb fit, training rows are subsampled above it")
+    TREINO_ITERACOES: int = Field(default=200, gt=0, description="Boosting iterations (hgb)")
+    TREINO_EPOCAS: int = Field(default=1, gt=0, description="Passes over the training batches (sgd)")
+    TREINO_SEED: int = Field(default=42, description="Seed of the sampling and of the estimators")
+    PATH_MODELOS: str = Field(default=str(PROJECT_ROOT / "data/modelos/"), description="Path to the trained models and their reports")
+    PATH_ARMAZEM_FEATURES: str = Field(default=str(PROJECT_ROOT / "data/features/"), description="Path to the memory-mapped feature store (one .npy file per column)")
+
     # Logging
     LOG_LEVEL: str = Field(default="INFO", description="Logging level")
     LOG_TO_FILE: bool = Field(default=False, description="Enable file logging (defaults to console only)")
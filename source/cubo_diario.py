@@ -0,0 +1,345 @@
+"""
+    Cubo diário: uma matriz densa (municípios x dias do calendário) por coluna, com a máscara dos dias
+    que têm registro. Com ele as janelas móveis (´JANELAS_CALENDARIO´) medem dias do calendário, e não
+    registros: a janela de 7 dias de um município sem focos em alguns dias cobre só os últimos 7 dias,
+    em vez dos últimos 7 registros (que podem estar espalhados por semanas).
+
+    As janelas são calculadas para todos os municípios ao mesmo tempo, ao longo do eixo dos dias:
+    - soma, média e desvio padrão pela diferença de somas acumuladas (uma soma acumulada por coluna,
+      usada por todos os tamanhos de janela);
+    - mínimo e máximo pelo algoritmo de van Herk/Gil-Werman (mínimos acumulados em blocos do tamanho
+      da janela, nos dois sentidos), que custa O(1) por dia como a fila monotônica, mas vetorizado.
+    - delta: valor do dia menos o valor de ´janela - 1´ dias antes (NaN se um dos dois dias não tem registro).
+
+    A matriz de cada janela existe somente enquanto ela é calculada: logo em seguida são lidas as
+    posições (município, dia) das linhas pedidas e a matriz é descartada.
+
+    O cubo pode ser gravado para reutilização (´salvar´, ativado na carga com ´SALVAR_CUBO_DIARIO´).
+    Estrutura da pasta gravada:
+        meta.json         colunas, municípios (o índice é a linha da matriz), primeiro dia e número de dias
+        mascara.npy       dias com registro (bool, municípios x dias)
+        <coluna>.npy      valores da coluna (float64, NaN nos dias sem registro)
+"""
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from source.features_moveis import FUNCOES_SUPORTADAS, JanelaMovel
+from source.resources.logging import get_logger
+from source.resources.perfil import perfilado
+
+
+logger = get_logger()
+
+ARQUIVO_META = "meta.json"
+
+
+def _somas_acumuladas(valores: np.ndarray) -> np.ndarray:
+    """Soma acumulada ao longo dos dias, com uma coluna de zeros no início."""
+    acumulada = np.zeros((valores.shape[0], valores.shape[1] + 1), dtype=np.float64)
+    np.cumsum(valores, axis=1, out=acumulada[:, 1:])
+    return acumulada
+
+
+def _na_janela(acumulada: np.ndarray, tamanho: int) -> np.ndarray:
+    """Soma de cada janela de ´tamanho´ dias (terminando no dia) a partir da soma acumulada."""
+    janela = acumulada[:, 1:].copy()
+    # Nos primeiros ´tamanho´ dias a janela começa no primeiro dia do cubo (soma acumulada 0).
+    janela[:, tamanho:] -= acumulada[:, 1:acumulada.shape[1] - tamanho]
+    return janela
+
+
+def _minimo_movel(valores: np.ndarray, tamanho: int) -> np.ndarray:
+    """
+        Mínimo de cada janela de ´tamanho´ dias (van Herk/Gil-Werman). Os dias são divididos em blocos
+        de ´tamanho´ dias: uma janela começa no bloco b e termina no bloco b + 1, então o mínimo dela
+        é o mínimo do sufixo do bloco b e do prefixo do bloco b + 1.
+    """
+    linhas, dias = valores.shape
+    anteriores = tamanho - 1
+    blocos = -(-(anteriores + dias) // tamanho)
+
+    estendido = np.full((linhas, blocos * tamanho), np.inf)
+    estendido[:, anteriores:anteriores + dias] = valores
+    em_blocos = estendido.reshape(linhas, blocos, tamanho)
+
+    prefixo = np.minimum.accumulate(em_blocos, axis=2).reshape(linhas, -1)
+    sufixo = np.minimum.accumulate(em_blocos[:, :, ::-1], axis=2)[:, :, ::-1].reshape(linhas, -1)
+
+    return np.minimum(sufixo[:, :dias], prefixo[:, anteriores:anteriores + dias])
+
+
+class CuboDiario:
+    """
+        Matrizes (municípios x dias) das colunas de um DataFreme com um registro por município e dia.
+        O dia ´d´ da matriz é a data ´inicio + d´.
+    """
+
+    def __init__(self, municipios: pd.Index, inicio: np.datetime64, valores: dict[str, np.ndarray], mascara: np.ndarray):
+        self.municipios = municipios
+        self.inicio = np.datetime64(inicio, 'D')
+        self.valores = valores
+        self.mascara = mascara
+
+    @property
+    def dias(self) -> int:
+        return self.mascara.shape[1]
+
+    @property
+    def datas(self) -> np.ndarray:
+        return self.inicio + np.arange(self.dias)
+
+    @classmethod
+    @perfilado
+    def construir(
+        cls,
+        df: pd.DataFrame,
+        colunas: list[str],
+        historico: pd.DataFrame | None = None,
+        dias_anteriores: int | None = None,
+        coluna_grupo: str = 'Municipio',
+        coluna_data: str = 'Data',
+    ) -> "CuboDiario":
+        """
+            Monta o cubo com as ´colunas´ de ´df´ (e do ´historico´, quando informado), do primeiro ao
+            último dia dos dados.
+
+        Args:
+            df (pd.DataFrame): Um registro por município e dia (saída do ´agregar_por_dia_municipio´).
+            colunas (list[str]): Colunas guardadas no cubo.
+            historico (pd.DataFrame | None): Registros anteriores a ´df´, com as mesmas colunas.
+            dias_anteriores (int | None): Dias do histórico antes do primeiro dia de ´df´ que entram no
+                cubo (os que as janelas alcançam). None para o histórico inteiro.
+            coluna_grupo (str): Coluna do município.
+            coluna_data (str): Coluna da data.
+
+        Returns:
+            CuboDiario: Cubo com uma matriz float64 por coluna (NaN nos dias sem registro).
+        """
+        base = df[[coluna_grupo, coluna_data, *colunas]]
+
+        if historico is not None and not historico.empty:
+            historico = historico[[coluna_grupo, coluna_data, *colunas]]
+            if dias_anteriores is not None and not df.empty:
+                primeiro_dia = pd.to_datetime(df[coluna_data]).min() - pd.Timedelta(days=dias_anteriores)
+                historico = historico.loc[pd.to_datetime(historico[coluna_data]) >= primeiro_dia]
+            base = pd.concat([historico, base], ignore_index=True)
+
+        codigos, municipios = pd.factorize(base[coluna_grupo].astype(object), sort=True)
+        datas = pd.to_datetime(base[coluna_data]).to_numpy('datetime64[D]')
+        inicio = datas.min() if len(datas) else np.datetime64('1970-01-01', 'D')
+        dia = (datas - inicio).astype(np.int64)
+        dias = int(dia.max()) + 1 if len(dia) else 0
+
+        if (codigos < 0).any():
+            raise ValueError(f"Existem linhas sem {coluna_grupo}, elas não têm lugar no cubo diário.")
+
+        mascara = np.zeros((len(municipios), dias), dtype=bool)
+        mascara[codigos, dia] = True
+
+        if mascara.sum() != len(base):
+            raise ValueError(f"O cubo diário precisa de um único registro por {coluna_grupo} e dia.")
+
+        valores = {}
+        for coluna in colunas:
+            matriz = np.full((len(municipios), dias), np.nan)
+            matriz[codigos, dia] = pd.to_numeric(base[coluna]).to_numpy(dtype=np.float64, na_value=np.nan)
+            valores[coluna] = matriz
+
+        logger.info(f"Cubo diário: {len(municipios)} municípios x {dias} dias, {mascara.mean():.1%} dos dias com registro.")
+
+        return cls(pd.Index(municipios), inicio, valores, mascara)
+
+    def posicoes(self, df: pd.DataFrame, coluna_grupo: str = 'Municipio', coluna_data: str = 'Data') -> tuple[np.ndarray, np.ndarray]:
+        """
+            Linha (município) e dia do cubo de cada linha de ´df´.
+        """
+        linhas = self.municipios.get_indexer(df[coluna_grupo].astype(object))
+        dias = (pd.to_datetime(df[coluna_data]).to_numpy('datetime64[D]') - self.inicio).astype(np.int64)
+
+        fora = (linhas < 0) | (dias < 0) | (dias >= self.dias)
+        if fora.any():
+            raise ValueError(f"{int(fora.sum())} linhas estão fora do período ou dos municípios do cubo diário.")
+
+        return linhas, dias
+
+    def calcular_janelas(self, janelas: list[JanelaMovel], linhas: np.ndarray, dias: np.ndarray) -> dict[str, np.ndarray]:
+        """
+            Calcula as ´janelas´ em dias do calendário para todos os municípios e dias do cubo e devolve
+            somente os valores das posições (´linhas´, ´dias´), saída do ´posicoes´.
+            Os dias sem registro (e os valores nulos) não entram nas janelas; uma janela sem nenhum valor fica NaN.
+
+        Args:
+            janelas (list[JanelaMovel]): Janelas que devem ser calculadas (´janela´ em dias).
+            linhas (np.ndarray): Linha (município) do cubo de cada valor pedido.
+            dias (np.ndarray): Dia do cubo de cada valor pedido.
+
+        Returns:
+            dict[str, np.ndarray]: Valores de cada janela nas posições pedidas, pelo nome da janela.
+        """
+        for janela in janelas:
+            if janela.funcao not in FUNCOES_SUPORTADAS:
+                raise ValueError(f"Função '{janela.funcao}' não suportada na janela {janela.nome}.")
+            if janela.coluna not in self.valores:
+                raise ValueError(f"A coluna '{janela.coluna}' da janela {janela.nome} não está no cubo diário.")
+
+        resultado = {}
+
+        por_coluna: dict[str, list[JanelaMovel]] = {}
+        for janela in janelas:
+            por_coluna.setdefault(janela.coluna, []).append(janela)
+
+        for coluna, janelas_coluna in por_coluna.items():
+            valores = self.valores[coluna]
+            funcoes = {janela.funcao for janela in janelas_coluna}
+
+            # Dias sem registro e registros com valor nulo ficam fora das janelas.
+            validos = ~np.isnan(valores)
+            contagem = _somas_acumuladas(validos.astype(np.float64))
+            contagens: dict[int, np.ndarray] = {}
+
+            # As somas acumuladas usam os valores menos a média do município, assim elas ficam
+            # pequenas e a diferença entre duas somas perde menos precisão.
+            if funcoes & {'sum', 'mean', 'std'}:
+                with np.errstate(invalid='ignore'):
+                    centro = np.nan_to_num(np.nanmean(valores, axis=1))[:, None]
+                centrados = np.where(validos, valores - centro, 0.0)
+                soma = _somas_acumuladas(centrados)
+                quadrados = _somas_acumuladas(centrados * centrados) if 'std' in funcoes else None
+
+            for janela in janelas_coluna:
+                if janela.janela not in contagens:
+                    contagens[janela.janela] = _na_janela(contagem, janela.janela)
+                n = contagens[janela.janela]
+
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    if janela.funcao in ('sum', 'mean', 'std'):
+                        s = _na_janela(soma, janela.janela)
+
+                    if janela.funcao == 'sum':
+                        calculado = np.where(n > 0, s + centro * n, np.nan)
+                    elif janela.funcao == 'mean':
+                        calculado = s / n + centro
+                    elif janela.funcao == 'std':
+                        variancia = (_na_janela(quadrados, janela.janela) - s * s / n) / (n - 1)
+                        calculado = np.where(n > 1, np.sqrt(np.maximum(variancia, 0.0)), np.nan)
+                    elif janela.funcao == 'min':
+                        minimo = _minimo_movel(np.where(validos, valores, np.inf), janela.janela)
+                        calculado = np.where(n > 0, minimo, np.nan)
+                    elif janela.funcao == 'max':
+                        maximo = -_minimo_movel(np.where(validos, -valores, np.inf), janela.janela)
+                        calculado = np.where(n > 0, maximo, np.nan)
+                    else:
+                        anterior = np.full_like(valores, np.nan)
+                        anterior[:, janela.janela - 1:] = valores[:, :self.dias - (janela.janela - 1)]
+                        calculado = valores - anterior
+
+                # Somente as posições pedidas ficam, a matriz (municípios x dias) da janela é descartada.
+                resultado[janela.nome] = calculado[linhas, dias]
+                del calculado
+
+        return resultado
+
+    def salvar(self, pasta: Path):
+        """
+            Grava o cubo em ´pasta´ (um ´.npy´ por coluna). Os arquivos são gravados em uma pasta
+            temporária que substitui a anterior no final, como no armazém de features.
+        """
+        pasta = Path(pasta)
+        temporaria = pasta.with_name(f"{pasta.name}.{os.getpid()}.tmp")
+        shutil.rmtree(temporaria, ignore_errors=True)
+        temporaria.mkdir(parents=True)
+
+        np.save(temporaria / "mascara.npy", self.mascara)
+        for coluna, matriz in self.valores.items():
+            np.save(temporaria / f"{coluna}.npy", matriz)
+
+        meta = {
+            'colunas': list(self.valores),
+            'municipios': self.municipios.tolist(),
+            'inicio': str(self.inicio),
+            'dias': self.dias,
+        }
+        (temporaria / ARQUIVO_META).write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding='utf-8')
+
+        antiga = pasta.with_name(f"{pasta.name}.{os.getpid()}.old")
+        if pasta.exists():
+            os.replace(pasta, antiga)
+        os.replace(temporaria, pasta)
+        shutil.rmtree(antiga, ignore_errors=True)
+
+        logger.info(f"Cubo diário gravado em {pasta}: {len(self.municipios)} municípios x {self.dias} dias.")
+
+    @classmethod
+    def carregar(cls, pasta: Path) -> "CuboDiario":
+        """Abre um cubo gravado pelo ´salvar´, com as matrizes mapeadas em memória (somente leitura)."""
+        pasta = Path(pasta)
+        meta = json.loads((pasta / ARQUIVO_META).read_text(encoding='utf-8'))
+
+        return cls(
+            municipios=pd.Index(meta['municipios']),
+            inicio=np.datetime64(meta['inicio'], 'D'),
+            valores={coluna: np.load(pasta / f"{coluna}.npy", mmap_mode='r') for coluna in meta['colunas']},
+            mascara=np.load(pasta / "mascara.npy", mmap_mode='r'),
+        )
+
+
+@perfilado
+def calcular_janelas_calendario(
+    df: pd.DataFrame,
+    janelas: list[JanelaMovel],
+    coluna_grupo: str = 'Municipio',
+    coluna_data: str = 'Data',
+    historico: pd.DataFrame | None = None,
+    cubo: CuboDiario | None = None,
+) -> pd.DataFrame:
+    """
+        Mesmo resultado do ´calcular_janelas_moveis´, mas com as janelas em dias do calendário,
+        calculadas no cubo diário.
+
+    Args:
+        df (pd.DataFrame): DataFreme com as colunas usadas pelas janelas, um registro por município e dia.
+        janelas (list[JanelaMovel]): Features que devem ser calculadas (´janela´ em dias).
+        coluna_grupo (str): Coluna do município.
+        coluna_data (str): Coluna da data.
+        historico (pd.DataFrame | None): Registros anteriores a ´df´, usados somente para completar as
+            janelas dos primeiros dias. Não entram no resultado.
+        cubo (CuboDiario | None): Cubo já montado com ´df´ (e o histórico). Quando None, ou quando falta
+            alguma coluna das janelas, o cubo é montado aqui.
+
+    Returns:
+        pd.DataFrame: DataFreme com uma coluna por janela, no mesmo índice e ordem de ´df´.
+    """
+    resultado = pd.DataFrame(index=df.index)
+
+    if df.empty or not janelas:
+        return resultado.assign(**{janela.nome: np.nan for janela in janelas})
+
+    colunas = sorted({janela.coluna for janela in janelas})
+
+    if cubo is None or any(coluna not in cubo.valores for coluna in colunas):
+        cubo = CuboDiario.construir(
+            df,
+            colunas=colunas,
+            historico=historico,
+            dias_anteriores=max(janela.janela for janela in janelas) - 1,
+            coluna_grupo=coluna_grupo,
+            coluna_data=coluna_data,
+        )
+
+    linhas, dias = cubo.posicoes(df, coluna_grupo=coluna_grupo, coluna_data=coluna_data)
+    calculado = cubo.calcular_janelas(janelas, linhas=linhas, dias=dias)
+
+    for janela in janelas:
+        valores = calculado.pop(janela.nome)
+        if janela.preencher_nulos is not None:
+            valores = np.where(np.isnan(valores), janela.preencher_nulos, valores)
+        # Mesma regra do ´calcular_janelas_moveis´: float32 quando a coluna já é float32.
+        tipo_resultado = np.float32 if df[janela.coluna].dtype == np.float32 else np.float64
+        resultado[janela.nome] = valores.astype(tipo_resultado, copy=False)
+
+    return resultado[[janela.nome for janela in janelas]]
@@ -0,0 +1,213 @@
+"""
+    Deduplicação espaço-temporal dos focos vistos por mais de um satélite (´DEDUP_FOCOS´).
+
+    O mesmo fogo costuma ser detectado por vários satélites (coluna ´Satelite´) em coordenadas
+    próximas. Sem a deduplicação todas essas linhas entram na soma do FRP do ´agregar_por_dia_municipio´,
+    então o FRP do dia fica inflado pela quantidade de satélites que passaram sobre o fogo.
+
+    - Cada foco é colocado em uma célula de uma grade (lado de ´distancia_km´) e de uma faixa de tempo
+      (´janela_minutos´) dentro do dia. As células ficam em um índice de hash (as chaves inteiras
+      ordenadas), então os vizinhos de um foco são procurados somente na mesma célula e nas 26 células
+      vizinhas, e não em todos os focos do dia.
+    - Dois focos do mesmo dia, de satélites diferentes, a no máximo ´distancia_km´ (haversine) e
+      ´janela_minutos´ um do outro são o mesmo fogo. Os grupos são as componentes conexas desses pares.
+    - De cada grupo ficam somente os focos do satélite que mediu o maior FRP (somado). Focos do mesmo
+      satélite continuam separados, porque são pixels diferentes do fogo e o FRP deles deve ser somado.
+
+    Cada linha que fica recebe a procedência do grupo:
+        Deteccoes   focos do grupo que ela representa (ela mesma e os removidos, contados na primeira linha do grupo)
+        Satelites   satélites diferentes que viram o grupo
+"""
+import numpy as np
+import pandas as pd
+
+from source.resources.haversine import RAIO_TERRA_KM, dentro_do_raio
+from source.resources.logging import get_logger
+from source.resources.perfil import perfilado
+
+
+logger = get_logger()
+
+KM_POR_GRAU = np.pi * RAIO_TERRA_KM / 180
+
+# Colunas de procedência criadas pela deduplicação e como cada uma é agregada por dia e município.
+COLUNAS_PROCEDENCIA = {'Deteccoes': 'sum', 'Satelites': 'max'}
+
+# Deslocamentos (tempo, x, y) até as células vizinhas. Só metade das 26 vizinhas é procurada,
+# porque o par (a, b) é o mesmo par (b, a); a própria célula é o deslocamento (0, 0, 0).
+_DESLOCAMENTOS = [
+    (dt, dx, dy)
+    for dt in (-1, 0, 1) for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+    if (dt, dx, dy) >= (0, 0, 0)
+]
+
+
+def _pares_candidatos(chaves: np.ndarray, dimensoes: tuple[int, int, int]) -> tuple[np.ndarray, np.ndarray]:
+    """
+        Pares (i, j) de focos que estão na mesma célula ou em células vizinhas.
+
+    Args:
+        chaves (np.ndarray): Chave inteira da célula de cada foco (dia, tempo, x, y).
+        dimensoes (tuple[int, int, int]): Quantidade de faixas de tempo, x e y (já com uma borda
+            vazia de cada lado, assim uma célula vizinha nunca passa para outra faixa ou outro dia).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Índices dos dois focos de cada par.
+    """
+    _, nx, ny = dimensoes
+    ordem = np.argsort(chaves, kind='stable')
+    celulas, inicio, contagem = np.unique(chaves[ordem], return_index=True, return_counts=True)
+
+    primeiros, segundos = [], []
+
+    for dt, dx, dy in _DESLOCAMENTOS:
+        alvo = celulas + (dt * nx + dx) * ny + dy
+        posicao = np.minimum(np.searchsorted(celulas, alvo), len(celulas) - 1)
+        a = np.flatnonzero(celulas[posicao] == alvo)
+        b = posicao[a]
+
+        # Todos os pares entre os focos da célula ´a´ e os da célula ´b´.
+        na, nb = contagem[a], contagem[b]
+        pares = na * nb
+        celula_par = np.repeat(np.arange(len(a)), pares)
+        dentro = np.arange(pares.sum()) - np.repeat(np.cumsum(pares) - pares, pares)
+
+        i = inicio[a][celula_par] + dentro // nb[celula_par]
+        j = inicio[b][celula_par] + dentro % nb[celula_par]
+
+        if (dt, dx, dy) == (0, 0, 0):
+            # Na mesma célula cada par aparece duas vezes e cada foco com ele mesmo.
+            manter = i < j
+            i, j = i[manter], j[manter]
+
+        primeiros.append(ordem[i])
+        segundos.append(ordem[j])
+
+    return np.concatenate(primeiros), np.concatenate(segundos)
+
+
+def _grupos(total: int, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    """Componente conexa de cada foco, com os pares (i, j) como arestas."""
+    # Importado aqui: o scipy (dependência do scikit-learn) só é usado quando a deduplicação está ativa.
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    grafo = coo_matrix((np.ones(len(i), dtype=np.int8), (i, j)), shape=(total, total))
+    _, grupos = connected_components(grafo, directed=False)
+
+    return grupos
+
+
+@perfilado
+def deduplicar_focos(df: pd.DataFrame, distancia_km: float = 1.0, janela_minutos: float = 60) -> pd.DataFrame:
+    """
+        Remove os focos repetidos por satélites diferentes (ver o início do módulo).
+        Linhas sem coordenada, sem ´DataHora´ ou sem satélite não são comparadas e continuam como estão.
+
+    Args:
+        df (pd.DataFrame): Focos já preparados pelo ´preparar_dados´ (com a coluna ´Data´).
+        distancia_km (float): Distância máxima, em km, entre dois focos do mesmo fogo.
+        janela_minutos (float): Diferença máxima de horário, em minutos, entre dois focos do mesmo fogo.
+
+    Returns:
+        pd.DataFrame: Focos que ficaram, na ordem original, com as colunas ´Deteccoes´ e ´Satelites´.
+    """
+    if distancia_km <= 0 or janela_minutos <= 0:
+        raise ValueError("A distância e a janela de tempo da deduplicação precisam ser maiores que zero.")
+
+    total = len(df)
+    deteccoes = np.ones(total, dtype=np.int32)
+    satelites = np.ones(total, dtype=np.int8)
+
+    latitude = df['Latitude'].to_numpy(dtype=np.float64)
+    longitude = df['Longitude'].to_numpy(dtype=np.float64)
+    data_hora = pd.to_datetime(df['DataHora'])
+    codigo_satelite = pd.factorize(df['Satelite'], sort=True)[0]
+    codigo_dia = pd.factorize(df['Data'], sort=True)[0]
+
+    comparaveis = np.flatnonzero(
+        ~np.isnan(latitude) & ~np.isnan(longitude) & data_hora.notna().to_numpy() &
+        (codigo_satelite >= 0) & (codigo_dia >= 0)
+    )
+
+    if comparaveis.size < 2:
+        return df.assign(Deteccoes=deteccoes, Satelites=satelites)
+
+    lat, lon = latitude[comparaveis], longitude[comparaveis]
+    minutos = (
+        (data_hora - data_hora.dt.normalize()).to_numpy()[comparaveis] / np.timedelta64(1, 'm')
+    ).astype(np.float64)
+
+    # Grade em km: no eixo x a escala usa a maior latitude (em módulo), onde um grau de longitude
+    # é menor, assim dois focos a ´distancia_km´ nunca ficam a mais de uma célula de distância.
+    escala_x = KM_POR_GRAU * np.cos(np.radians(np.abs(lat).max()))
+    celula_x = np.floor(lon * escala_x / distancia_km).astype(np.int64)
+    celula_y = np.floor(lat * KM_POR_GRAU / distancia_km).astype(np.int64)
+    faixa = np.floor(minutos / janela_minutos).astype(np.int64)
+
+    # Uma faixa/célula vazia em cada borda: o vizinho de uma célula da borda nunca é de outro dia.
+    celula_x -= celula_x.min() - 1
+    celula_y -= celula_y.min() - 1
+    faixa += 1
+    dimensoes = (int(faixa.max()) + 2, int(celula_x.max()) + 2, int(celula_y.max()) + 2)
+
+    if (int(codigo_dia[comparaveis].max()) + 1) * np.prod(dimensoes, dtype=np.float64) >= np.iinfo(np.int64).max:
+        raise ValueError("A grade da deduplicação ficou grande demais, aumente a DEDUP_DISTANCIA_KM.")
+
+    chaves = ((codigo_dia[comparaveis] * dimensoes[0] + faixa) * dimensoes[1] + celula_x) * dimensoes[2] + celula_y
+
+    i, j = _pares_candidatos(chaves, dimensoes)
+
+    # Mesmo fogo: satélites diferentes, dentro da distância e da janela de tempo.
+    mesmo_fogo = (
+        (codigo_satelite[comparaveis][i] != codigo_satelite[comparaveis][j]) &
+        (np.abs(minutos[i] - minutos[j]) <= janela_minutos)
+    )
+    i, j = i[mesmo_fogo], j[mesmo_fogo]
+    mesmo_fogo = dentro_do_raio(lat[i], lon[i], lat[j], lon[j], raio_km=distancia_km)
+    i, j = i[mesmo_fogo], j[mesmo_fogo]
+
+    manter = np.ones(total, dtype=bool)
+
+    if i.size == 0:
+        logger.info(f"Deduplicação: nenhum dos {total} focos foi visto por mais de um satélite.")
+        return df.assign(Deteccoes=deteccoes, Satelites=satelites)
+
+    # Somente os focos de grupos com mais de um foco (sempre de satélites diferentes) são resolvidos.
+    grupos = _grupos(len(comparaveis), i, j)
+    tamanho_grupo = np.bincount(grupos)
+    em_grupo = np.flatnonzero(tamanho_grupo[grupos] > 1)
+    _, grupo = np.unique(grupos[em_grupo], return_inverse=True)
+    quantidade_grupos = int(grupo.max()) + 1
+
+    # FRP de cada satélite em cada grupo (o -999 das linhas inválidas conta como 0).
+    satelite = codigo_satelite[comparaveis[em_grupo]]
+    quantidade_satelites = int(codigo_satelite.max()) + 1
+    frp = np.nan_to_num(np.maximum(df['FRP'].to_numpy(dtype=np.float64)[comparaveis[em_grupo]], 0.0))
+
+    grupo_satelite = grupo * quantidade_satelites + satelite
+    tamanho = quantidade_grupos * quantidade_satelites
+    frp_satelite = np.bincount(grupo_satelite, weights=frp, minlength=tamanho).reshape(quantidade_grupos, -1)
+    presente = np.bincount(grupo_satelite, minlength=tamanho).reshape(quantidade_grupos, -1) > 0
+
+    # Satélite escolhido: maior FRP; no empate, o primeiro em ordem alfabética (o ´argmax´ fica com o primeiro).
+    escolhido = np.where(presente, frp_satelite, -1.0).argmax(axis=1)
+    mantido = satelite == escolhido[grupo]
+
+    # A primeira linha mantida de cada grupo representa também os focos removidos.
+    mantidos_grupo = np.bincount(grupo, weights=mantido, minlength=quantidade_grupos)
+    indices_mantidos = np.flatnonzero(mantido)
+    _, primeiro_do_grupo = np.unique(grupo[indices_mantidos], return_index=True)
+    representante = indices_mantidos[primeiro_do_grupo]
+
+    linhas = comparaveis[em_grupo]
+    manter[linhas] = mantido
+    deteccoes[linhas[representante]] += (np.bincount(grupo, minlength=quantidade_grupos) - mantidos_grupo).astype(np.int32)
+    satelites[linhas] = presente.sum(axis=1)[grupo]
+
+    logger.info(
+        f"Deduplicação: {total - int(manter.sum())} de {total} focos removidos "
+        f"({quantidade_grupos} fogos vistos por mais de um satélite)."
+    )
+
+    return df.loc[manter].assign(Deteccoes=deteccoes[manter], Satelites=satelites[manter]).reset_index(drop=True)
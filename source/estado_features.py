@@ -0,0 +1,229 @@
+import pandas as pd
+from sqlalchemy import Connection, Engine, inspect, text
+
+from source.core.bulk_insert import bulk_insert
+from source.features_moveis import maior_janela
+from source.registro_features import COLUNAS_JANELAS, JANELAS_REGISTRO
+from source.resources.logging import get_logger
+
+
+logger = get_logger()
+
+TABELA_ESTADO = "estado_janelas"
+TABELA_LIMITES = "estado_limites_geograficos"
+
+# Colunas dos dados lidas pelas janelas móveis do registro (inclusive o ´FRP´ do ´Teve_Fogo´),
+# guardadas no estado de cada município.
+COLUNAS_ESTADO = COLUNAS_JANELAS
+
+# A janela de N registros usa o registro atual e os N - 1 anteriores, então esse é o histórico
+# necessário para que as primeiras linhas novas tenham a janela completa.
+REGISTROS_POR_MUNICIPIO = maior_janela(JANELAS_REGISTRO) - 1
+
+
+def create_table_estado(engine: Engine):
+    colunas = "".join(f",\n            {coluna} FLOAT" for coluna in COLUNAS_ESTADO)
+
+    with engine.begin() as conn:
+        conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {TABELA_ESTADO} (
+            Municipio TEXT,
+            Data DATE{colunas}
+        )
+    """))
+
+        # Tabelas criadas antes de uma coluna entrar nas janelas (como o ´FRP´) recebem a coluna vazia.
+        existentes = {coluna['name'].lower() for coluna in inspect(conn).get_columns(TABELA_ESTADO)}
+        faltando = [coluna for coluna in COLUNAS_ESTADO if coluna.lower() not in existentes]
+        for coluna in faltando:
+            conn.execute(text(f"ALTER TABLE {TABELA_ESTADO} ADD COLUMN {coluna} FLOAT"))
+        if faltando:
+            logger.warning(
+                f"O estado das janelas não tinha as colunas {faltando}. Refaça a carga completa, sem "
+                "FEATURES_INCREMENTAIS e sem INGESTAO_ASYNC, para que as janelas que usam essas colunas fiquem corretas."
+            )
+
+        conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {TABELA_LIMITES} (
+            Latitude_min FLOAT,
+            Latitude_max FLOAT,
+            Longitude_min FLOAT,
+            Longitude_max FLOAT
+        )
+    """))
+
+
+def carregar_estado(engine: Engine) -> tuple[pd.DataFrame, dict[str, float] | None]:
+    """
+        Lê o estado salvo na última carga: os últimos registros de cada município (histórico das
+        janelas móveis) e os limites usados na normalização da Latitude e Longitude.
+
+    Args:
+        engine (Engine): Engine do banco de dados.
+
+    Returns:
+        tuple[pd.DataFrame, dict[str, float] | None]: Histórico por município e limites (None na primeira carga).
+    """
+    with engine.connect() as conn:
+        historico = pd.read_sql(
+            text(f"SELECT Municipio, Data, {', '.join(COLUNAS_ESTADO)} FROM {TABELA_ESTADO}"),
+            conn,
+        )
+        limites = conn.execute(text(
+            f"SELECT Latitude_min, Latitude_max, Longitude_min, Longitude_max FROM {TABELA_LIMITES}"
+        )).first()
+
+    # O Postgres devolve os nomes das colunas em minúsculo.
+    historico.columns = ['Municipio', 'Data'] + COLUNAS_ESTADO
+    historico['Data'] = pd.to_datetime(historico['Data'])
+
+    if limites is not None:
+        limites = dict(zip(['Latitude_min', 'Latitude_max', 'Longitude_min', 'Longitude_max'], limites))
+
+    return historico, limites
+
+
+def calcular_limites_geograficos(df: pd.DataFrame, anteriores: dict[str, float] | None = None) -> dict[str, float]:
+    """
+        Mínimo e máximo da Latitude e Longitude de ´df´, somados aos limites das cargas anteriores.
+    """
+    limites = {
+        'Latitude_min': df['Latitude'].min(),
+        'Latitude_max': df['Latitude'].max(),
+        'Longitude_min': df['Longitude'].min(),
+        'Longitude_max': df['Longitude'].max(),
+    }
+
+    if anteriores is None:
+        return limites
+
+    novos = {
+        chave: min(valor, anteriores[chave]) if chave.endswith('_min') else max(valor, anteriores[chave])
+        for chave, valor in limites.items()
+    }
+
+    if novos != anteriores:
+        logger.warning(
+            "Os dados novos estão fora dos limites de Latitude/Longitude das cargas anteriores. "
+            "As linhas já gravadas continuam normalizadas com os limites antigos. Para normalizar tudo com "
+            "os mesmos limites refaça a carga completa, sem FEATURES_INCREMENTAIS e sem INGESTAO_ASYNC."
+        )
+
+    return novos
+
+
+def validar_continuacao(historico: pd.DataFrame, df: pd.DataFrame):
+    """
+        No modo incremental as linhas novas são colocadas depois do histórico de cada município.
+        Se chegar uma linha com data anterior ou igual ao último registro salvo do município, as janelas
+        dessa linha (e das linhas já gravadas depois dela) não seriam mais iguais às de uma carga completa.
+    """
+    if historico.empty or df.empty:
+        return
+
+    ultima_data = historico.groupby('Municipio')['Data'].max()
+    datas_salvas = df['Municipio'].astype(object).map(ultima_data)
+    atrasadas = pd.to_datetime(df['Data']) <= datas_salvas
+
+    if atrasadas.any():
+        exemplo = df.loc[atrasadas].iloc[0]
+        raise ValueError(
+            f"{int(atrasadas.sum())} linhas novas são de datas já carregadas "
+            f"(ex.: {exemplo['Municipio']} em {exemplo['Data']}). "
+            "Refaça a carga completa, sem FEATURES_INCREMENTAIS e sem INGESTAO_ASYNC, para recalcular as features."
+        )
+
+
+def ultimos_registros(historico: pd.DataFrame, df: pd.DataFrame) -> pd.DataFrame:
+    """
+        Últimos ´REGISTROS_POR_MUNICIPIO´ registros de cada município de ´df´, juntando o histórico
+        desse município com as linhas de ´df´.
+    """
+    colunas = ['Municipio', 'Data'] + COLUNAS_ESTADO
+    novos = df[colunas].assign(
+        Municipio=df['Municipio'].astype(str),
+        Data=pd.to_datetime(df['Data']),
+    )
+
+    anteriores = historico.loc[historico['Municipio'].isin(novos['Municipio'].unique()), colunas]
+
+    if not anteriores.empty:
+        novos = pd.concat([anteriores, novos], ignore_index=True)
+
+    return (
+        novos
+        .sort_values(['Municipio', 'Data'], kind='stable')
+        .groupby('Municipio', sort=False)
+        .tail(REGISTROS_POR_MUNICIPIO)
+        .reset_index(drop=True)
+    )
+
+
+def atualizar_historico(historico: pd.DataFrame, df: pd.DataFrame) -> pd.DataFrame:
+    """
+        Histórico em memória depois de gravar ´df´: os municípios de ´df´ passam a ter os seus últimos
+        registros e os demais continuam como estavam.
+    """
+    if df.empty:
+        return historico
+
+    atualizados = ultimos_registros(historico, df)
+    mantidos = historico.loc[~historico['Municipio'].isin(atualizados['Municipio'].unique())]
+
+    if mantidos.empty:
+        return atualizados
+
+    return pd.concat([mantidos, atualizados], ignore_index=True)
+
+
+def atualizar_estado(
+    bind: Engine | Connection,
+    historico: pd.DataFrame,
+    df: pd.DataFrame,
+    limites: dict[str, float] | None,
+) -> int:
+    """
+        Junta as linhas gravadas ao histórico e guarda somente os últimos ´REGISTROS_POR_MUNICIPIO´
+        registros de cada município. Somente os municípios que receberam linhas novas são trocados.
+
+    Args:
+        bind (Engine | Connection): Engine (transação própria) ou conexão (transação de quem chamou).
+        historico (pd.DataFrame): Estado lido por ´carregar_estado´.
+        df (pd.DataFrame): Linhas gravadas nesta carga.
+        limites (dict[str, float] | None): Limites da normalização usados nesta carga.
+
+    Returns:
+        int: Quantidade de registros do estado gravados.
+    """
+    if isinstance(bind, Engine):
+        with bind.begin() as conn:
+            return atualizar_estado(conn, historico, df, limites)
+
+    if df.empty:
+        return 0
+
+    estado = ultimos_registros(historico, df)
+    municipios = estado['Municipio'].unique()
+    estado['Data'] = estado['Data'].dt.strftime('%Y-%m-%d')
+
+    for inicio in range(0, len(municipios), 1000):
+        lote = municipios[inicio:inicio + 1000].tolist()
+        marcadores = ", ".join(f":m{i}" for i in range(len(lote)))
+        bind.execute(
+            text(f"DELETE FROM {TABELA_ESTADO} WHERE Municipio IN ({marcadores})"),
+            {f"m{i}": municipio for i, municipio in enumerate(lote)},
+        )
+
+    linhas = bulk_insert(bind, estado, table_name=TABELA_ESTADO)
+
+    if limites is not None:
+        bind.execute(text(f"DELETE FROM {TABELA_LIMITES}"))
+        bind.execute(
+            text(
+                f"INSERT INTO {TABELA_LIMITES} (Latitude_min, Latitude_max, Longitude_min, Longitude_max) "
+                "VALUES (:Latitude_min, :Latitude_max, :Longitude_min, :Longitude_max)"
+            ),
+            {chave: float(valor) for chave, valor in limites.items()},
+        )
+
+    return linhas
@@ -0,0 +1,199 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from source.resources.perfil import perfilado
+
+
+@dataclass(frozen=True)
+class JanelaMovel:
+    """
+        Uma feature de janela móvel por município: aplica ´funcao´ nos últimos ´janela´ registros
+        de ´coluna´ (incluindo o registro atual) e grava o resultado em ´nome´.
+        A função ´delta´ é o registro atual menos o primeiro da janela (NaN sem a janela completa),
+        então a janela 2 é a variação em relação ao registro anterior, como o ´diff(1)´.
+    """
+    nome: str
+    coluna: str
+    funcao: str
+    janela: int
+    preencher_nulos: float | None = None
+
+
+FUNCOES_SUPORTADAS = ('mean', 'std', 'min', 'max', 'sum', 'delta')
+
+JANELAS_MOVEIS = [
+    # ===== FEATURES DE MÉDIA MÓVEL =====
+    # A média móvel nos permite suavizar as flutuações dos dados e capturar tendências locais.
+    # Utilizamos janelas diferentes (7 e 14 dias) para capturar padrões em diferentes escalas de tempo.
+    JanelaMovel('RiscoFogo_media_movel_7', 'RiscoFogo', 'mean', 7),
+    JanelaMovel('Precipitacao_media_movel_7', 'Precipitacao', 'mean', 7),
+    JanelaMovel('DiaSemChuva_media_movel_14', 'DiaSemChuva', 'mean', 14),
+
+    # ===== FEATURES DE VOLATILIDADE =====
+    # A volatilidade mede a variação dos dados em um período de tempo.
+    # Com um único registro o desvio padrão não existe, então ele é preenchido com 0.
+    JanelaMovel('RiscoFogo_volatilidade_7', 'RiscoFogo', 'std', 7, preencher_nulos=0),
+    JanelaMovel('Precipitacao_volatilidade_7', 'Precipitacao', 'std', 7, preencher_nulos=0),
+
+    # ===== FEATURES DE EXTREMOS =====
+    # O máximo do Risco de Fogo em 14 dias mostra o pior cenário recente de um Município e
+    # o mínimo de Precipitação em 7 dias indica períodos de seca.
+    JanelaMovel('RiscoFogo_max_14', 'RiscoFogo', 'max', 14),
+    JanelaMovel('Precipitacao_min_7', 'Precipitacao', 'min', 7),
+
+    # ===== FEATURES DE ACUMULAÇÃO =====
+    # Quanto choveu no Município nos últimos 7 dias (umidade do solo e da vegetação)
+    # e nos últimos 30 dias (tendência de mais longo prazo).
+    JanelaMovel('Precipitacao_acumulada_7', 'Precipitacao', 'sum', 7),
+    JanelaMovel('Precipitacao_acumulada_30', 'Precipitacao', 'sum', 30),
+]
+
+
+# Quantidade de linhas processadas por vez, para limitar a matriz (linhas x janela) de cada bloco.
+LINHAS_POR_BLOCO = 65_536
+
+
+def maior_janela(janelas: list[JanelaMovel] = JANELAS_MOVEIS) -> int:
+    return max((janela.janela for janela in janelas), default=1)
+
+
+def _calcular_janelas_coluna(
+    valores: np.ndarray,
+    inicio_grupo: np.ndarray,
+    tamanho: int,
+    funcoes: set[str],
+) -> dict[str, np.ndarray]:
+    """
+        Calcula as funções pedidas para uma coluna e um tamanho de janela.
+
+        Cada janela é calculada de forma independente a partir dos seus próprios valores
+        (matriz linhas x janela, com NaN antes do início do grupo), sem soma acumulada entre uma
+        linha e a próxima. Assim o resultado de uma linha depende somente dos valores da janela dela,
+        e o cálculo incremental (com só o histórico recente) dá exatamente o mesmo resultado
+        do cálculo completo.
+    """
+    total = len(valores)
+    resultado = {funcao: np.empty(total, dtype=np.float64) for funcao in funcoes}
+    deslocamentos = np.arange(-(tamanho - 1), 1)
+
+    for inicio in range(0, total, LINHAS_POR_BLOCO):
+        linhas = np.arange(inicio, min(inicio + LINHAS_POR_BLOCO, total))
+
+        indices = linhas[:, None] + deslocamentos[None, :]
+        fora_da_janela = indices < inicio_grupo[linhas, None]
+        matriz = np.where(fora_da_janela, np.nan, valores[np.maximum(indices, 0)])
+
+        nulos = np.isnan(matriz)
+        contagem = (~nulos).sum(axis=1)
+        soma = np.where(nulos, 0.0, matriz).sum(axis=1)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            media = soma / contagem
+
+            if 'sum' in funcoes:
+                resultado['sum'][linhas] = np.where(contagem > 0, soma, np.nan)
+            if 'mean' in funcoes:
+                resultado['mean'][linhas] = media
+            if 'std' in funcoes:
+                desvios = np.where(nulos, 0.0, matriz - media[:, None])
+                variancia = (desvios * desvios).sum(axis=1) / (contagem - 1)
+                resultado['std'][linhas] = np.where(contagem > 1, np.sqrt(variancia), np.nan)
+            if 'min' in funcoes:
+                minimo = np.where(nulos, np.inf, matriz).min(axis=1)
+                resultado['min'][linhas] = np.where(contagem > 0, minimo, np.nan)
+            if 'max' in funcoes:
+                maximo = np.where(nulos, -np.inf, matriz).max(axis=1)
+                resultado['max'][linhas] = np.where(contagem > 0, maximo, np.nan)
+            if 'delta' in funcoes:
+                resultado['delta'][linhas] = matriz[:, -1] - matriz[:, 0]
+
+    return resultado
+
+
+@perfilado
+def calcular_janelas_moveis(
+    df: pd.DataFrame,
+    janelas: list[JanelaMovel] = JANELAS_MOVEIS,
+    coluna_grupo: str = 'Municipio',
+    coluna_data: str = 'Data',
+    historico: pd.DataFrame | None = None,
+) -> pd.DataFrame:
+    """
+        Calcula todas as features de janela móvel de uma vez.
+
+        Os dados são ordenados uma única vez por (´coluna_grupo´, ´coluna_data´) e o início de cada grupo
+        é calculado uma única vez. Depois cada coluna é lida uma única vez por tamanho de janela e todas
+        as funções (mean, std, min, max, sum, delta) daquela coluna e janela saem da mesma matriz de valores,
+        para todos os municípios ao mesmo tempo, sem ´groupby´ e sem função em Python por grupo.
+
+    Args:
+        df (pd.DataFrame): DataFreme com as colunas usadas pelas janelas.
+        janelas (list[JanelaMovel]): Features que devem ser calculadas.
+        coluna_grupo (str): Coluna que separa as séries (município).
+        coluna_data (str): Coluna usada para ordenar cada série.
+        historico (pd.DataFrame | None): Registros anteriores a ´df´ (mesmas colunas), usados somente
+            para completar as janelas das primeiras linhas de cada município. Não entram no resultado.
+
+    Returns:
+        pd.DataFrame: DataFreme com uma coluna por janela, no mesmo índice e ordem de ´df´.
+    """
+    for janela in janelas:
+        if janela.funcao not in FUNCOES_SUPORTADAS:
+            raise ValueError(f"Função '{janela.funcao}' não suportada na janela {janela.nome}.")
+
+    resultado = pd.DataFrame(index=df.index)
+
+    if df.empty or not janelas:
+        return resultado.assign(**{janela.nome: np.nan for janela in janelas})
+
+    colunas = sorted({janela.coluna for janela in janelas})
+    base = df[[coluna_grupo, coluna_data] + colunas]
+
+    # O histórico entra antes das linhas novas, assim em datas repetidas ele continua na frente.
+    total_historico = 0
+    if historico is not None and not historico.empty:
+        total_historico = len(historico)
+        base = pd.concat([historico[[coluna_grupo, coluna_data] + colunas], base], ignore_index=True)
+
+    # Ordena uma única vez por município e data (ordenação estável para datas repetidas).
+    codigos_grupo = pd.factorize(base[coluna_grupo], sort=True)[0]
+    codigos_data = pd.factorize(base[coluna_data], sort=True)[0]
+    ordem = np.lexsort((codigos_data, codigos_grupo))
+    codigos_ordenados = codigos_grupo[ordem]
+
+    # Posição em que cada grupo começa, repetida para cada linha do grupo.
+    novo_grupo = np.r_[True, codigos_ordenados[1:] != codigos_ordenados[:-1]]
+    inicio_grupo = np.maximum.accumulate(np.where(novo_grupo, np.arange(len(ordem)), 0))
+
+    # Posição (na ordem ordenada) de cada linha de ´df´, na ordem original de ´df´.
+    posicao_ordenada = np.empty(len(ordem), dtype=np.int64)
+    posicao_ordenada[ordem] = np.arange(len(ordem))
+    posicao_ordenada = posicao_ordenada[total_historico:]
+
+    # As janelas da mesma coluna e do mesmo tamanho são calculadas juntas.
+    combinacoes: dict[tuple[str, int], list[JanelaMovel]] = {}
+    for janela in janelas:
+        combinacoes.setdefault((janela.coluna, janela.janela), []).append(janela)
+
+    for (coluna, tamanho), grupo_janelas in combinacoes.items():
+        # O cálculo é sempre em float64; o resultado fica em float32 quando a coluna já é float32
+        # (modo de memória enxuta).
+        tipo_resultado = np.float32 if base[coluna].dtype == np.float32 else np.float64
+        valores = base[coluna].to_numpy(dtype=np.float64)[ordem]
+        calculado = _calcular_janelas_coluna(
+            valores=valores,
+            inicio_grupo=inicio_grupo,
+            tamanho=tamanho,
+            funcoes={janela.funcao for janela in grupo_janelas},
+        )
+
+        for janela in grupo_janelas:
+            # Volta para a ordem original do DataFreme.
+            valores_janela = calculado[janela.funcao][posicao_ordenada]
+            if janela.preencher_nulos is not None:
+                valores_janela = np.where(np.isnan(valores_janela), janela.preencher_nulos, valores_janela)
+            resultado[janela.nome] = valores_janela.astype(tipo_resultado, copy=False)
+
+    return resultado[[janela.nome for janela in janelas]]
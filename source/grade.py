@@ -0,0 +1,208 @@
+"""
+    Agregação em uma grade regular de latitude/longitude (´AGREGACAO_GRADE´), no lugar da agregação
+    por município.
+
+    Alguns municípios da Amazônia têm dezenas de milhares de km², então a soma do FRP do dia junta
+    fogos muito distantes entre si e a média da Latitude/Longitude cai em um ponto sem significado.
+    Na grade cada foco vai para uma célula de ´tamanho_graus´ x ´tamanho_graus´ e a agregação é feita
+    por (Data, Celula).
+
+    - A grade é fixa: começa em (´GRADE_LATITUDE[0]´, ´GRADE_LONGITUDE[0]´) e cobre o Brasil inteiro,
+      então a mesma coordenada cai sempre na mesma célula, em qualquer arquivo ou carga.
+    - O código da célula é um inteiro (linha * colunas + coluna), calculado com divisão inteira
+      (´np.floor_divide´) sobre todas as linhas de uma vez.
+    - Cada registro da grade guarda também o município com mais focos na célula naquele dia, e a
+      tabela ´celulas_municipio´ liga cada célula aos municípios em que ela teve registros.
+"""
+import numpy as np
+import pandas as pd
+from sqlalchemy import Engine, text
+
+from source.core.bulk_insert import bulk_insert
+from source.tabela_dados import TABELA_GRADE, gravar_dados
+from source.resources.logging import get_logger
+
+
+logger = get_logger()
+
+TABELA_CELULAS = "celulas_municipio"
+
+# Extensão da grade (graus): o retângulo que envolve o Brasil.
+GRADE_LATITUDE = (-34.0, 6.0)
+GRADE_LONGITUDE = (-74.0, -34.0)
+
+# Os códigos precisam caber em int32, o tipo dos inteiros no modo de memória enxuta (´reduzir_tipos´).
+_MAXIMO_CELULAS = np.iinfo(np.int32).max
+
+
+def dimensoes_grade(tamanho_graus: float) -> tuple[int, int]:
+    """
+        Quantidade de linhas (latitude) e colunas (longitude) da grade.
+
+    Args:
+        tamanho_graus (float): Lado de cada célula, em graus.
+
+    Returns:
+        tuple[int, int]: Linhas e colunas.
+    """
+    if tamanho_graus <= 0:
+        raise ValueError("O tamanho da célula da grade precisa ser maior que zero.")
+
+    linhas = int(np.ceil((GRADE_LATITUDE[1] - GRADE_LATITUDE[0]) / tamanho_graus))
+    colunas = int(np.ceil((GRADE_LONGITUDE[1] - GRADE_LONGITUDE[0]) / tamanho_graus))
+
+    if linhas * colunas > _MAXIMO_CELULAS:
+        raise ValueError("A grade ficou grande demais, aumente o GRADE_TAMANHO_GRAUS.")
+
+    return linhas, colunas
+
+
+def celulas(latitude: np.ndarray, longitude: np.ndarray, tamanho_graus: float) -> np.ndarray:
+    """
+        Código da célula de cada coordenada. Coordenadas nulas ou fora da grade ficam com -1.
+
+    Args:
+        latitude (np.ndarray): Latitudes em graus.
+        longitude (np.ndarray): Longitudes em graus.
+        tamanho_graus (float): Lado de cada célula, em graus.
+
+    Returns:
+        np.ndarray: Código int64 de cada coordenada.
+    """
+    linhas, colunas = dimensoes_grade(tamanho_graus)
+
+    linha = np.floor_divide(np.asarray(latitude, dtype=np.float64) - GRADE_LATITUDE[0], tamanho_graus)
+    coluna = np.floor_divide(np.asarray(longitude, dtype=np.float64) - GRADE_LONGITUDE[0], tamanho_graus)
+
+    # As comparações com NaN são falsas, então as coordenadas nulas também ficam fora.
+    dentro = (linha >= 0) & (linha < linhas) & (coluna >= 0) & (coluna < colunas)
+
+    return np.where(dentro, linha * colunas + coluna, -1).astype(np.int64)
+
+
+def centros_celulas(codigos: np.ndarray, tamanho_graus: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+        Latitude e longitude do centro de cada célula.
+
+    Args:
+        codigos (np.ndarray): Códigos das células (saída do ´celulas´).
+        tamanho_graus (float): Lado de cada célula, em graus.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Latitudes e longitudes.
+    """
+    _, colunas = dimensoes_grade(tamanho_graus)
+    linha, coluna = np.divmod(np.asarray(codigos, dtype=np.int64), colunas)
+
+    return (
+        GRADE_LATITUDE[0] + (linha + 0.5) * tamanho_graus,
+        GRADE_LONGITUDE[0] + (coluna + 0.5) * tamanho_graus,
+    )
+
+
+def municipio_predominante(df: pd.DataFrame) -> pd.DataFrame:
+    """
+        Município com mais focos em cada (Data, Celula). No empate fica o primeiro em ordem alfabética.
+        A contagem é feita com códigos inteiros (um ´np.unique´ por chave) em vez de um ´groupby´ pelas
+        três colunas, que fatoraria as datas e os nomes de novo.
+
+    Args:
+        df (pd.DataFrame): Focos com as colunas ´Data´, ´Celula´ e ´Municipio´.
+
+    Returns:
+        pd.DataFrame: Colunas ´Data´, ´Celula´ e ´Municipio´, um registro por (Data, Celula) com município.
+    """
+    codigo_dia, dias = pd.factorize(df['Data'], sort=True)
+    codigo_municipio, municipios = pd.factorize(df['Municipio'].astype(object), sort=True)
+    celula = df['Celula'].to_numpy(dtype=np.int64)
+
+    # Focos sem data ou sem município (código -1) não entram na contagem.
+    usados = (codigo_dia >= 0) & (codigo_municipio >= 0)
+    if not usados.any():
+        return df[['Data', 'Celula', 'Municipio']].iloc[0:0]
+
+    grupos, grupo = np.unique(
+        codigo_dia[usados].astype(np.int64) * (int(celula.max()) + 1) + celula[usados],
+        return_inverse=True,
+    )
+    pares, focos = np.unique(grupo * len(municipios) + codigo_municipio[usados], return_counts=True)
+    grupo_par, municipio_par = np.divmod(pares, len(municipios))
+
+    # Os pares já estão em ordem de (grupo, município): a ordenação estável pela contagem
+    # mantém o município de menor código (ordem alfabética) na frente em caso de empate.
+    ordem = np.lexsort((-focos, grupo_par))
+    primeiro = ordem[np.r_[True, grupo_par[ordem][1:] != grupo_par[ordem][:-1]]]
+
+    chaves = grupos[grupo_par[primeiro]]
+    dia, celula = np.divmod(chaves, int(celula.max()) + 1)
+
+    return pd.DataFrame({
+        'Data': dias[dia],
+        'Celula': celula,
+        'Municipio': municipios[municipio_par[primeiro]],
+    })
+
+
+def tabela_celula_municipio(df: pd.DataFrame, tamanho_graus: float) -> pd.DataFrame:
+    """
+        Tabela de consulta célula -> município: cada par (Celula, Municipio) dos registros agregados,
+        com a quantidade de dias em que o município foi o predominante na célula e o centro da célula.
+
+    Args:
+        df (pd.DataFrame): Registros agregados por dia e célula (com ´Celula´ e ´Municipio´).
+        tamanho_graus (float): Lado de cada célula, em graus.
+
+    Returns:
+        pd.DataFrame: Colunas ´Celula´, ´Municipio´, ´Dias´, ´Latitude_centro´ e ´Longitude_centro´.
+    """
+    tabela = (
+        df[['Celula', 'Municipio']]
+        .astype({'Municipio': object})
+        .groupby(['Celula', 'Municipio'])
+        .size()
+        .reset_index(name='Dias')
+    )
+    tabela['Celula'] = tabela['Celula'].astype(np.int64)
+    tabela['Latitude_centro'], tabela['Longitude_centro'] = centros_celulas(tabela['Celula'].to_numpy(), tamanho_graus)
+
+    return tabela
+
+
+def create_table_celulas(engine: Engine):
+    with engine.begin() as conn:
+        conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {TABELA_CELULAS} (
+            Celula BIGINT NOT NULL,
+            Municipio TEXT NOT NULL,
+            Dias INTEGER,
+            Latitude_centro FLOAT,
+            Longitude_centro FLOAT,
+            PRIMARY KEY (Celula, Municipio)
+        )
+    """))
+
+
+def substituir_dados_grade(engine: Engine, df: pd.DataFrame, celulas_municipio: pd.DataFrame) -> int:
+    """
+        Troca todo o conteúdo da ´dados_grade´ e da ´celulas_municipio´ pelas linhas desta carga,
+        em uma única transação. Toda carga em grade processa todos os CSVs, então as duas tabelas
+        ficam sempre com a mesma grade (o mesmo ´GRADE_TAMANHO_GRAUS´).
+
+    Args:
+        engine (Engine): Engine do banco de dados.
+        df (pd.DataFrame): Registros por dia e célula, com as features.
+        celulas_municipio (pd.DataFrame): Saída do ´tabela_celula_municipio´.
+
+    Returns:
+        int: Quantidade de linhas gravadas na ´dados_grade´.
+    """
+    with engine.begin() as conn:
+        conn.execute(text(f"DELETE FROM {TABELA_GRADE}"))
+        linhas = gravar_dados(conn, df, table_name=TABELA_GRADE)
+
+        conn.execute(text(f"DELETE FROM {TABELA_CELULAS}"))
+        bulk_insert(conn, celulas_municipio, table_name=TABELA_CELULAS)
+
+    logger.info(f"✓ {linhas} registros gravados em {TABELA_GRADE} ({len(celulas_municipio)} pares célula/município).")
+
+    return linhas
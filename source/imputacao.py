@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+
+from source.resources.perfil import perfilado
+from source.resources.logging import get_logger
+from source.resources.haversine import dentro_do_raio
+
+
+logger = get_logger()
+
+# Distância usada para separar os grupos (Data, Municipio) dentro do mesmo índice.
+# Dois pontos na esfera unitária nunca ficam a mais de 2 unidades de distância,
+# então qualquer valor maior que 2 garante que um grupo nunca "enxergue" o outro.
+_SEPARACAO_GRUPOS = 10.0
+
+
+def _pontos_do_indice(latitude: np.ndarray, longitude: np.ndarray, codigos: np.ndarray) -> np.ndarray:
+    """
+        Converte latitude e longitude (em graus) para coordenadas (x, y, z) na esfera unitária, com o
+        grupo na quarta dimensão. Na esfera a distância em linha reta (corda) cresce junto com a distância
+        haversine, então o vizinho mais próximo pela corda é o mesmo vizinho mais próximo pela haversine.
+
+        A matriz é alocada uma única vez e preenchida coluna a coluna, sem as matrizes intermediárias
+        de um ´np.column_stack´.
+
+    Args:
+        latitude (np.ndarray): Latitudes em graus.
+        longitude (np.ndarray): Longitudes em graus.
+        codigos (np.ndarray): Código do grupo (Data, Municipio) de cada ponto.
+
+    Returns:
+        np.ndarray: Matriz (n, 4) float64 com as coordenadas cartesianas e o deslocamento do grupo.
+    """
+    pontos = np.empty((len(latitude), 4), dtype=np.float64)
+
+    lat = np.radians(latitude, dtype=np.float64)
+    lon = np.radians(longitude, dtype=np.float64)
+    cos_lat = np.cos(lat)
+
+    np.multiply(cos_lat, np.cos(lon), out=pontos[:, 0])
+    np.multiply(cos_lat, np.sin(lon), out=pontos[:, 1])
+    np.sin(lat, out=pontos[:, 2])
+    np.multiply(codigos, _SEPARACAO_GRUPOS, out=pontos[:, 3])
+
+    return pontos
+
+
+@perfilado
+def imputar_valores_invalidos(
+    df_invalidos: pd.DataFrame,
+    df_validos: pd.DataFrame,
+    campos_com_erros: list[str],
+    raio_km: float = 5,
+) -> pd.DataFrame:
+    """
+        Preenche os valores -999 das linhas inválidas com os valores da linha válida mais próxima
+        do mesmo dia e município, desde que ela esteja a no máximo ´raio_km´ de distância.
+
+        Em vez de filtrar o DataFreme de linhas válidas para cada linha inválida,
+        é montado um único índice espacial (KDTree) com todas as linhas válidas. Cada grupo (Data, Municipio)
+        recebe um deslocamento próprio em uma dimensão extra, assim a busca de vizinhos nunca mistura grupos
+        e todas as linhas inválidas são resolvidas em uma única consulta.
+
+        As linhas inválidas que não tem nenhum vizinho válido dentro do raio são descartadas.
+
+    Args:
+        df_invalidos (pd.DataFrame): DataFreme com as linhas que tem algum valor inválido.
+        df_validos (pd.DataFrame): DataFreme com as linhas válidas, usadas como referência.
+        campos_com_erros (list[str]): Colunas onde o valor -999 deve ser substituído.
+        raio_km (float): Distância máxima, em km, até a linha válida usada no preenchimento.
+
+    Returns:
+        pd.DataFrame: DataFreme com as linhas inválidas que foram preenchidas.
+    """
+    logger.info("Imputando valores inválidos pelo vizinho válido mais próximo...")
+
+    if df_invalidos.empty or df_validos.empty:
+        return df_invalidos.iloc[0:0].copy()
+
+    # Cria um código inteiro para cada grupo (Data, Municipio), o mesmo código para as linhas válidas e inválidas.
+    chaves = pd.concat(
+        [df_validos[['Data', 'Municipio']], df_invalidos[['Data', 'Municipio']]],
+        ignore_index=True,
+    )
+    codigos = chaves.groupby(['Data', 'Municipio'], sort=False, observed=True).ngroup().to_numpy()
+    codigos_validos = codigos[:len(df_validos)]
+    codigos_invalidos = codigos[len(df_validos):]
+
+    # Linhas com Data/Municipio nulos (código -1) nunca são usadas como referência.
+    validos_usados = codigos_validos >= 0
+    indices_validos = np.flatnonzero(validos_usados)
+
+    if indices_validos.size == 0:
+        return df_invalidos.iloc[0:0].copy()
+
+    pontos_validos = _pontos_do_indice(
+        df_validos['Latitude'].to_numpy(dtype=float)[validos_usados],
+        df_validos['Longitude'].to_numpy(dtype=float)[validos_usados],
+        codigos_validos[validos_usados],
+    )
+
+    latitude_invalidos = df_invalidos['Latitude'].to_numpy(dtype=float)
+    longitude_invalidos = df_invalidos['Longitude'].to_numpy(dtype=float)
+
+    # Linhas inválidas sem coordenada ou sem grupo não tem como ser preenchidas.
+    consultaveis = (
+        (codigos_invalidos >= 0) &
+        ~np.isnan(latitude_invalidos) &
+        ~np.isnan(longitude_invalidos)
+    )
+    indices_consultados = np.flatnonzero(consultaveis)
+
+    if indices_consultados.size == 0:
+        return df_invalidos.iloc[0:0].copy()
+
+    pontos_invalidos = _pontos_do_indice(
+        latitude_invalidos[consultaveis],
+        longitude_invalidos[consultaveis],
+        codigos_invalidos[consultaveis],
+    )
+
+    # Importado aqui: o scikit-learn leva quase 1s para importar e só é usado quando há linhas para imputar.
+    from sklearn.neighbors import KDTree
+
+    # Uma única consulta em lote para todas as linhas inválidas.
+    arvore = KDTree(pontos_validos)
+    _, vizinho = arvore.query(pontos_invalidos, k=1)
+    vizinho = indices_validos[vizinho[:, 0]]
+
+    # Só aceita vizinhos do mesmo grupo que estejam dentro do raio (distância haversine em km).
+    encontrados = (codigos_validos[vizinho] == codigos_invalidos[consultaveis]) & dentro_do_raio(
+        lat1=latitude_invalidos[consultaveis],
+        lon1=longitude_invalidos[consultaveis],
+        lat2=df_validos['Latitude'].to_numpy(dtype=float)[vizinho],
+        lon2=df_validos['Longitude'].to_numpy(dtype=float)[vizinho],
+        raio_km=raio_km,
+    )
+
+    df_preenchidos = df_invalidos.iloc[indices_consultados[encontrados]].copy()
+    df_vizinhos = df_validos.iloc[vizinho[encontrados]]
+
+    # Somente os valores -999 são trocados pelo valor do vizinho.
+    for campo in campos_com_erros:
+        valores = df_preenchidos[campo].to_numpy()
+        df_preenchidos[campo] = np.where(valores == -999, df_vizinhos[campo].to_numpy(), valores)
+
+    logger.info(f"✓ {len(df_preenchidos)} de {len(df_invalidos)} linhas inválidas preenchidas!")
+
+    return df_preenchidos
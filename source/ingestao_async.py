@@ -0,0 +1,215 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+
+import pandas as pd
+from sqlalchemy import Engine
+
+from source.core.database import get_async_engine
+from source.core.settings import Settings
+from source.carregar_dados import (
+    _processar_arquivo_em_processo,
+    criar_categorias_risco,
+    engenharia_features,
+    preparar_carga,
+)
+from source.estado_features import (
+    atualizar_estado,
+    atualizar_historico,
+    calcular_limites_geograficos,
+    carregar_estado,
+    validar_continuacao,
+)
+from source.manifesto import ArquivoCSV, marcar_erro, substituir_dados_arquivo_async
+from source.memoria_enxuta import reduzir_tipos
+from source.resources.logging import get_logger
+from source.resources.perfil import perfil
+
+
+logger = get_logger()
+
+# Marca o fim da fila: o produtor terminou todos os arquivos.
+_FIM = None
+
+
+@dataclass
+class _EstadoFeatures:
+    """
+        Histórico das janelas e limites da normalização, atualizados a cada arquivo. Só a thread
+        de features altera esse estado, então os arquivos recebem features um de cada vez, em ordem.
+    """
+    historico: pd.DataFrame
+    limites: dict[str, float] | None
+
+
+def _gerar_features(
+    df: pd.DataFrame,
+    arquivo: ArquivoCSV,
+    estado: _EstadoFeatures,
+    enxuto: bool = False,
+    janelas_calendario: bool = False,
+) -> pd.DataFrame:
+    """
+        Cria a categoria e as features de um arquivo, completando as janelas móveis com o histórico
+        dos arquivos anteriores (mesmo cálculo do ´FEATURES_INCREMENTAIS´). Os limites da normalização
+        são ampliados com as linhas deste arquivo, como em uma carga incremental só com ele.
+    """
+    df['Arquivo'] = str(arquivo.caminho)
+    df = df.sort_values(['Data', 'Municipio'], kind='stable', ignore_index=True)
+
+    df = criar_categorias_risco(df=df)
+
+    validar_continuacao(historico=estado.historico, df=df)
+    estado.limites = calcular_limites_geograficos(df=df, anteriores=estado.limites)
+    df = engenharia_features(
+        df=df,
+        historico=estado.historico,
+        limites_geograficos=estado.limites,
+        janelas_calendario=janelas_calendario,
+    )
+
+    estado.historico = atualizar_historico(estado.historico, df)
+
+    return reduzir_tipos(df) if enxuto else df
+
+
+def _primeira_data(caminho) -> pd.Timestamp:
+    """Data do primeiro foco do CSV (os arquivos exportados estão em ordem de data)."""
+    primeira = pd.read_csv(caminho, sep=",", usecols=['DataHora'], nrows=1)['DataHora']
+
+    return pd.Timestamp.max if primeira.empty else pd.to_datetime(primeira.iloc[0])
+
+
+async def _produzir(
+    pendentes: list[ArquivoCSV],
+    fila: asyncio.Queue,
+    settings: Settings,
+    estado: _EstadoFeatures,
+    processos: ProcessPoolExecutor,
+    thread_features: ThreadPoolExecutor,
+):
+    """
+        Lê, trata e agrega os arquivos no pool de processos (no máximo ´INGESTAO_WORKERS´ arquivos ao
+        mesmo tempo), cria as features em ordem e coloca cada arquivo pronto na fila. Com a fila cheia
+        o ´put´ espera o consumidor, assim a memória fica limitada pelo tamanho da fila.
+    """
+    loop = asyncio.get_running_loop()
+    em_andamento = {}
+
+    def _submeter(indice: int):
+        if indice < len(pendentes):
+            em_andamento[indice] = loop.run_in_executor(
+                processos, _processar_arquivo_em_processo, pendentes[indice].caminho, settings,
+            )
+
+    for indice in range(settings.INGESTAO_WORKERS):
+        _submeter(indice)
+
+    try:
+        for indice, arquivo in enumerate(pendentes):
+            df, spans = await em_andamento.pop(indice)
+            perfil.anexar(spans)
+            _submeter(indice + settings.INGESTAO_WORKERS)
+
+            df = await loop.run_in_executor(
+                thread_features,
+                _gerar_features,
+                df,
+                arquivo,
+                estado,
+                settings.MEMORIA_ENXUTA,
+                settings.JANELAS_CALENDARIO,
+            )
+
+            logger.info(f"{arquivo.caminho.name} pronto para gravação ({len(df)} linhas)")
+            # Os limites usados neste arquivo vão junto, porque a thread de features já pode estar nos próximos.
+            await fila.put((arquivo, df, estado.limites))
+    finally:
+        for futuro in em_andamento.values():
+            futuro.cancel()
+        await fila.put(_FIM)
+
+
+async def _consumir(fila: asyncio.Queue, engine: Engine, historico: pd.DataFrame) -> int:
+    """
+        Grava os arquivos da fila, um por vez e em ordem, enquanto o produtor prepara os próximos.
+        O estado das janelas de cada arquivo é gravado na mesma transação das linhas dele.
+
+    Returns:
+        int: Quantidade de arquivos gravados.
+    """
+    engine_async = get_async_engine()
+    gravados = 0
+
+    while (item := await fila.get()) is not _FIM:
+        arquivo, df, limites = item
+
+        try:
+            await substituir_dados_arquivo_async(
+                engine=engine_async,
+                arquivo=arquivo,
+                df=df,
+                na_transacao=partial(atualizar_estado, historico=historico, df=df, limites=limites),
+            )
+        except Exception:
+            # As features dos próximos arquivos usam o histórico deste arquivo, então a carga para aqui.
+            logger.exception(f"Erro ao gravar {arquivo.caminho.name}")
+            await asyncio.to_thread(marcar_erro, engine=engine, arquivo=arquivo)
+            raise
+
+        historico = atualizar_historico(historico, df)
+        gravados += 1
+
+    return gravados
+
+
+async def carregar_dados_async(settings: Settings):
+    """
+        Carga com ´INGESTAO_ASYNC´: a leitura/tratamento/agregação (pool de processos) e as features
+        (uma thread) de um arquivo são feitas enquanto o arquivo anterior é gravado no banco.
+        Entre as duas partes fica uma fila com no máximo ´INGESTAO_FILA´ arquivos prontos.
+        No Postgres a gravação usa o COPY binário do asyncpg (´copy_records_to_table´).
+
+        Cada arquivo é gravado como uma carga incremental só com ele, então a carga assíncrona
+        precisa do ´FEATURES_INCREMENTAIS´ e os arquivos são processados em ordem de data.
+    """
+    if not settings.FEATURES_INCREMENTAIS:
+        raise ValueError(
+            "A INGESTAO_ASYNC cria as features de cada arquivo com o histórico dos arquivos anteriores, "
+            "como o FEATURES_INCREMENTAIS. Ative o FEATURES_INCREMENTAIS ou desative a INGESTAO_ASYNC."
+        )
+
+    engine, files, pendentes = preparar_carga(settings)
+
+    if not pendentes:
+        return
+
+    # Os nomes dos arquivos não precisam seguir a ordem das datas.
+    pendentes = sorted(pendentes, key=lambda arquivo: _primeira_data(arquivo.caminho))
+
+    historico, limites = carregar_estado(engine)
+    estado = _EstadoFeatures(historico=historico, limites=limites)
+
+    fila = asyncio.Queue(maxsize=settings.INGESTAO_FILA)
+    workers = min(settings.INGESTAO_WORKERS, len(pendentes))
+
+    with (
+        ProcessPoolExecutor(max_workers=workers) as processos,
+        ThreadPoolExecutor(max_workers=1, thread_name_prefix="features") as thread_features,
+    ):
+        produtor = asyncio.create_task(_produzir(pendentes, fila, settings, estado, processos, thread_features))
+
+        try:
+            gravados = await _consumir(fila, engine, historico)
+        except Exception:
+            produtor.cancel()
+            raise
+        finally:
+            await asyncio.gather(produtor, return_exceptions=True)
+            await get_async_engine().dispose()
+
+        # Erros do produtor (leitura ou features) aparecem aqui.
+        await produtor
+
+    logger.info(f"{gravados} de {len(files)} arquivos carregados.")
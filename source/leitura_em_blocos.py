@@ -0,0 +1,97 @@
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import pandas as pd
+
+from source.resources.logging import get_logger
+
+
+logger = get_logger()
+
+# Durante o tratamento de um bloco ele chega a existir em várias cópias ao mesmo tempo
+# (bloco lido, linhas válidas, linhas inválidas e a concatenação das duas).
+# Por isso o orçamento de memória é dividido por esse fator antes de virar quantidade de linhas.
+FATOR_COPIAS = 4
+
+# Quantidade de linhas lidas para estimar quanto cada linha ocupa em memória.
+LINHAS_AMOSTRA = 1000
+
+# Menor bloco aceito, para que um orçamento muito baixo não vire milhares de blocos minúsculos.
+LINHAS_MINIMAS_POR_BLOCO = 1000
+
+
+def estimar_linhas_por_bloco(csv_path: Path, memoria_mb: int) -> int:
+    """
+        Estima quantas linhas do CSV cabem no orçamento de memória, usando uma amostra do início do arquivo.
+
+    Args:
+        csv_path (Path): Caminho do CSV.
+        memoria_mb (int): Orçamento de memória (em MB) para o tratamento de um bloco.
+
+    Returns:
+        int: Quantidade de linhas por bloco.
+    """
+    amostra = pd.read_csv(csv_path, sep=",", nrows=LINHAS_AMOSTRA)
+
+    if amostra.empty:
+        return LINHAS_MINIMAS_POR_BLOCO
+
+    bytes_por_linha = amostra.memory_usage(index=True, deep=True).sum() / len(amostra)
+    linhas = int(memoria_mb * 1024 ** 2 / (bytes_por_linha * FATOR_COPIAS))
+
+    return max(linhas, LINHAS_MINIMAS_POR_BLOCO)
+
+
+def agrupar_blocos_por_data(blocos: Iterable[pd.DataFrame], coluna_data: str = 'Data') -> Iterator[pd.DataFrame]:
+    """
+        Recebe os blocos lidos do CSV e devolve blocos que nunca dividem um mesmo dia entre dois blocos.
+        As linhas do último dia de cada bloco ficam guardadas e são juntadas ao bloco seguinte,
+        assim todo grupo (Data, Municipio) é tratado e agregado por inteiro.
+
+        Os CSVs do INPE vêm ordenados por ´DataHora´. Se aparecer uma linha de um dia que já foi
+        devolvido, o resultado deixaria de ser igual ao da leitura em memória, então é lançado um erro.
+
+    Args:
+        blocos (Iterable[pd.DataFrame]): Blocos já com a coluna ´coluna_data´.
+        coluna_data (str): Coluna usada para separar os dias.
+
+    Yields:
+        pd.DataFrame: Blocos com dias completos.
+    """
+    pendentes = None
+    ultima_data_devolvida = None
+
+    for bloco in blocos:
+
+        if bloco.empty:
+            continue
+
+        datas = bloco[coluna_data]
+
+        if ultima_data_devolvida is not None and (datas <= ultima_data_devolvida).any():
+            raise ValueError(
+                f"O arquivo não está ordenado por '{coluna_data}': foram encontradas linhas de um dia "
+                f"anterior ou igual a {ultima_data_devolvida} depois desse dia já ter sido processado. "
+                "Desative o INGESTAO_STREAMING para processar esse arquivo."
+            )
+
+        if pendentes is not None:
+            bloco = pd.concat([pendentes, bloco], ignore_index=True)
+            datas = bloco[coluna_data]
+
+        ultima_data = datas.max()
+        fronteira = (datas == ultima_data).to_numpy()
+
+        pendentes = bloco.loc[fronteira]
+        completos = bloco.loc[~fronteira]
+
+        if completos.empty:
+            logger.warning(f"O dia {ultima_data} é maior que o bloco, juntando com o próximo bloco...")
+            continue
+
+        ultima_data_devolvida = completos[coluna_data].max()
+
+        yield completos.reset_index(drop=True)
+
+    if pendentes is not None and not pendentes.empty:
+        yield pendentes.reset_index(drop=True)
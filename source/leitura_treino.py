@@ -0,0 +1,135 @@
+import itertools
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Engine
+
+from source.resources.logging import get_logger
+from source.tabela_dados import COLUNAS_DADOS, consulta_dados
+
+
+logger = get_logger()
+
+COLUNA_TARGET = 'Categoria_Risco'
+
+# Colunas que não entram no modelo: identificação da linha e o próprio target.
+COLUNAS_NAO_FEATURES = ('Municipio', 'Arquivo', COLUNA_TARGET)
+
+# Ordem fixa das features, a mesma da ´dados_csv´.
+COLUNAS_FEATURES = tuple(coluna for coluna in COLUNAS_DADOS if coluna not in COLUNAS_NAO_FEATURES)
+
+LINHAS_POR_LOTE = 65_536
+
+
+@dataclass(frozen=True)
+class LoteTreino:
+    """
+        Lote de treino: ´X´ é uma matriz float32 contígua (linhas x features, na ordem de ´colunas´)
+        e ´y´ o vetor int8 com o código da ´Categoria_Risco´ de cada linha.
+    """
+    X: np.ndarray
+    y: np.ndarray
+    colunas: tuple[str, ...]
+
+
+def _validar_features(colunas) -> tuple[str, ...]:
+    colunas = COLUNAS_FEATURES if colunas is None else tuple(colunas)
+
+    invalidas = [coluna for coluna in colunas if coluna not in COLUNAS_FEATURES]
+    if invalidas:
+        raise ValueError(f"Colunas que não são features numéricas da dados_csv: {invalidas}")
+
+    if not colunas:
+        raise ValueError("Informe ao menos uma feature.")
+
+    return colunas
+
+
+def _converter_linhas(linhas: list, largura: int) -> np.ndarray:
+    """
+        Converte as linhas do cursor em uma matriz float32. O ´np.fromiter´ lê os valores em sequência
+        sem olhar cada linha como objeto (bem mais rápido que ´np.array´ sobre as linhas), mas não aceita
+        nulos: nesse caso as linhas viram tuplas e o ´np.array´ troca os nulos por NaN.
+    """
+    try:
+        valores = np.fromiter(
+            itertools.chain.from_iterable(linhas),
+            dtype=np.float32,
+            count=len(linhas) * largura,
+        )
+    except TypeError:
+        return np.array([tuple(linha) for linha in linhas], dtype=np.float32)
+
+    return valores.reshape(len(linhas), largura)
+
+
+def _montar_lote(linhas: list, colunas: tuple[str, ...]) -> LoteTreino:
+    # O target é a última coluna: os códigos 0, 1 e 2 são exatos em float32.
+    valores = _converter_linhas(linhas, len(colunas) + 1)
+
+    y = valores[:, -1]
+    sem_target = np.isnan(y)
+
+    if sem_target.any():
+        logger.warning(f"{int(sem_target.sum())} linhas sem {COLUNA_TARGET} ignoradas no lote.")
+        valores = valores[~sem_target]
+        y = valores[:, -1]
+
+    return LoteTreino(
+        X=np.ascontiguousarray(valores[:, :-1]),
+        y=y.astype(np.int8),
+        colunas=colunas,
+    )
+
+
+def ler_lotes_treino(
+    engine: Engine,
+    colunas: list[str] | None = None,
+    inicio: date | str | pd.Timestamp | None = None,
+    fim: date | str | pd.Timestamp | None = None,
+    municipios: list[str] | None = None,
+    linhas_por_lote: int = LINHAS_POR_LOTE,
+) -> Iterator[LoteTreino]:
+    """
+        Lê a ´dados_csv´ em lotes de ´linhas_por_lote´ linhas por um cursor do lado do servidor
+        (´stream_results´: cursor nomeado no Postgres, leitura sob demanda no SQLite), em vez de carregar a
+        tabela inteira com ´pd.read_sql´. Somente as linhas de um lote existem como objetos Python por
+        vez: cada lote é convertido em arrays NumPy antes de buscar o próximo.
+
+        Os filtros e a ordem (data e município) são os mesmos do ´ler_dados´.
+
+    Args:
+        engine (Engine): Engine do banco de dados.
+        colunas (list[str] | None): Features, na ordem das colunas de ´X´. None para ´COLUNAS_FEATURES´.
+        inicio: Primeira data, None para não limitar.
+        fim: Última data, None para não limitar.
+        municipios (list[str] | None): Municípios, None para todos.
+        linhas_por_lote (int): Linhas de cada lote.
+
+    Returns:
+        Iterator[LoteTreino]: Lotes com ´X´ float32 e ´y´ int8.
+    """
+    colunas = _validar_features(colunas)
+
+    consulta = consulta_dados(
+        inicio=inicio,
+        fim=fim,
+        municipios=municipios,
+        colunas=[*colunas, COLUNA_TARGET],
+    )
+
+    with engine.connect() as conn:
+        resultado = conn.execution_options(
+            stream_results=True,
+            max_row_buffer=linhas_por_lote,
+        ).execute(consulta)
+
+        for linhas in resultado.partitions(linhas_por_lote):
+            lote = _montar_lote(linhas, colunas)
+            del linhas
+
+            if len(lote.y):
+                yield lote
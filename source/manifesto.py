@@ -0,0 +1,258 @@
+import hashlib
+from dataclasses import dataclass
+from pathlib import Path
+
+import pandas as pd
+from typing import TYPE_CHECKING, Callable
+
+from sqlalchemy import BigInteger, Connection, Engine, inspect, select, text
+from sqlalchemy.orm import Session
+
+from source.models.manifesto import ManifestoArquivo
+from source.resources.logging import get_logger
+from source.tabela_dados import TABELA_DADOS, gravar_dados, gravar_dados_async
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+logger = get_logger()
+
+STATUS_CONCLUIDO = "concluido"
+STATUS_ERRO = "erro"
+
+# Tamanho do pedaço do arquivo lido por vez no cálculo do hash.
+_BLOCO_HASH = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class ArquivoCSV:
+    caminho: Path
+    tamanho: int
+    mtime: float
+    hash: str
+
+
+def calcular_hash(caminho: Path) -> str:
+    """
+        Calcula o SHA-256 do conteúdo do arquivo, lendo em pedaços para não carregar o arquivo inteiro.
+
+    Args:
+        caminho (Path): Caminho do arquivo.
+
+    Returns:
+        str: Hash em hexadecimal.
+    """
+    sha = hashlib.sha256()
+
+    with open(caminho, "rb") as arquivo:
+        for bloco in iter(lambda: arquivo.read(_BLOCO_HASH), b""):
+            sha.update(bloco)
+
+    return sha.hexdigest()
+
+
+def create_table_manifesto(engine: Engine):
+    ManifestoArquivo.metadata.create_all(engine, tables=[ManifestoArquivo.__table__])
+
+    # Manifestos criados com ´tamanho´ INTEGER estouram no Postgres com CSVs acima de 2 GiB.
+    # No SQLite o INTEGER já tem 64 bits.
+    if engine.dialect.name == "postgresql":
+        tabela = ManifestoArquivo.__tablename__
+        colunas = {coluna['name']: coluna['type'] for coluna in inspect(engine).get_columns(tabela)}
+        if not isinstance(colunas['tamanho'], BigInteger):
+            with engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {tabela} ALTER COLUMN tamanho TYPE BIGINT"))
+
+
+def arquivos_pendentes(engine: Engine, files: list[Path]) -> list[ArquivoCSV]:
+    """
+        Compara os CSVs com o manifesto e devolve somente os arquivos novos ou alterados.
+        Se o tamanho e a data de modificação forem os mesmos do manifesto o arquivo é ignorado sem
+        calcular o hash. Se algum dos dois mudou o hash é calculado, e o arquivo só é reprocessado
+        se o conteúdo realmente mudou.
+
+    Args:
+        engine (Engine): Engine do banco de dados.
+        files (list[Path]): Caminhos dos CSVs.
+
+    Returns:
+        list[ArquivoCSV]: Arquivos que precisam ser (re)processados, na mesma ordem de ´files´.
+    """
+    with Session(engine) as session:
+        manifesto = {
+            registro.caminho: registro
+            for registro in session.scalars(select(ManifestoArquivo))
+        }
+
+        pendentes = []
+
+        for csv_path in files:
+            caminho = csv_path.resolve()
+            stat = caminho.stat()
+            registro = manifesto.get(str(caminho))
+
+            concluido = registro is not None and registro.status == STATUS_CONCLUIDO
+
+            if concluido and registro.tamanho == stat.st_size and registro.mtime == stat.st_mtime:
+                logger.info(f"{csv_path.name} sem alterações, ignorando.")
+                continue
+
+            hash_arquivo = calcular_hash(caminho)
+
+            if concluido and registro.hash == hash_arquivo:
+                # Só a data de modificação mudou (ex.: arquivo copiado novamente), o conteúdo é o mesmo.
+                registro.tamanho = stat.st_size
+                registro.mtime = stat.st_mtime
+                logger.info(f"{csv_path.name} com o mesmo conteúdo, ignorando.")
+                continue
+
+            pendentes.append(ArquivoCSV(
+                caminho=caminho,
+                tamanho=stat.st_size,
+                mtime=stat.st_mtime,
+                hash=hash_arquivo,
+            ))
+
+        session.commit()
+
+    return pendentes
+
+
+def todos_arquivos(files: list[Path], pendentes: list[ArquivoCSV]) -> list[ArquivoCSV]:
+    """
+        Todos os CSVs de ´files´ como ´ArquivoCSV´, para reprocessar também os arquivos que não mudaram.
+        Os arquivos de ´pendentes´ são reaproveitados e o hash só é calculado para os demais.
+
+    Args:
+        files (list[Path]): Caminhos dos CSVs.
+        pendentes (list[ArquivoCSV]): Saída do ´arquivos_pendentes´ para os mesmos ´files´.
+
+    Returns:
+        list[ArquivoCSV]: Um arquivo por caminho, na mesma ordem de ´files´.
+    """
+    conhecidos = {arquivo.caminho: arquivo for arquivo in pendentes}
+    arquivos = []
+
+    for csv_path in files:
+        caminho = csv_path.resolve()
+        if caminho in conhecidos:
+            arquivos.append(conhecidos[caminho])
+            continue
+
+        stat = caminho.stat()
+        arquivos.append(ArquivoCSV(
+            caminho=caminho,
+            tamanho=stat.st_size,
+            mtime=stat.st_mtime,
+            hash=calcular_hash(caminho),
+        ))
+
+    return arquivos
+
+
+def _registrar(session: Session, arquivo: ArquivoCSV, status: str, linhas: int | None):
+    registro = session.scalar(
+        select(ManifestoArquivo).where(ManifestoArquivo.caminho == str(arquivo.caminho))
+    )
+
+    if registro is None:
+        registro = ManifestoArquivo(caminho=str(arquivo.caminho))
+        session.add(registro)
+
+    registro.tamanho = arquivo.tamanho
+    registro.mtime = arquivo.mtime
+    registro.hash = arquivo.hash
+    registro.linhas = linhas
+    registro.status = status
+
+
+def substituir_dados_arquivo(
+    engine: Engine,
+    arquivo: ArquivoCSV,
+    df: pd.DataFrame,
+    table_name: str = TABELA_DADOS,
+    na_transacao: Callable[[Connection], object] | None = None,
+) -> int:
+    """
+        Troca as linhas de um arquivo na tabela ´table_name´ pelas linhas de ´df´ e atualiza o manifesto.
+        A exclusão das linhas antigas, a gravação e o manifesto são feitos em uma única transação,
+        então se algo falhar a tabela continua com os dados da carga anterior. A gravação é um upsert
+        pela chave (Municipio, Ano, DiaAno): um dia que também está em outro arquivo fica com a última carga.
+
+    Args:
+        engine (Engine): Engine do banco de dados.
+        arquivo (ArquivoCSV): Arquivo de origem das linhas.
+        df (pd.DataFrame): Linhas já tratadas do arquivo, com a coluna ´Arquivo´.
+        table_name (str): Tabela onde as linhas são gravadas.
+        na_transacao (Callable[[Connection], object] | None): Chamada com a conexão antes do commit, para
+            gravar outras tabelas na mesma transação (ex.: o estado das janelas com ´atualizar_estado´).
+
+    Returns:
+        int: Quantidade de linhas inseridas.
+    """
+    with engine.begin() as conn:
+        conn.execute(
+            text(f"DELETE FROM {table_name} WHERE Arquivo = :arquivo"),
+            {"arquivo": str(arquivo.caminho)},
+        )
+
+        linhas = gravar_dados(conn, df, table_name=table_name)
+
+        _registrar_na_conexao(conn, arquivo, STATUS_CONCLUIDO, linhas)
+
+        if na_transacao is not None:
+            na_transacao(conn)
+
+    return linhas
+
+
+def _registrar_na_conexao(conn: Connection, arquivo: ArquivoCSV, status: str, linhas: int | None):
+    # Usa a transação da conexão, assim o manifesto só muda junto com os dados.
+    with Session(bind=conn) as session:
+        _registrar(session, arquivo, status, linhas)
+        session.flush()
+
+
+async def substituir_dados_arquivo_async(
+    engine: "AsyncEngine",
+    arquivo: ArquivoCSV,
+    df: pd.DataFrame,
+    table_name: str = TABELA_DADOS,
+    na_transacao: Callable[[Connection], object] | None = None,
+) -> int:
+    """
+        Versão assíncrona do ´substituir_dados_arquivo´: a exclusão das linhas antigas, o upsert
+        (COPY binário do asyncpg no Postgres) e o manifesto são feitos em uma única transação.
+
+    Args:
+        engine (AsyncEngine): Engine assíncrona do banco de dados.
+        arquivo (ArquivoCSV): Arquivo de origem das linhas.
+        df (pd.DataFrame): Linhas já tratadas do arquivo, com a coluna ´Arquivo´.
+        table_name (str): Tabela onde as linhas são gravadas.
+        na_transacao (Callable[[Connection], object] | None): Chamada (pelo ´run_sync´) com a conexão
+            antes do commit, como no ´substituir_dados_arquivo´.
+
+    Returns:
+        int: Quantidade de linhas inseridas.
+    """
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(f"DELETE FROM {table_name} WHERE Arquivo = :arquivo"),
+            {"arquivo": str(arquivo.caminho)},
+        )
+
+        linhas = await gravar_dados_async(conn, df, table_name=table_name)
+
+        await conn.run_sync(_registrar_na_conexao, arquivo, STATUS_CONCLUIDO, linhas)
+
+        if na_transacao is not None:
+            await conn.run_sync(na_transacao)
+
+    return linhas
+
+
+def marcar_erro(engine: Engine, arquivo: ArquivoCSV):
+    with Session(engine) as session:
+        _registrar(session, arquivo, STATUS_ERRO, None)
+        session.commit()
@@ -0,0 +1,134 @@
+"""
+    Modo de memória enxuta (´MEMORIA_ENXUTA´): colunas em tipos menores e copy-on-write do pandas no
+    lugar das cópias defensivas.
+
+    - Texto repetitivo (Municipio, Estado, Bioma, ...) vira categórica: um código por linha em vez de
+      uma string Python por linha.
+    - Números reais ficam em float32 e as colunas de calendário em int8/int16. O FRP continua em
+      float64 porque é comparado exatamente com os limites das categorias de risco, e as coordenadas
+      dos focos também até a agregação, porque a imputação compara distâncias com o raio de 5 km.
+    - Com o copy-on-write uma cópia rasa já protege o DataFreme de quem chamou: uma coluna só é
+      copiada quando é alterada, em vez de copiar o DataFreme inteiro na entrada de cada etapa.
+"""
+from contextlib import AbstractContextManager, nullcontext
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from source.cache_parquet import COLUNAS_CATEGORICAS, COLUNAS_UTILIZADAS
+
+
+# Colunas de texto guardadas como categóricas (as do CSV e o arquivo de origem de cada linha).
+COLUNAS_TEXTO = (*COLUNAS_CATEGORICAS, 'Arquivo')
+
+# Colunas que continuam em float64 depois da agregação e nos focos lidos do CSV.
+COLUNAS_FLOAT64 = ('FRP',)
+COLUNAS_FLOAT64_LEITURA = (*COLUNAS_FLOAT64, 'Latitude', 'Longitude')
+
+# Mesmos tipos da ´dados_csv´ (ver ´COLUNAS_DADOS´).
+TIPOS_CALENDARIO = {'Ano': np.int16, 'Mes': np.int8, 'Dia': np.int8, 'DiaAno': np.int16}
+
+# Linhas de cada bloco lido do CSV: só as strings de um bloco existem ao mesmo tempo.
+LINHAS_POR_BLOCO_CSV = 200_000
+
+
+def copy_on_write(ativo: bool = True) -> AbstractContextManager:
+    """
+        Ativa o copy-on-write do pandas somente dentro do bloco ´with´. A opção é global, então
+        ao sair do bloco ela volta ao valor anterior e o resto do processo (ex.: o motor de
+        pontuação ou um notebook) não muda de comportamento. Com ´ativo´ False não faz nada.
+    """
+    return pd.option_context('mode.copy_on_write', True) if ativo else nullcontext()
+
+
+def copy_on_write_ativo() -> bool:
+    return bool(pd.get_option('mode.copy_on_write'))
+
+
+def copia_defensiva(df: pd.DataFrame) -> pd.DataFrame:
+    """
+        Cópia de ´df´ que pode ser alterada sem mudar o original: rasa com o copy-on-write ativo,
+        completa sem ele.
+    """
+    return df.copy(deep=not copy_on_write_ativo())
+
+
+def reduzir_tipos(df: pd.DataFrame, manter_float64: tuple[str, ...] = COLUNAS_FLOAT64) -> pd.DataFrame:
+    """
+        Converte as colunas de ´df´ para os tipos do modo de memória enxuta: ´COLUNAS_TEXTO´ em
+        categóricas, float64 em float32 (menos ´manter_float64´), calendário em int8/int16 e os
+        demais inteiros em int32 (não menor, porque algumas features elevam inteiros ao quadrado).
+
+    Args:
+        df (pd.DataFrame): DataFreme em qualquer etapa do pipeline.
+        manter_float64 (tuple[str, ...]): Colunas float64 que não são convertidas.
+
+    Returns:
+        pd.DataFrame: DataFreme com os tipos reduzidos (as colunas já reduzidas não são copiadas).
+    """
+    tipos = {}
+
+    for coluna, tipo in df.dtypes.items():
+        if coluna in COLUNAS_TEXTO:
+            if tipo == object:
+                tipos[coluna] = 'category'
+        elif coluna in TIPOS_CALENDARIO:
+            if pd.api.types.is_integer_dtype(tipo) and tipo != TIPOS_CALENDARIO[coluna]:
+                tipos[coluna] = TIPOS_CALENDARIO[coluna]
+        elif tipo == np.float64 and coluna not in manter_float64:
+            tipos[coluna] = np.float32
+        elif tipo == np.int64:
+            tipos[coluna] = np.int32
+
+    return df.astype(tipos) if tipos else df
+
+
+def memoria_mb(df: pd.DataFrame) -> float:
+    """Memória ocupada por ´df´ (com o conteúdo das strings), em MB."""
+    return df.memory_usage(index=True, deep=True).sum() / 1024 ** 2
+
+
+def _unificar_categorias(partes: list[pd.DataFrame]) -> list[pd.DataFrame]:
+    """Mesmas categorias em todos os blocos, senão o ´pd.concat´ volta as colunas para texto."""
+    colunas = [coluna for coluna, tipo in partes[0].dtypes.items() if isinstance(tipo, pd.CategoricalDtype)]
+    categorias = {coluna: union_categoricals([parte[coluna] for parte in partes]).categories for coluna in colunas}
+
+    return [
+        parte.assign(**{coluna: parte[coluna].cat.set_categories(categorias[coluna]) for coluna in colunas})
+        for parte in partes
+    ]
+
+
+def ler_csv_enxuto(csv_path: Path, linhas_por_bloco: int = LINHAS_POR_BLOCO_CSV) -> pd.DataFrame:
+    """
+        Lê o CSV da INPE em blocos, convertendo cada bloco para os tipos finais antes de ler o próximo
+        (mesmas conversões do ´ler_csv_tipado´ seguidas do ´reduzir_tipos´). Assim as strings das
+        datas e das coordenadas de um único bloco existem por vez, em vez das do arquivo inteiro.
+
+    Args:
+        csv_path (Path): Caminho do CSV.
+        linhas_por_bloco (int): Linhas de cada bloco.
+
+    Returns:
+        pd.DataFrame: DataFreme com as colunas de ´COLUNAS_UTILIZADAS´ nos tipos reduzidos.
+    """
+    partes = []
+
+    for bloco in pd.read_csv(
+        csv_path,
+        sep=",",
+        usecols=lambda coluna: coluna in COLUNAS_UTILIZADAS,
+        dtype={coluna: 'category' for coluna in COLUNAS_CATEGORICAS},
+        chunksize=linhas_por_bloco,
+    ):
+        bloco['DataHora'] = pd.to_datetime(bloco['DataHora'])
+        bloco['Latitude'] = pd.to_numeric(bloco['Latitude'], errors='coerce')
+        bloco['Longitude'] = pd.to_numeric(bloco['Longitude'], errors='coerce')
+        partes.append(reduzir_tipos(bloco, manter_float64=COLUNAS_FLOAT64_LEITURA))
+
+    if not partes:
+        return pd.read_csv(csv_path, sep=",", usecols=lambda coluna: coluna in COLUNAS_UTILIZADAS)
+
+    return pd.concat(_unificar_categorias(partes), ignore_index=True)
@@ -0,0 +1,57 @@
+"""
+Ingestion manifest: one record per CSV file loaded into ``dados_csv``.
+"""
+from typing import Optional
+
+from sqlalchemy import BigInteger, Float, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from source.models.base_model import BaseModel
+
+
+class ManifestoArquivo(BaseModel):
+    """
+    State of a CSV file the last time it was ingested.
+
+    A file is skipped on the next run when its size and mtime (or, if those changed,
+    its content hash) still match the record and ``status`` is ``concluido``.
+    """
+
+    __tablename__ = "manifesto_arquivos"
+
+    caminho: Mapped[str] = mapped_column(
+        String(1024),
+        unique=True,
+        nullable=False,
+        doc="Resolved path of the CSV file"
+    )
+
+    tamanho: Mapped[int] = mapped_column(
+        BigInteger,
+        nullable=False,
+        doc="File size in bytes (full-history exports go past 2 GiB)"
+    )
+
+    mtime: Mapped[float] = mapped_column(
+        Float,
+        nullable=False,
+        doc="File modification time (seconds since the epoch)"
+    )
+
+    hash: Mapped[str] = mapped_column(
+        String(64),
+        nullable=False,
+        doc="SHA-256 of the file content"
+    )
+
+    linhas: Mapped[Optional[int]] = mapped_column(
+        Integer,
+        nullable=True,
+        doc="Number of rows written to dados_csv for this file"
+    )
+
+    status: Mapped[str] = mapped_column(
+        String(20),
+        nullable=False,
+        doc="concluido or erro"
+    )
@@ -0,0 +1,244 @@
+"""
+    Pontuação em lote: categoria de risco (Baixo/Médio/Alto) de cada município em um dia.
+
+    O ´MotorRisco´ carrega o modelo e o estado das janelas móveis (últimos registros de cada município e
+    limites da normalização, salvos na carga) uma única vez e mantém tudo em memória. Para os dados de um
+    dia novo as features são criadas pelo mesmo ´engenharia_features´ da carga incremental, completando as
+    janelas com esse histórico, e o lote inteiro é pontuado em uma única chamada do modelo.
+    Dias que já estão na ´dados_csv´ são pontuados com as features gravadas.
+
+    Uso:
+        python -m source.pontuacao --csv data/focos_2024-09-01.csv
+        python -m source.pontuacao --data 2024-09-01 --municipios ALTAMIRA "SÃO FÉLIX DO XINGU"
+"""
+import argparse
+import threading
+import time
+from datetime import date
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sqlalchemy import Engine
+
+from source.carregar_dados import CATEGORIAS_RISCO, categorias_como_texto, engenharia_features, processar_arquivo
+from source.core.database import get_sync_engine
+from source.core.settings import Settings
+from source.estado_features import carregar_estado, validar_continuacao
+from source.resources.logging import get_logger
+from source.tabela_dados import ler_dados
+from source.treinamento import ModeloRisco
+
+
+logger = get_logger()
+
+# Colunas de cada linha do dia (já agregada por município, como no ´agregar_por_dia_municipio´).
+COLUNAS_ENTRADA = ['Data', 'Municipio', 'FRP', 'RiscoFogo', 'Precipitacao', 'DiaSemChuva', 'Latitude', 'Longitude']
+
+COLUNAS_PROBABILIDADE = [f"Prob_{categoria}" for categoria in CATEGORIAS_RISCO]
+
+
+def ultimo_modelo(pasta: Path) -> Path:
+    """Modelo (´.joblib´) mais recente de ´pasta´."""
+    modelos = sorted(Path(pasta).glob("*.joblib"), key=lambda caminho: caminho.stat().st_mtime)
+
+    if not modelos:
+        raise FileNotFoundError(f"Nenhum modelo em {pasta}, execute o treino (python -m source.treinamento).")
+
+    return modelos[-1]
+
+
+class MotorRisco:
+    """
+        Modelo e estado das janelas em memória. Criar o motor é a parte lenta (leitura do modelo e do
+        estado); depois cada chamada do ´pontuar´ só cria as features do lote e chama o modelo.
+    """
+
+    def __init__(self, modelo: ModeloRisco, engine: Engine, janelas_calendario: bool = False):
+        self.modelo = modelo
+        self.engine = engine
+        self.janelas_calendario = janelas_calendario
+        self.recarregar_estado()
+        self._aquecer()
+
+    @classmethod
+    def carregar(cls, caminho: Path | str, engine: Engine, janelas_calendario: bool = False) -> "MotorRisco":
+        inicio = time.perf_counter()
+        motor = cls(joblib.load(caminho), engine, janelas_calendario=janelas_calendario)
+
+        logger.info(f"Modelo {Path(caminho).name} ({motor.modelo.tipo}) carregado em {time.perf_counter() - inicio:.3f}s")
+
+        return motor
+
+    def recarregar_estado(self):
+        """Lê de novo o estado das janelas, por exemplo depois de uma carga nova."""
+        self.historico, self.limites = carregar_estado(self.engine)
+
+        if self.limites is None:
+            raise ValueError("Nenhuma carga encontrada: o estado das janelas móveis está vazio.")
+
+    def _aquecer(self):
+        # A primeira chamada do modelo inicializa estruturas internas (e os threads do OpenMP no hgb).
+        self.modelo.prever_proba(np.zeros((1, len(self.modelo.colunas)), dtype=np.float32))
+
+    def montar_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+            Cria as features do modelo para as linhas de um dia novo, com as mesmas definições da carga: as janelas
+            móveis usam os últimos registros salvos de cada município e a normalização da Latitude e
+            Longitude usa os limites salvos.
+
+        Args:
+            df (pd.DataFrame): Uma linha por município e dia, com as colunas de ´COLUNAS_ENTRADA´.
+
+        Returns:
+            pd.DataFrame: Linhas de ´df´ com as features.
+        """
+        faltando = [coluna for coluna in COLUNAS_ENTRADA if coluna not in df.columns]
+        if faltando:
+            raise ValueError(f"Colunas ausentes nos dados do dia: {faltando}")
+
+        df = df[COLUNAS_ENTRADA].sort_values(['Data', 'Municipio'], kind='stable', ignore_index=True)
+        historico = self.historico.loc[self.historico['Municipio'].isin(df['Municipio'].unique())]
+
+        validar_continuacao(historico=historico, df=df)
+
+        # Somente as features usadas pelo modelo são criadas.
+        return engenharia_features(
+            df=df,
+            historico=historico,
+            limites_geograficos=self.limites,
+            features=self.modelo.colunas,
+            janelas_calendario=self.janelas_calendario,
+        )
+
+    def pontuar_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+            Pontua linhas que já têm as features do modelo, com uma única chamada do ´predict_proba´.
+
+        Returns:
+            pd.DataFrame: ´Municipio´, ´Data´, ´Categoria_Risco´ (código), ´Categoria´ e a probabilidade de cada categoria.
+        """
+        X = df[list(self.modelo.colunas)].to_numpy(dtype=np.float32)
+        probabilidades = self.modelo.prever_proba(X)
+
+        codigos = pd.Series(
+            self.modelo.estimador.classes_[probabilidades.argmax(axis=1)].astype(np.int8),
+            name='Categoria_Risco',
+        )
+
+        resultado = pd.DataFrame({
+            'Municipio': df['Municipio'].to_numpy(),
+            'Data': pd.to_datetime(df['Data']).to_numpy(),
+            'Categoria_Risco': codigos,
+            'Categoria': categorias_como_texto(codigos),
+        })
+        # Uma coluna por categoria; as que não apareceram no treino ficam com probabilidade 0.
+        for coluna in COLUNAS_PROBABILIDADE:
+            resultado[coluna] = np.float32(0)
+        for indice, classe in enumerate(self.modelo.estimador.classes_):
+            resultado[COLUNAS_PROBABILIDADE[classe]] = probabilidades[:, indice].astype(np.float32)
+
+        return resultado
+
+    def pontuar(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+            Categoria de risco de cada município para os dados de um dia novo (posterior à última carga).
+
+        Args:
+            df (pd.DataFrame): Uma linha por município e dia, com as colunas de ´COLUNAS_ENTRADA´.
+
+        Returns:
+            pd.DataFrame: Resultado do ´pontuar_features´.
+        """
+        inicio = time.perf_counter()
+        resultado = self.pontuar_features(self.montar_features(df))
+
+        logger.info(f"{len(resultado)} linhas pontuadas em {(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+        return resultado
+
+    def pontuar_chaves(self, chaves: pd.DataFrame) -> pd.DataFrame:
+        """
+            Pontua pares (Municipio, Data) que já estão na ´dados_csv´, lendo somente o período e os
+            municípios das chaves. Chaves que não estão na tabela ficam fora do resultado.
+
+        Args:
+            chaves (pd.DataFrame): Colunas ´Municipio´ e ´Data´.
+
+        Returns:
+            pd.DataFrame: Resultado do ´pontuar_features´.
+        """
+        inicio = time.perf_counter()
+        datas = pd.to_datetime(chaves['Data'])
+
+        df = ler_dados(
+            self.engine,
+            inicio=datas.min(),
+            fim=datas.max(),
+            municipios=chaves['Municipio'].unique().tolist(),
+            colunas=['Municipio', 'Ano', 'DiaAno', *[coluna for coluna in self.modelo.colunas if coluna not in ('Ano', 'DiaAno')]],
+        )
+        df['Data'] = pd.to_datetime(df['Ano'].astype(str), format='%Y') + pd.to_timedelta(df['DiaAno'].astype(int) - 1, unit='D')
+        df = df.merge(chaves[['Municipio']].assign(Data=datas), on=['Municipio', 'Data'])
+
+        resultado = self.pontuar_features(df)
+
+        logger.info(f"{len(resultado)} chaves pontuadas em {(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+        return resultado
+
+
+_motor: MotorRisco | None = None
+_lock = threading.Lock()
+
+
+def obter_motor(settings: Settings, caminho: Path | str | None = None) -> MotorRisco:
+    """
+        Motor do processo, criado na primeira chamada e reutilizado nas próximas (modelo sempre carregado).
+
+    Args:
+        settings (Settings): Configurações (pasta dos modelos e tipo das janelas móveis).
+        caminho (Path | str | None): Modelo a carregar, None para o mais recente de ´PATH_MODELOS´.
+    """
+    global _motor
+
+    with _lock:
+        if _motor is None:
+            _motor = MotorRisco.carregar(
+                caminho or ultimo_modelo(Path(settings.PATH_MODELOS)),
+                get_sync_engine(),
+                janelas_calendario=settings.JANELAS_CALENDARIO,
+            )
+
+        return _motor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    entrada = parser.add_mutually_exclusive_group(required=True)
+    entrada.add_argument("--csv", type=Path, help="CSV do INPE com os focos do dia (ainda não carregado).")
+    entrada.add_argument("--data", type=date.fromisoformat, help="Dia já carregado na dados_csv (YYYY-MM-DD).")
+    parser.add_argument("--municipios", nargs='+', default=None, help="Municípios pontuados com --data (padrão: todos).")
+    parser.add_argument("--modelo", type=Path, default=None, help="Modelo .joblib (padrão: o mais recente de PATH_MODELOS).")
+    parser.add_argument("--saida", type=Path, default=None, help="CSV de saída (padrão: imprime na tela).")
+    args = parser.parse_args()
+
+    settings = Settings()
+    motor = obter_motor(settings, args.modelo)
+
+    if args.csv is not None:
+        resultado = motor.pontuar(processar_arquivo(args.csv, settings))
+    else:
+        municipios = args.municipios or motor.historico['Municipio'].unique().tolist()
+        resultado = motor.pontuar_chaves(pd.DataFrame({'Municipio': municipios, 'Data': pd.Timestamp(args.data)}))
+
+    if args.saida is not None:
+        resultado.to_csv(args.saida, index=False)
+        logger.info(f"Resultado gravado em {args.saida}")
+    else:
+        print(resultado.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+    Registro das features: cada feature declara as colunas de entrada e como é calculada, e o
+    ´calcular_features´ calcula somente as features pedidas (por um modelo ou pelo esquema da tabela),
+    junto com as dependências delas, em ordem.
+
+    Existem dois tipos de feature:
+    - ´Feature´: calculada linha a linha a partir das entradas (uma operação vetorizada do pandas/numpy).
+    - ´JanelaMovel´: janela móvel por município (ver ´features_moveis´). Todas as janelas do mesmo nível
+      são calculadas juntas, com uma única ordenação por município e data.
+
+    Uma dependência usada por várias features (por exemplo a ´Precipitacao_acumulada_7´ no ´Solo_Seco´)
+    é calculada uma única vez. As dependências que não foram pedidas não ficam no resultado.
+"""
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+import numpy as np
+import pandas as pd
+
+from source.cubo_diario import CuboDiario, calcular_janelas_calendario
+from source.features_moveis import JANELAS_MOVEIS, JanelaMovel, calcular_janelas_moveis
+from source.tabela_dados import COLUNAS_DADOS
+
+
+@dataclass(frozen=True)
+class Feature:
+    """
+        Uma feature calculada linha a linha: ´calcular´ recebe o DataFreme (já com as ´entradas´) e
+        os limites geográficos da normalização e devolve os valores da coluna ´nome´.
+    """
+    nome: str
+    entradas: tuple[str, ...]
+    calcular: Callable[[pd.DataFrame, dict[str, float] | None], pd.Series | np.ndarray]
+
+
+def _entradas(feature: Feature | JanelaMovel) -> tuple[str, ...]:
+    return (feature.coluna,) if isinstance(feature, JanelaMovel) else feature.entradas
+
+
+def _normalizar(coluna: str) -> Callable[[pd.DataFrame, dict[str, float] | None], pd.Series]:
+    def calcular(df: pd.DataFrame, limites: dict[str, float] | None) -> pd.Series:
+        # Sem os limites de uma carga anterior são usados os limites do próprio ´df´.
+        if limites is None:
+            minimo, maximo = df[coluna].min(), df[coluna].max()
+        else:
+            minimo, maximo = limites[f'{coluna}_min'], limites[f'{coluna}_max']
+
+        return (df[coluna] - minimo) / (maximo - minimo)
+
+    return calcular
+
+
+FEATURES = [
+    # ===== FEATURES TEMPORAIS =====
+    Feature('Ano', ('Data',), lambda df, _: df['Data'].dt.year),
+    Feature('Mes', ('Data',), lambda df, _: df['Data'].dt.month),
+    Feature('Dia', ('Data',), lambda df, _: df['Data'].dt.day),
+    Feature('DiaAno', ('Data',), lambda df, _: df['Data'].dt.dayofyear),
+
+    # ===== FEATURES LÓGICAS =====
+    # Nós criamos essas features para que o modelo entenda que os valores 'Dia' e 'Mes'
+    # não são valores continuos, eles tem uma lógica por trás.
+    # A forma com que implementamos isso é como se criassemos um relógio onde cada valor
+    # tem sua posição dentro dele e toda vez que o ultimo valor do relógio é atingido
+    # o ciclo se reinicia e volta para o valor inicial.
+    # Criamos essa features por que se mantivessemos as features somente como 'Dia' e 'Mes'
+    # o modelo iria entender esses valores como valores continuos, mas na verdade não são.
+    Feature('Mes_sin', ('Mes',), lambda df, _: np.sin(2 * np.pi * df['Mes'] / 12)),
+    Feature('Mes_cos', ('Mes',), lambda df, _: np.cos(2 * np.pi * df['Mes'] / 12)),
+    Feature('DiaAno_sin', ('DiaAno',), lambda df, _: np.sin(2 * np.pi * df['DiaAno'] / 365)),
+    Feature('DiaAno_cos', ('DiaAno',), lambda df, _: np.cos(2 * np.pi * df['DiaAno'] / 365)),
+
+    # ===== FEATURES DE INTERAÇÃO =====
+    # Essa feature é importante para determinar o Risco das queimadas, ou seja, se estiver tendo fogo e chuva
+    # o perigo não é tão alto, agora se estiver com Risco de Fogo e não estiver chovendo o perigo é grande.
+    # Então seria uma forma de entender qual o Risco da queimada que está ou irá acontecer.
+    Feature('RiscoFogo_x_DiaSemChuva', ('RiscoFogo', 'DiaSemChuva'), lambda df, _: df['RiscoFogo'] * df['DiaSemChuva']),
+
+    # ===== FEATURES EXPANÇÃO POLINOMIAL =====
+    # Utilizamos o conceito de expansão polinomial para entendermos a não linearidade dos dados e o modelo
+    # conseguir predizer de uma forma mais acertiva.
+    Feature('RiscoFogo_squared', ('RiscoFogo',), lambda df, _: df['RiscoFogo'] ** 2),
+    Feature('DiaSemChuva_squared', ('DiaSemChuva',), lambda df, _: df['DiaSemChuva'] ** 2),
+
+    # ===== FEATURES GEOGRÁFICAS NORMALIZADAS =====
+    # Aqui normalizamos a Latitude e Longitude para igualar a importância numérica, assim o modelo não entende que
+    # a Latitude e Longitude tem mais importância do que os demais parametros.
+    Feature('Latitude_norm', ('Latitude', 'Longitude'), _normalizar('Latitude')),
+    Feature('Longitude_norm', ('Latitude', 'Longitude'), _normalizar('Longitude')),
+
+    # ===== FEATURES DE JANELA MÓVEL =====
+    # Médias móveis, volatilidade, extremos e acumulação por Município (ver ´JANELAS_MOVEIS´).
+    *JANELAS_MOVEIS,
+
+    # ===== FEATURES AVANÇADAS (docs/CALCULOS.md, seção 5) =====
+    # Variação em relação ao registro anterior do Município: aceleração ou desaceleração recente.
+    JanelaMovel('RiscoFogo_delta_1', 'RiscoFogo', 'delta', 2),
+    JanelaMovel('Precipitacao_delta_1', 'Precipitacao', 'delta', 2),
+
+    # Solo seco: mais de 7 dias sem chuva e menos de 5 mm acumulados nos últimos 7 registros.
+    Feature(
+        'Solo_Seco',
+        ('DiaSemChuva', 'Precipitacao_acumulada_7'),
+        lambda df, _: ((df['DiaSemChuva'] > 7) & (df['Precipitacao_acumulada_7'] < 5)).astype(np.int8),
+    ),
+
+    # Quantos dos 7 registros anteriores do Município tiveram fogo (FRP > 0), sem o registro atual:
+    # a soma da janela de 8 registros menos o registro atual. Como nas outras janelas, as primeiras
+    # linhas de cada Município usam os registros que existem.
+    Feature('Teve_Fogo', ('FRP',), lambda df, _: (df['FRP'] > 0).astype(np.int8)),
+    JanelaMovel('Teve_Fogo_soma_8', 'Teve_Fogo', 'sum', 8),
+    Feature('Dias_com_Fogo_7', ('Teve_Fogo_soma_8', 'Teve_Fogo'), lambda df, _: df['Teve_Fogo_soma_8'] - df['Teve_Fogo']),
+]
+
+REGISTRO_FEATURES: dict[str, Feature | JanelaMovel] = {feature.nome: feature for feature in FEATURES}
+
+# Features gravadas na ´dados_csv´, calculadas na carga.
+FEATURES_PADRAO = tuple(nome for nome in REGISTRO_FEATURES if nome in COLUNAS_DADOS)
+
+_POSICAO = {nome: posicao for posicao, nome in enumerate(REGISTRO_FEATURES)}
+
+
+def colunas_originais(nomes: Iterable[str]) -> set[str]:
+    """
+        Colunas dos dados (fora do registro) lidas pelas features ´nomes´, diretamente ou pelas
+        dependências. Por exemplo o ´Dias_com_Fogo_7´ lê o ´FRP´ pelo ´Teve_Fogo´.
+    """
+    originais: set[str] = set()
+    pendentes = list(nomes)
+
+    while pendentes:
+        nome = pendentes.pop()
+        if nome in REGISTRO_FEATURES:
+            pendentes.extend(_entradas(REGISTRO_FEATURES[nome]))
+        else:
+            originais.add(nome)
+
+    return originais
+
+
+# Janelas móveis do registro e as colunas dos dados lidas por elas: é o que o histórico (estado
+# salvo na carga) precisa ter para completar as janelas de qualquer feature registrada.
+JANELAS_REGISTRO = [feature for feature in FEATURES if isinstance(feature, JanelaMovel)]
+COLUNAS_JANELAS = sorted(colunas_originais(janela.coluna for janela in JANELAS_REGISTRO))
+
+
+def resolver_features(nomes: Iterable[str], colunas: Iterable[str]) -> list[str]:
+    """
+        Ordem de cálculo das features ´nomes´ e das dependências delas: cada feature vem depois das
+        suas entradas e, entre features independentes, na ordem do registro.
+
+    Args:
+        nomes (Iterable[str]): Features pedidas. Colunas que já existem nos dados podem ser pedidas também.
+        colunas (Iterable[str]): Colunas que já existem nos dados.
+
+    Returns:
+        list[str]: Features do registro que precisam ser calculadas, em ordem.
+    """
+    colunas = set(colunas)
+    ordem: list[str] = []
+    resolvidas: set[str] = set()
+    visitando: list[str] = []
+
+    def visitar(nome: str):
+        if nome in resolvidas:
+            return
+        if nome not in REGISTRO_FEATURES:
+            if nome in colunas:
+                return
+            raise ValueError(f"'{nome}' não é uma feature registrada nem uma coluna dos dados.")
+        if nome in visitando:
+            raise ValueError(f"Dependência circular entre as features: {' -> '.join(visitando + [nome])}")
+
+        visitando.append(nome)
+        for entrada in _entradas(REGISTRO_FEATURES[nome]):
+            visitar(entrada)
+        visitando.pop()
+
+        resolvidas.add(nome)
+        ordem.append(nome)
+
+    for nome in sorted(set(nomes), key=lambda nome: _POSICAO.get(nome, len(_POSICAO))):
+        visitar(nome)
+
+    return ordem
+
+
+def _niveis(ordem: list[str]) -> dict[str, int]:
+    """
+        Nível de cada feature: quantas janelas móveis existem no caminho mais longo até as colunas
+        originais. As janelas do mesmo nível não dependem umas das outras e são calculadas juntas.
+    """
+    niveis = {}
+
+    for nome in ordem:
+        feature = REGISTRO_FEATURES[nome]
+        nivel = max((niveis.get(entrada, 0) for entrada in _entradas(feature)), default=0)
+        niveis[nome] = nivel + 1 if isinstance(feature, JanelaMovel) else nivel
+
+    return niveis
+
+
+def _historico_janelas(
+    historico: pd.DataFrame | None,
+    janelas: list[JanelaMovel],
+    limites: dict[str, float] | None,
+) -> pd.DataFrame | None:
+    """
+        Histórico com as colunas lidas pelas ´janelas´. As entradas que são features linha a linha
+        (como o ´Teve_Fogo´) são calculadas também nas linhas do histórico.
+    """
+    if historico is None or historico.empty:
+        return historico
+
+    faltando = [janela.coluna for janela in janelas if janela.coluna not in historico.columns]
+    if not faltando:
+        return historico
+
+    historico = historico.copy()
+
+    for nome in resolver_features(faltando, historico.columns):
+        feature = REGISTRO_FEATURES[nome]
+        if isinstance(feature, JanelaMovel):
+            raise ValueError(
+                f"A janela sobre '{nome}' precisa do histórico de outra janela móvel, "
+                "o que não é possível no modo incremental."
+            )
+        historico[nome] = feature.calcular(historico, limites)
+
+    return historico
+
+
+def calcular_features(
+    df: pd.DataFrame,
+    nomes: Iterable[str] = FEATURES_PADRAO,
+    historico: pd.DataFrame | None = None,
+    limites_geograficos: dict[str, float] | None = None,
+    janelas_calendario: bool = False,
+    cubo: CuboDiario | None = None,
+    coluna_grupo: str = 'Municipio',
+) -> pd.DataFrame:
+    """
+        Calcula as features ´nomes´ (e somente as dependências delas) nível a nível: primeiro as
+        janelas móveis do nível, todas juntas, e depois as features linha a linha que dependem delas.
+        As colunas são criadas em ´df´, então quem chama deve passar uma cópia.
+
+    Args:
+        df (pd.DataFrame): DataFreme com as colunas de entrada (´Data´ já em datetime).
+        nomes (Iterable[str]): Features pedidas, por padrão as colunas da ´dados_csv´.
+        historico (pd.DataFrame | None): Registros anteriores a ´df´, usados somente para completar
+            as janelas móveis (ver ´calcular_janelas_moveis´).
+        limites_geograficos (dict[str, float] | None): Limites da normalização da Latitude e Longitude.
+            Quando None são usados os limites do próprio ´df´.
+        janelas_calendario (bool): Janelas em dias do calendário, calculadas no cubo diário, em vez
+            de janelas em registros.
+        cubo (CuboDiario | None): Cubo diário já montado com ´df´ e o histórico (só com ´janelas_calendario´).
+        coluna_grupo (str): Coluna que separa as séries das janelas móveis (´Celula´ na agregação em grade).
+
+    Returns:
+        pd.DataFrame: ´df´ com as features pedidas.
+    """
+    nomes = list(nomes)
+    originais = set(df.columns)
+    ordem = resolver_features(nomes, originais)
+    niveis = _niveis(ordem)
+
+    for nivel in range(max(niveis.values(), default=-1) + 1):
+        janelas = [
+            REGISTRO_FEATURES[nome] for nome in ordem
+            if niveis[nome] == nivel and isinstance(REGISTRO_FEATURES[nome], JanelaMovel)
+        ]
+        if janelas:
+            historico_janelas = _historico_janelas(historico, janelas, limites_geograficos)
+            if janelas_calendario:
+                df_janelas = calcular_janelas_calendario(
+                    df, janelas=janelas, coluna_grupo=coluna_grupo, historico=historico_janelas, cubo=cubo,
+                )
+            else:
+                df_janelas = calcular_janelas_moveis(
+                    df, janelas=janelas, coluna_grupo=coluna_grupo, historico=historico_janelas,
+                )
+            df[df_janelas.columns] = df_janelas
+
+        for nome in ordem:
+            feature = REGISTRO_FEATURES[nome]
+            if niveis[nome] == nivel and isinstance(feature, Feature):
+                df[nome] = feature.calcular(df, limites_geograficos)
+
+    # Dependências calculadas somente para outras features.
+    intermediarias = [nome for nome in ordem if nome not in nomes and nome not in originais]
+
+    return df.drop(columns=intermediarias) if intermediarias else df
@@ -0,0 +1,141 @@
+"""
+    Cálculo vetorizado da distância haversine (em km) entre coordenadas geográficas.
+
+    Todas as funções recebem arrays (ou qualquer coisa que o numpy consiga converter, como pd.Series
+    e escalares) com latitude e longitude em graus e fazem o cálculo inteiro com operações do numpy,
+    sem laços em Python.
+"""
+from typing import Iterator
+
+import numpy as np
+
+
+# Raio médio da Terra em km.
+RAIO_TERRA_KM = 6371
+
+# Quantidade padrão de linhas da matriz calculadas por vez no modo par a par.
+# 2048 linhas x 10.000 colunas em float64 ocupam ~160 MB por bloco temporário.
+TAMANHO_BLOCO_PADRAO = 2048
+
+
+def _para_radianos(*valores) -> list[np.ndarray]:
+    return [np.radians(np.asarray(valor, dtype=np.float64)) for valor in valores]
+
+
+def _haversine_radianos(lat1, lon1, lat2, lon2) -> np.ndarray:
+    # sin(dlat/2)**2 → quanto você subiu/desceu (latitude)
+    # cos(lat1) * cos(lat2) * sin(dlon/2)**2 → quanto você se moveu lateralmente (longitude)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+
+    # O np.minimum evita que erros de arredondamento deixem ´a´ um pouco acima de 1 (arcsin inválido).
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def distancia_haversine(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """
+        Distância haversine elemento a elemento entre (lat1, lon1) e (lat2, lon2).
+        Os argumentos seguem as regras de broadcast do numpy, então também servem
+        para comparar um ponto com muitos ou dois vetores do mesmo tamanho.
+
+    Args:
+        lat1: Latitude(s) do primeiro ponto, em graus.
+        lon1: Longitude(s) do primeiro ponto, em graus.
+        lat2: Latitude(s) do segundo ponto, em graus.
+        lon2: Longitude(s) do segundo ponto, em graus.
+
+    Returns:
+        np.ndarray: Distância(s) em km.
+    """
+    return _haversine_radianos(*_para_radianos(lat1, lon1, lat2, lon2))
+
+
+def distancia_um_para_muitos(latitude: float, longitude: float, latitudes, longitudes) -> np.ndarray:
+    """
+        Distância de um único ponto até cada um dos pontos de ´latitudes´/´longitudes´.
+
+    Args:
+        latitude (float): Latitude do ponto de origem, em graus.
+        longitude (float): Longitude do ponto de origem, em graus.
+        latitudes: Latitudes dos pontos de destino, em graus.
+        longitudes: Longitudes dos pontos de destino, em graus.
+
+    Returns:
+        np.ndarray: Vetor com a distância em km até cada ponto de destino.
+    """
+    return distancia_haversine(latitude, longitude, latitudes, longitudes).reshape(-1)
+
+
+def blocos_matriz_distancias(
+    lat1, lon1, lat2, lon2,
+    tamanho_bloco: int = TAMANHO_BLOCO_PADRAO,
+) -> Iterator[tuple[int, np.ndarray]]:
+    """
+        Calcula a matriz de distâncias par a par em blocos de linhas, para que a memória usada
+        dependa do ´tamanho_bloco´ e não da quantidade total de pontos de origem.
+
+    Args:
+        lat1, lon1: Coordenadas dos pontos de origem (linhas da matriz), em graus.
+        lat2, lon2: Coordenadas dos pontos de destino (colunas da matriz), em graus.
+        tamanho_bloco (int): Quantidade de linhas calculadas por vez.
+
+    Yields:
+        tuple[int, np.ndarray]: Índice da primeira linha do bloco e o bloco (linhas x len(lat2)) em km.
+    """
+    if tamanho_bloco <= 0:
+        raise ValueError("tamanho_bloco deve ser maior que zero.")
+
+    lat1, lon1, lat2, lon2 = _para_radianos(lat1, lon1, lat2, lon2)
+    lat1, lon1 = lat1.reshape(-1), lon1.reshape(-1)
+    lat2, lon2 = lat2.reshape(1, -1), lon2.reshape(1, -1)
+
+    for inicio in range(0, len(lat1), tamanho_bloco):
+        fim = inicio + tamanho_bloco
+        yield inicio, _haversine_radianos(
+            lat1[inicio:fim, None], lon1[inicio:fim, None], lat2, lon2,
+        )
+
+
+def matriz_distancias(lat1, lon1, lat2, lon2, tamanho_bloco: int = TAMANHO_BLOCO_PADRAO) -> np.ndarray:
+    """
+        Matriz (len(lat1) x len(lat2)) com a distância de cada ponto de origem até cada ponto de destino.
+        O cálculo é feito em blocos de ´tamanho_bloco´ linhas para limitar os arrays temporários.
+
+    Returns:
+        np.ndarray: Matriz de distâncias em km (float64).
+    """
+    matriz = np.empty((np.size(lat1), np.size(lat2)), dtype=np.float64)
+
+    for inicio, bloco in blocos_matriz_distancias(lat1, lon1, lat2, lon2, tamanho_bloco):
+        matriz[inicio:inicio + len(bloco)] = bloco
+
+    return matriz
+
+
+def dentro_do_raio(lat1, lon1, lat2, lon2, raio_km: float) -> np.ndarray:
+    """
+        Versão booleana de ´distancia_haversine´: True onde a distância é menor ou igual a ´raio_km´.
+
+    Returns:
+        np.ndarray: Array booleano com o mesmo formato do broadcast dos argumentos.
+    """
+    return distancia_haversine(lat1, lon1, lat2, lon2) <= raio_km
+
+
+def matriz_dentro_do_raio(
+    lat1, lon1, lat2, lon2,
+    raio_km: float,
+    tamanho_bloco: int = TAMANHO_BLOCO_PADRAO,
+) -> np.ndarray:
+    """
+        Versão booleana de ´matriz_distancias´. A matriz final usa 1 byte por par (em vez de 8),
+        o que permite comparar conjuntos bem maiores de pontos.
+
+    Returns:
+        np.ndarray: Matriz booleana (len(lat1) x len(lat2)).
+    """
+    matriz = np.empty((np.size(lat1), np.size(lat2)), dtype=bool)
+
+    for inicio, bloco in blocos_matriz_distancias(lat1, lon1, lat2, lon2, tamanho_bloco):
+        matriz[inicio:inicio + len(bloco)] = bloco <= raio_km
+
+    return matriz
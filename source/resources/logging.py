@@ -2,12 +2,21 @@ import logging
 import os
 import pathlib
 import re
+import threading
 from datetime import datetime
 from sys import stdout
 from typing import Optional
 
 from source.core.settings import settings
 
+_LEVEL_MAP = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+    "CRITICAL": logging.CRITICAL,
+}
+
 formatter = logging.Formatter(
     '[%(levelname)s]: [%(filename)s line - %(lineno)d] '
     '| Date_Time: %(asctime)s | Function: [%(funcName)s] | Message: ➪ %(message)s '
@@ -35,14 +44,7 @@ def init_logging(
     logger.handlers.clear()
 
     # Definir nível
-    level_map = {
-        "DEBUG": logging.DEBUG,
-        "INFO": logging.INFO,
-        "WARNING": logging.WARNING,
-        "ERROR": logging.ERROR,
-        "CRITICAL": logging.CRITICAL,
-    }
-    logger.setLevel(level_map.get(settings.LOG_LEVEL.upper(), logging.INFO))
+    logger.setLevel(_LEVEL_MAP.get(settings.LOG_LEVEL.upper(), logging.INFO))
 
     # --- STDOUT ---
     stdout_handler = logging.StreamHandler(stdout)
@@ -91,8 +93,37 @@ def init_logging(
     return logger
 
 
+class _LazyInitHandler(logging.Handler):
+    """
+    Placeholder handler installed by ``get_logger``: the first record that reaches it runs
+    ``init_logging()`` (which replaces this handler with the real ones) and is then re-emitted.
+    Importing a module that only calls ``get_logger()`` therefore has no side effects.
+    """
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        logger = init_logging()
+        for handler in logger.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        return True
+
+    def emit(self, record: logging.LogRecord) -> None:
+        pass
+
+
+_lazy_lock = threading.Lock()
+
+
 def get_logger(name: Optional[str] = None) -> logging.Logger:
-    return logging.getLogger(name or settings.APP_NAME)
+    logger = logging.getLogger(name or settings.APP_NAME)
 
-# inicializa no import
-main_logger = init_logging()
+    if logger.name == settings.APP_NAME and not logger.handlers:
+        with _lazy_lock:
+            if not logger.handlers:
+                # Level and propagation are set now (cheap) so that records are filtered as before;
+                # the handlers are only created when the first record is logged.
+                logger.setLevel(_LEVEL_MAP.get(settings.LOG_LEVEL.upper(), logging.INFO))
+                logger.propagate = False
+                logger.addHandler(_LazyInitHandler())
+
+    return logger
@@ -0,0 +1,277 @@
+"""
+Hierarchical profiler for the ingestion pipeline.
+
+Spans are nested (run -> file -> stage -> sub-step) and measured with ``time.perf_counter``.
+Each span records rows in/out, rows per second, the process peak and current RSS, the memory
+held by the DataFrame it returned and, when enabled, the tracemalloc peak inside the span. While the profiler is disabled ``span`` returns a
+shared no-op object and ``perfilado`` calls the function directly, so the instrumentation
+costs one attribute check per call.
+
+At the end of a run the tree is written as JSON and in the folded-stack format
+(``frame;frame;frame <microseconds>``) read by flamegraph.pl and speedscope.
+"""
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from source.resources.logging import get_logger
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+logger = get_logger()
+
+# ru_maxrss is reported in KB on Linux and in bytes on macOS.
+_RSS_PARA_MB = 1 / 1024 ** 2 if sys.platform == "darwin" else 1 / 1024
+
+
+def _pico_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RSS_PARA_MB
+
+
+def _rss_atual_mb() -> float | None:
+    """Current resident set size (Linux only, read from /proc)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _memoria_mb(valor) -> float | None:
+    """Memory of a DataFrame (including string contents) or array, None for other values."""
+    if hasattr(valor, "memory_usage") and hasattr(valor, "columns"):
+        return float(valor.memory_usage(index=True, deep=True).sum()) / 1024 ** 2
+    nbytes = getattr(valor, "nbytes", None)
+    return nbytes / 1024 ** 2 if isinstance(nbytes, int) else None
+
+
+def _contar_linhas(valor) -> int | None:
+    """Rows of a DataFrame/array-like value (first dimension of ``shape``), None otherwise."""
+    shape = getattr(valor, "shape", None)
+    if isinstance(shape, tuple) and shape:
+        return int(shape[0])
+    return None
+
+
+class Span:
+    __slots__ = (
+        "nome", "inicio", "duracao", "linhas_entrada", "linhas_saida",
+        "pico_rss_mb", "rss_mb", "memoria_saida_mb", "pico_tracemalloc", "filhos", "_perfil",
+    )
+
+    def __init__(self, perfil: "Perfil", nome: str, linhas_entrada: int | None = None):
+        self._perfil = perfil
+        self.nome = nome
+        self.inicio = 0.0
+        self.duracao = 0.0
+        self.linhas_entrada = linhas_entrada
+        self.linhas_saida = None
+        self.pico_rss_mb = None
+        self.rss_mb = None
+        self.memoria_saida_mb = None
+        self.pico_tracemalloc = 0
+        self.filhos = []
+
+    def __enter__(self) -> "Span":
+        self._perfil._abrir(self)
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        self._perfil._fechar(self)
+        return False
+
+    def para_dict(self) -> dict:
+        linhas = self.linhas_entrada if self.linhas_entrada is not None else self.linhas_saida
+        return {
+            "nome": self.nome,
+            "inicio_s": round(self.inicio, 6),
+            "duracao_s": round(self.duracao, 6),
+            "linhas_entrada": self.linhas_entrada,
+            "linhas_saida": self.linhas_saida,
+            "linhas_por_s": round(linhas / self.duracao, 1) if linhas and self.duracao > 0 else None,
+            "pico_rss_mb": round(self.pico_rss_mb, 1) if self.pico_rss_mb is not None else None,
+            "rss_mb": round(self.rss_mb, 1) if self.rss_mb is not None else None,
+            "memoria_saida_mb": round(self.memoria_saida_mb, 1) if self.memoria_saida_mb is not None else None,
+            "pico_tracemalloc_mb": (
+                round(self.pico_tracemalloc / 1024 ** 2, 1) if self._perfil.tracemalloc else None
+            ),
+            "filhos": [filho if isinstance(filho, dict) else filho.para_dict() for filho in self.filhos],
+        }
+
+
+class _SpanInativo:
+    """Shared span returned while the profiler is disabled: every operation is a no-op."""
+    __slots__ = ()
+
+    def __enter__(self) -> "_SpanInativo":
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+    def __setattr__(self, nome, valor):
+        pass
+
+
+_SPAN_INATIVO = _SpanInativo()
+
+
+class Perfil:
+
+    def __init__(self):
+        self.ativo = False
+        self.tracemalloc = False
+        self._raiz = []
+        self._pilha = []
+        self._origem = 0.0
+
+    def iniciar(self, ativo: bool, tracemalloc_ativo: bool = False):
+        """Start a new run, discarding spans from a previous one."""
+        self.ativo = ativo
+        self.tracemalloc = ativo and tracemalloc_ativo
+        self._raiz = []
+        self._pilha = []
+        self._origem = time.perf_counter()
+
+        if self.tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def span(self, nome: str, linhas_entrada: int | None = None) -> Span | _SpanInativo:
+        if not self.ativo:
+            return _SPAN_INATIVO
+        return Span(self, nome, linhas_entrada)
+
+    def _abrir(self, span: Span):
+        if self.tracemalloc:
+            # reset_peak() is global, so the peak reached so far is saved in the parent first.
+            if self._pilha:
+                pai = self._pilha[-1]
+                pai.pico_tracemalloc = max(pai.pico_tracemalloc, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+
+        (self._pilha[-1].filhos if self._pilha else self._raiz).append(span)
+        self._pilha.append(span)
+        span.inicio = time.perf_counter() - self._origem
+
+    def _fechar(self, span: Span):
+        span.duracao = time.perf_counter() - self._origem - span.inicio
+        span.pico_rss_mb = _pico_rss_mb()
+        span.rss_mb = _rss_atual_mb()
+
+        if self.tracemalloc:
+            span.pico_tracemalloc = max(span.pico_tracemalloc, tracemalloc.get_traced_memory()[1])
+
+        self._pilha.pop()
+
+        if self._pilha and self.tracemalloc:
+            pai = self._pilha[-1]
+            pai.pico_tracemalloc = max(pai.pico_tracemalloc, span.pico_tracemalloc)
+
+        logger.debug(
+            f"{span.nome}: {span.duracao:.3f}s "
+            f"(linhas {span.linhas_entrada} -> {span.linhas_saida})"
+        )
+
+    def exportar(self) -> list[dict]:
+        """Finished top-level spans as dicts (used to send a worker's spans to the main process)."""
+        return [span.para_dict() for span in self._raiz]
+
+    def anexar(self, spans: list[dict] | None):
+        """Attach spans exported by another process under the current span."""
+        if not self.ativo or not spans:
+            return
+        (self._pilha[-1].filhos if self._pilha else self._raiz).extend(spans)
+
+    def finalizar(self, pasta: Path, uuid: str) -> Path | None:
+        """
+        Write ``<uuid>.json`` and ``<uuid>.folded`` to ``pasta`` and disable the profiler.
+
+        Returns:
+            Path | None: Path of the JSON report, or None when the profiler was disabled.
+        """
+        if not self.ativo:
+            return None
+
+        spans = self.exportar()
+        pasta = Path(pasta)
+        pasta.mkdir(parents=True, exist_ok=True)
+
+        relatorio = pasta / f"{uuid}.json"
+        relatorio.write_text(
+            json.dumps({"uuid": uuid, "pid": os.getpid(), "spans": spans}, ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+
+        linhas = []
+        for span in spans:
+            _pilhas_dobradas(span, [], linhas)
+        relatorio.with_suffix(".folded").write_text("\n".join(linhas) + "\n", encoding="utf-8")
+
+        for span in spans:
+            logger.info(f"{uuid} - {span['nome']} => {span['duracao_s']:.3f}s")
+        logger.info(f"Relatório de desempenho gravado em {relatorio}")
+
+        self.encerrar()
+
+        return relatorio
+
+    def encerrar(self):
+        """Disable the profiler (and stop tracemalloc if it was started for the run)."""
+        if self.tracemalloc:
+            tracemalloc.stop()
+
+        self.ativo = False
+        self.tracemalloc = False
+
+
+def _pilhas_dobradas(span: dict, caminho: list[str], linhas: list[str]):
+    """Folded stacks with the span's self time (its duration minus its children) in microseconds."""
+    caminho = caminho + [span["nome"].replace(";", ",").replace(" ", "_")]
+    proprio = span["duracao_s"] - sum(filho["duracao_s"] for filho in span["filhos"])
+
+    if proprio > 0:
+        linhas.append(f"{';'.join(caminho)} {round(proprio * 1e6)}")
+
+    for filho in span["filhos"]:
+        _pilhas_dobradas(filho, caminho, linhas)
+
+
+perfil = Perfil()
+
+
+def perfilado(func):
+    """
+    Record each call of ``func`` as a span named after the function. Rows in/out are taken from
+    the first DataFrame/array argument and from the return value, and the memory of the return
+    value is recorded as ``memoria_saida_mb`` (a deep ``memory_usage``, so it adds to the span time).
+    """
+    nome = func.__name__
+
+    @functools.wraps(func)
+    def _perfilado(*args, **kwargs):
+        if not perfil.ativo:
+            return func(*args, **kwargs)
+
+        linhas_entrada = next(
+            (linhas for linhas in map(_contar_linhas, (*args, *kwargs.values())) if linhas is not None),
+            None,
+        )
+
+        with perfil.span(nome, linhas_entrada=linhas_entrada) as span:
+            retorno = func(*args, **kwargs)
+            span.linhas_saida = _contar_linhas(retorno)
+            span.memoria_saida_mb = _memoria_mb(retorno)
+
+        return retorno
+
+    return _perfilado
@@ -1,14 +1,5 @@
-import time
-from source.core.settings import settings
-from source.resources.logging import get_logger
+from source.resources.perfil import perfilado
 
-logger = get_logger()
-
-def _time_run(func):
-    def _time_total(*args, **kwarg):
-        time_init = time.time()
-        retorno = func(*args, **kwarg)
-        time_fim = time.time() - time_init
-        logger.info(f"{settings.UUID} - def name:{func.__name__} => Tempo Total em Segundos: {time_fim}")
-        return retorno
-    return _time_total
+# Antigo decorador de tempo (uma linha de log por chamada). Agora cada chamada vira um span do
+# ´perfil´, que só mede quando o perfil está ativo e grava tudo em um relatório no final da execução.
+_time_run = perfilado
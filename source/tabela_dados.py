@@ -0,0 +1,347 @@
+from datetime import date
+from typing import TYPE_CHECKING
+
+import pandas as pd
+from sqlalchemy import Connection, Engine, String, TextClause, bindparam, inspect, text
+
+from source.core.bulk_insert import bulk_upsert, bulk_upsert_async, check_upsert_dialect
+from source.resources.logging import get_logger
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncConnection
+
+
+logger = get_logger()
+
+TABELA_DADOS = "dados_csv"
+
+# Coluna -> (tipo no banco, tipo no pandas). Os inteiros usam os tipos com NA do pandas,
+# assim uma linha nula não transforma a coluna inteira em float.
+COLUNAS_DADOS = {
+    'Ano': ('INTEGER', 'Int16'),
+    'Mes': ('INTEGER', 'Int8'),
+    'Dia': ('INTEGER', 'Int8'),
+    'DiaAno': ('INTEGER', 'Int16'),
+    'Mes_cos': ('FLOAT', 'float64'),
+    'Mes_sin': ('FLOAT', 'float64'),
+    'Municipio': ('TEXT', 'object'),
+    'RiscoFogo': ('FLOAT', 'float64'),
+    'DiaAno_sin': ('FLOAT', 'float64'),
+    'DiaAno_cos': ('FLOAT', 'float64'),
+    'DiaSemChuva': ('INTEGER', 'Int16'),
+    'Precipitacao': ('FLOAT', 'float64'),
+    'Latitude_norm': ('FLOAT', 'float64'),
+    'Longitude_norm': ('FLOAT', 'float64'),
+    'RiscoFogo_max_14': ('FLOAT', 'float64'),
+    'RiscoFogo_squared': ('FLOAT', 'float64'),
+    'Precipitacao_min_7': ('FLOAT', 'float64'),
+    'DiaSemChuva_squared': ('FLOAT', 'float64'),
+    'RiscoFogo_x_DiaSemChuva': ('FLOAT', 'float64'),
+    'RiscoFogo_media_movel_7': ('FLOAT', 'float64'),
+    'Precipitacao_acumulada_7': ('FLOAT', 'float64'),
+    'Precipitacao_acumulada_30': ('FLOAT', 'float64'),
+    'DiaSemChuva_media_movel_14': ('FLOAT', 'float64'),
+    'Precipitacao_media_movel_7': ('FLOAT', 'float64'),
+    'Categoria_Risco': ('SMALLINT', 'Int8'),
+    'Arquivo': ('TEXT', 'object'),
+}
+
+# Um registro por município e dia: uma carga nova do mesmo dia substitui a anterior (upsert).
+CHAVE_DADOS = ('Municipio', 'Ano', 'DiaAno')
+
+# Índices além da chave: período em todos os municípios (já na ordem de leitura) e arquivo
+# de origem (usado para trocar as linhas de um arquivo recarregado).
+INDICES_DADOS = {
+    f'ix_{TABELA_DADOS}_data': ('Ano', 'DiaAno', 'Municipio'),
+    f'ix_{TABELA_DADOS}_arquivo': ('Arquivo',),
+}
+
+# Mesmas colunas agregadas por célula da grade (´AGREGACAO_GRADE´, ver source/grade.py): um registro
+# por célula e dia, com o município que mais teve focos na célula naquele dia.
+TABELA_GRADE = "dados_grade"
+COLUNAS_GRADE = {'Celula': ('BIGINT', 'Int64'), **COLUNAS_DADOS}
+CHAVE_GRADE = ('Celula', 'Ano', 'DiaAno')
+INDICES_GRADE = {
+    f'ix_{TABELA_GRADE}_data': ('Ano', 'DiaAno', 'Celula'),
+    f'ix_{TABELA_GRADE}_arquivo': ('Arquivo',),
+}
+
+# Tabela -> (colunas, chave, índices). As tabelas que não estão aqui usam o esquema da ´dados_csv´.
+ESQUEMAS = {
+    TABELA_DADOS: (COLUNAS_DADOS, CHAVE_DADOS, INDICES_DADOS),
+    TABELA_GRADE: (COLUNAS_GRADE, CHAVE_GRADE, INDICES_GRADE),
+}
+
+
+def _esquema(table_name: str) -> tuple[dict[str, tuple[str, str]], tuple[str, ...], dict[str, tuple[str, ...]]]:
+    return ESQUEMAS.get(table_name, ESQUEMAS[TABELA_DADOS])
+
+
+def _definicao_colunas(table_name: str = TABELA_DADOS) -> str:
+    colunas_tabela, chave, _ = _esquema(table_name)
+    colunas = [
+        f"{coluna} {tipo}{' NOT NULL' if coluna in chave else ''}"
+        for coluna, (tipo, _) in colunas_tabela.items()
+    ]
+    colunas.append(f"PRIMARY KEY ({', '.join(chave)})")
+    return ',\n            '.join(colunas)
+
+
+def create_table_dados(engine: Engine, table_name: str = TABELA_DADOS):
+    """
+        Cria a tabela ´dados_csv´ com a chave (Municipio, Ano, DiaAno) e os índices.
+        No Postgres a tabela é particionada por faixa de ´Ano´ (uma partição por ano, criada na
+        gravação), então uma consulta por período lê somente as partições dos anos pedidos.
+        No SQLite (execuções locais) a tabela é comum, ordenada pela chave. Outros bancos não têm
+        o ´ON CONFLICT´ usado na gravação e são recusados com ValueError antes de criar a tabela.
+        Uma ´dados_csv´ antiga, sem chave, é migrada para o formato novo.
+
+    Args:
+        engine (Engine): Engine do banco de dados.
+        table_name (str): Tabela criada, a ´dados_grade´ usa a chave (Celula, Ano, DiaAno).
+    """
+    # A gravação é um upsert (´ON CONFLICT´), então o banco é conferido antes de criar qualquer tabela.
+    check_upsert_dialect(engine.dialect.name)
+
+    _, _, indices = _esquema(table_name)
+
+    with engine.begin() as conn:
+        legada = table_name == TABELA_DADOS and _tabela_legada(conn)
+
+        if legada:
+            _validar_tabela_legada(conn)
+            conn.execute(text(f"ALTER TABLE {TABELA_DADOS} RENAME TO {TABELA_DADOS}_legado"))
+
+        if conn.dialect.name == "postgresql":
+            conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {table_name} (
+            {_definicao_colunas(table_name)}
+        ) PARTITION BY RANGE (Ano)
+    """))
+        else:
+            conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {table_name} (
+            {_definicao_colunas(table_name)}
+        ){' WITHOUT ROWID' if conn.dialect.name == 'sqlite' else ''}
+    """))
+
+        for nome, colunas in indices.items():
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {nome} ON {table_name} ({', '.join(colunas)})"))
+
+        if legada:
+            _migrar_tabela_legada(conn)
+
+
+def _tabela_legada(conn: Connection) -> bool:
+    """Verifica se a ´dados_csv´ existe sem a chave primária (tabela criada antes do particionamento)."""
+    inspetor = inspect(conn)
+
+    if not inspetor.has_table(TABELA_DADOS):
+        return False
+
+    return not inspetor.get_pk_constraint(TABELA_DADOS)['constrained_columns']
+
+
+def _validar_tabela_legada(conn: Connection):
+    """
+        Só uma ´dados_csv´ de features (com as colunas da chave) pode ser migrada. A tabela antiga de
+        focos brutos do main.py (DataHora, Satelite, ...) não tem ´Ano´ nem ´DiaAno´, então a carga
+        para com uma mensagem em vez de descartar ou misturar os dados dela.
+    """
+    existentes = {coluna['name'].lower() for coluna in inspect(conn).get_columns(TABELA_DADOS)}
+    faltando = [coluna for coluna in CHAVE_DADOS if coluna.lower() not in existentes]
+
+    if faltando:
+        raise ValueError(
+            f"A tabela {TABELA_DADOS} existente não é uma tabela de features (faltam as colunas {faltando}), "
+            f"provavelmente são os focos brutos gravados pelo main.py. Renomeie a tabela "
+            f"(ex.: ALTER TABLE {TABELA_DADOS} RENAME TO focos_brutos) ou apague-a antes da carga."
+        )
+
+
+def _migrar_tabela_legada(conn: Connection):
+    """
+        Copia as linhas da tabela antiga para a nova. Se a tabela antiga tiver mais de uma linha para o
+        mesmo município e dia, somente uma é mantida, e as linhas sem município ou data são descartadas.
+    """
+    legado = f"{TABELA_DADOS}_legado"
+    existentes = {coluna['name'].lower() for coluna in inspect(conn).get_columns(legado)}
+    colunas = ', '.join(coluna for coluna in COLUNAS_DADOS if coluna.lower() in existentes)
+
+    if conn.dialect.name == "postgresql":
+        anos = conn.execute(text(f"SELECT DISTINCT Ano FROM {legado} WHERE Ano IS NOT NULL")).scalars()
+        garantir_particoes(conn, anos)
+
+    # O ´WHERE´ também evita a ambiguidade do SQLite entre ´SELECT ... ON CONFLICT´ e um JOIN.
+    copiadas = conn.execute(text(f"""
+        INSERT INTO {TABELA_DADOS} ({colunas})
+        SELECT {colunas} FROM {legado}
+        WHERE {' AND '.join(f'{coluna} IS NOT NULL' for coluna in CHAVE_DADOS)}
+        ON CONFLICT ({', '.join(CHAVE_DADOS)}) DO NOTHING
+    """)).rowcount
+    total = conn.execute(text(f"SELECT COUNT(*) FROM {legado}")).scalar_one()
+
+    conn.execute(text(f"DROP TABLE {legado}"))
+
+    logger.warning(
+        f"{TABELA_DADOS} migrada para o formato com chave (Municipio, Ano, DiaAno): "
+        f"{copiadas} de {total} linhas copiadas."
+    )
+
+
+def garantir_particoes(conn: Connection, anos, table_name: str = TABELA_DADOS):
+    """
+        Cria (no Postgres) as partições de ´table_name´ que ainda não existem para os anos informados.
+        Nos outros bancos não faz nada.
+
+    Args:
+        conn (Connection): Conexão na transação da gravação.
+        anos: Anos das linhas que serão gravadas.
+        table_name (str): Tabela particionada.
+    """
+    if conn.dialect.name != "postgresql":
+        return
+
+    for ano in sorted({int(ano) for ano in anos}):
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {table_name}_{ano} PARTITION OF {table_name} "
+            f"FOR VALUES FROM ({ano}) TO ({ano + 1})"
+        ))
+
+
+def gravar_dados(conn: Connection, df: pd.DataFrame, table_name: str = TABELA_DADOS) -> int:
+    """
+        Grava as linhas de ´df´ com upsert pela chave (Municipio, Ano, DiaAno): uma linha de um
+        município e dia que já existe é substituída. Cria antes as partições que faltam.
+        Na ´dados_grade´ a chave é (Celula, Ano, DiaAno).
+
+    Args:
+        conn (Connection): Conexão, a gravação entra na transação dela.
+        df (pd.DataFrame): Linhas com as colunas da ´dados_csv´.
+        table_name (str): Tabela onde as linhas são gravadas.
+
+    Returns:
+        int: Quantidade de linhas gravadas.
+    """
+    if df.empty:
+        return 0
+
+    garantir_particoes(conn, df['Ano'].unique(), table_name=table_name)
+
+    return bulk_upsert(conn, df, table_name=table_name, chave=_esquema(table_name)[1])
+
+
+async def gravar_dados_async(conn: "AsyncConnection", df: pd.DataFrame, table_name: str = TABELA_DADOS) -> int:
+    """
+        Versão assíncrona do ´gravar_dados´ (no Postgres com asyncpg usa o COPY binário).
+    """
+    if df.empty:
+        return 0
+
+    await conn.run_sync(garantir_particoes, df['Ano'].unique(), table_name)
+
+    return await bulk_upsert_async(conn, df, table_name=table_name, chave=_esquema(table_name)[1])
+
+
+def _ano_dia(data: date | str | pd.Timestamp) -> tuple[int, int]:
+    data = pd.Timestamp(data)
+    return data.year, data.dayofyear
+
+
+def consulta_dados(
+    inicio: date | str | pd.Timestamp | None = None,
+    fim: date | str | pd.Timestamp | None = None,
+    municipios: list[str] | None = None,
+    colunas: list[str] | None = None,
+    por_municipio: bool = False,
+) -> TextClause:
+    """
+        Monta o SELECT da ´dados_csv´ para um período (com as duas datas incluídas) e um conjunto de
+        municípios. O filtro de ´Ano´ fica separado do filtro de dia, assim o Postgres descarta as
+        partições dos outros anos, e a consulta usa a chave (com municípios) ou o índice por data.
+        As linhas vêm ordenadas por data e município, ou na ordem da chave com ´por_municipio´.
+
+    Args:
+        inicio: Primeira data, None para não limitar.
+        fim: Última data, None para não limitar.
+        municipios (list[str] | None): Municípios, None para todos.
+        colunas (list[str] | None): Colunas lidas, None para todas.
+        por_municipio (bool): Ordena por município e data (a ordem da chave) em vez de data e município.
+
+    Returns:
+        TextClause: Consulta com os parâmetros já associados.
+    """
+    colunas = list(COLUNAS_DADOS) if colunas is None else list(colunas)
+
+    desconhecidas = [coluna for coluna in colunas if coluna not in COLUNAS_DADOS]
+    if desconhecidas:
+        raise ValueError(f"Colunas que não existem na {TABELA_DADOS}: {desconhecidas}")
+
+    filtros = []
+    parametros = {}
+
+    if inicio is not None:
+        parametros['ano_inicio'], parametros['dia_inicio'] = _ano_dia(inicio)
+        filtros.append("Ano >= :ano_inicio")
+        filtros.append("(Ano > :ano_inicio OR DiaAno >= :dia_inicio)")
+
+    if fim is not None:
+        parametros['ano_fim'], parametros['dia_fim'] = _ano_dia(fim)
+        filtros.append("Ano <= :ano_fim")
+        filtros.append("(Ano < :ano_fim OR DiaAno <= :dia_fim)")
+
+    if municipios is not None:
+        parametros['municipios'] = list(municipios)
+        filtros.append("Municipio IN :municipios")
+
+    sql = f"SELECT {', '.join(colunas)} FROM {TABELA_DADOS}"
+    if filtros:
+        sql += f" WHERE {' AND '.join(filtros)}"
+    ordem = CHAVE_DADOS if por_municipio else ('Ano', 'DiaAno', 'Municipio')
+    sql += f" ORDER BY {', '.join(ordem)}"
+
+    consulta = text(sql)
+    if municipios is not None:
+        consulta = consulta.bindparams(bindparam('municipios', expanding=True, type_=String()))
+
+    return consulta.bindparams(**parametros)
+
+
+def tipar_colunas(df: pd.DataFrame) -> pd.DataFrame:
+    """
+        Volta os nomes das colunas para o formato da ´dados_csv´ (o Postgres devolve em minúsculo)
+        e converte cada coluna para o seu tipo no pandas.
+    """
+    nomes = {coluna.lower(): coluna for coluna in COLUNAS_DADOS}
+    df.columns = [nomes.get(str(coluna).lower(), coluna) for coluna in df.columns]
+
+    return df.astype({coluna: COLUNAS_DADOS[coluna][1] for coluna in df.columns if coluna in COLUNAS_DADOS})
+
+
+def ler_dados(
+    engine: Engine,
+    inicio: date | str | pd.Timestamp | None = None,
+    fim: date | str | pd.Timestamp | None = None,
+    municipios: list[str] | None = None,
+    colunas: list[str] | None = None,
+) -> pd.DataFrame:
+    """
+        Lê da ´dados_csv´ somente o período, os municípios e as colunas pedidos (ver ´consulta_dados´),
+        já com os tipos de ´COLUNAS_DADOS´.
+
+    Args:
+        engine (Engine): Engine do banco de dados.
+        inicio: Primeira data, None para não limitar.
+        fim: Última data, None para não limitar.
+        municipios (list[str] | None): Municípios, None para todos.
+        colunas (list[str] | None): Colunas lidas, None para todas.
+
+    Returns:
+        pd.DataFrame: Linhas ordenadas por data e município.
+    """
+    consulta = consulta_dados(inicio=inicio, fim=fim, municipios=municipios, colunas=colunas)
+
+    with engine.connect() as conn:
+        df = pd.read_sql(consulta, conn)
+
+    return tipar_colunas(df)
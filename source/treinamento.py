@@ -0,0 +1,394 @@
+"""
+    Treino do classificador de risco (Baixo/Médio/Alto) sem carregar a ´dados_csv´ inteira na memória.
+
+    Os dados são lidos em lotes (´ler_lotes_treino´) e divididos pelo tempo: o período mais recente
+    fica para a validação, assim o modelo é avaliado em dias posteriores aos do treino.
+
+    - ´hgb´: as features são discretizadas em até 255 faixas (limites pelos quantis de uma amostra)
+      e guardadas em uma matriz uint8, 1 byte por valor em vez de 4 (float32) ou 8 (float64), que é
+      usada no ´HistGradientBoostingClassifier´.
+    - ´sgd´: ´SGDClassifier.partial_fit´ lote a lote, com as features padronizadas por um
+      ´StandardScaler´ ajustado também lote a lote. A memória não depende do tamanho da tabela.
+
+    Uso:
+        python -m source.treinamento
+"""
+import json
+from dataclasses import dataclass
+from datetime import date, timedelta
+from functools import partial
+from pathlib import Path
+from typing import Callable, Iterator
+
+import joblib
+import numpy as np
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler
+from sqlalchemy import Engine, text
+
+from source.carregar_dados import CATEGORIAS_RISCO
+from source.core.database import get_sync_engine
+from source.core.settings import Settings
+from source.leitura_treino import COLUNAS_FEATURES, LoteTreino, ler_lotes_treino
+from source.resources.logging import get_logger
+from source.resources.perfil import perfil
+from source.tabela_dados import TABELA_DADOS
+
+
+logger = get_logger()
+
+CLASSES = np.arange(len(CATEGORIAS_RISCO), dtype=np.int8)
+
+# Linhas da amostra usada para calcular os limites das faixas de cada feature.
+LINHAS_AMOSTRA_BINS = 200_000
+
+# Bytes por valor no ajuste do ´hgb´: a matriz uint8, a cópia em float64 que o scikit-learn faz
+# antes de discretizar de novo e a matriz discretizada interna (uint8).
+BYTES_POR_VALOR_HGB = 1 + 8 + 1
+
+
+@dataclass
+class Discretizador:
+    """
+        Limites das faixas de cada feature. O valor ´v´ da feature ´j´ vai para a faixa
+        ´searchsorted(limites[j], v, side='right')´ e os valores nulos para ´bin_ausente´.
+    """
+    limites: list[np.ndarray]
+    bin_ausente: int
+
+    def transformar(self, X: np.ndarray) -> np.ndarray:
+        X_bins = np.empty(X.shape, dtype=np.uint8)
+
+        for indice, limites in enumerate(self.limites):
+            coluna = X[:, indice]
+            X_bins[:, indice] = np.searchsorted(limites, coluna, side='right')
+            X_bins[np.isnan(coluna), indice] = self.bin_ausente
+
+        return X_bins
+
+
+def ajustar_discretizador(amostra: np.ndarray, max_bins: int) -> Discretizador:
+    """
+        Calcula os limites das faixas pelos quantis de ´amostra´: ´max_bins - 1´ faixas para os
+        valores e a última para os nulos. Limites repetidos (features com poucos valores) são unidos.
+
+    Args:
+        amostra (np.ndarray): Linhas de exemplo (linhas x features).
+        max_bins (int): Total de faixas, no máximo 255 para caber em uint8 com o ´HistGradientBoosting´.
+
+    Returns:
+        Discretizador: Limites de cada feature.
+    """
+    quantis = np.linspace(0, 1, max_bins)[1:-1]
+    limites = []
+
+    for coluna in amostra.T:
+        validos = coluna[~np.isnan(coluna)]
+        limites.append(np.unique(np.quantile(validos, quantis)) if len(validos) else np.empty(0, dtype=coluna.dtype))
+
+    return Discretizador(limites=limites, bin_ausente=max_bins - 1)
+
+
+@dataclass
+class ModeloRisco:
+    """
+        Modelo treinado com o pré-processamento das features: recebe a matriz float32 na ordem de
+        ´colunas´ (a mesma do ´LoteTreino´) e devolve o código da ´Categoria_Risco´.
+    """
+    tipo: str
+    colunas: tuple[str, ...]
+    estimador: HistGradientBoostingClassifier | SGDClassifier
+    discretizador: Discretizador | None = None
+    escalador: StandardScaler | None = None
+
+    def preparar(self, X: np.ndarray) -> np.ndarray:
+        if self.discretizador is not None:
+            return self.discretizador.transformar(X)
+
+        # Depois de padronizar a média é 0, então os nulos recebem a média.
+        return np.nan_to_num(self.escalador.transform(X), copy=False)
+
+    def prever(self, X: np.ndarray) -> np.ndarray:
+        return self.estimador.predict(self.preparar(X)).astype(np.int8)
+
+    def prever_proba(self, X: np.ndarray) -> np.ndarray:
+        return self.estimador.predict_proba(self.preparar(X))
+
+
+def _data(ano: int, dia_ano: int) -> date:
+    return date(int(ano), 1, 1) + timedelta(days=int(dia_ano) - 1)
+
+
+def periodo_dados(engine: Engine) -> tuple[date, date] | None:
+    """
+        Primeira e última data da ´dados_csv´ (pelo índice de data), None se a tabela estiver vazia.
+    """
+    with engine.connect() as conn:
+        primeira = conn.execute(text(f"SELECT Ano, DiaAno FROM {TABELA_DADOS} ORDER BY Ano, DiaAno LIMIT 1")).first()
+        ultima = conn.execute(text(f"SELECT Ano, DiaAno FROM {TABELA_DADOS} ORDER BY Ano DESC, DiaAno DESC LIMIT 1")).first()
+
+    if primeira is None:
+        return None
+
+    return _data(*primeira), _data(*ultima)
+
+
+def data_corte(periodo: tuple[date, date], settings: Settings) -> date:
+    """
+        Primeira data da validação: ´TREINO_DATA_CORTE´ ou a data que deixa a fração
+        ´TREINO_FRACAO_VALIDACAO´ mais recente do período para a validação.
+    """
+    inicio, fim = periodo
+
+    if settings.TREINO_DATA_CORTE is not None:
+        corte = date.fromisoformat(settings.TREINO_DATA_CORTE)
+    else:
+        corte = inicio + timedelta(days=round((fim - inicio).days * (1 - settings.TREINO_FRACAO_VALIDACAO)))
+
+    if not inicio < corte <= fim:
+        raise ValueError(f"A data de corte {corte} precisa ficar entre {inicio} (exclusive) e {fim}.")
+
+    return corte
+
+
+def _amostrar(lotes: Iterator[LoteTreino], tamanho: int, rng: np.random.Generator) -> tuple[np.ndarray, int]:
+    """
+        Amostra uniforme de até ´tamanho´ linhas em uma passada pelos lotes: cada linha recebe um
+        número aleatório e ficam as linhas com os menores números.
+
+    Returns:
+        tuple[np.ndarray, int]: Amostra e total de linhas lidas.
+    """
+    amostra = np.empty((0, len(COLUNAS_FEATURES)), dtype=np.float32)
+    chaves = np.empty(0)
+    linhas = 0
+
+    for lote in lotes:
+        linhas += len(lote.y)
+        amostra = np.concatenate([amostra, lote.X])
+        chaves = np.concatenate([chaves, rng.random(len(lote.y))])
+
+        if len(chaves) > tamanho:
+            manter = np.argpartition(chaves, tamanho)[:tamanho]
+            amostra, chaves = amostra[manter], chaves[manter]
+
+    return amostra, linhas
+
+
+def _treinar_hgb(lotes: Callable[[], Iterator[LoteTreino]], settings: Settings) -> tuple[ModeloRisco, dict]:
+    rng = np.random.default_rng(settings.TREINO_SEED)
+
+    with perfil.span('amostragem') as span:
+        amostra, linhas_treino = _amostrar(lotes(), LINHAS_AMOSTRA_BINS, rng)
+        span.linhas_entrada = linhas_treino
+        span.linhas_saida = len(amostra)
+
+    if not linhas_treino:
+        raise ValueError("Nenhuma linha no período de treino.")
+
+    discretizador = ajustar_discretizador(amostra, settings.TREINO_MAX_BINS)
+    del amostra
+
+    # Acima do orçamento de memória as linhas de treino são sorteadas (todas as datas continuam representadas).
+    capacidade = settings.TREINO_MEMORIA_MB * 1024 ** 2 // (len(COLUNAS_FEATURES) * BYTES_POR_VALOR_HGB)
+    fracao = min(1.0, capacidade / linhas_treino)
+
+    if fracao < 1:
+        logger.warning(
+            f"{linhas_treino} linhas de treino passam do TREINO_MEMORIA_MB, "
+            f"usando uma amostra de {fracao:.1%} das linhas."
+        )
+
+    with perfil.span('discretizacao', linhas_entrada=linhas_treino) as span:
+        X = np.empty((min(capacidade, linhas_treino), len(COLUNAS_FEATURES)), dtype=np.uint8)
+        y = np.empty(len(X), dtype=np.int8)
+        preenchidas = 0
+
+        for lote in lotes():
+            X_lote, y_lote = lote.X, lote.y
+
+            if fracao < 1:
+                sorteadas = rng.random(len(y_lote)) < fracao
+                X_lote, y_lote = X_lote[sorteadas], y_lote[sorteadas]
+
+            quantidade = min(len(y_lote), len(X) - preenchidas)
+            X[preenchidas:preenchidas + quantidade] = discretizador.transformar(X_lote[:quantidade])
+            y[preenchidas:preenchidas + quantidade] = y_lote[:quantidade]
+            preenchidas += quantidade
+
+        X, y = X[:preenchidas], y[:preenchidas]
+        span.linhas_saida = preenchidas
+
+    # A validação é feita depois, no período mais recente, por isso sem a parada antecipada
+    # do scikit-learn (que separaria uma parte aleatória do treino).
+    estimador = HistGradientBoostingClassifier(
+        max_iter=settings.TREINO_ITERACOES,
+        max_bins=settings.TREINO_MAX_BINS,
+        early_stopping=False,
+        random_state=settings.TREINO_SEED,
+    )
+
+    with perfil.span('ajuste', linhas_entrada=preenchidas):
+        estimador.fit(X, y)
+
+    modelo = ModeloRisco(tipo='hgb', colunas=COLUNAS_FEATURES, estimador=estimador, discretizador=discretizador)
+
+    return modelo, {
+        'linhas_treino': linhas_treino,
+        'linhas_ajuste': preenchidas,
+        'matriz_mb': round(X.nbytes / 1024 ** 2, 1),
+        'matriz_float32_mb': round(X.size * 4 / 1024 ** 2, 1),
+    }
+
+
+def _treinar_sgd(lotes: Callable[[], Iterator[LoteTreino]], settings: Settings) -> tuple[ModeloRisco, dict]:
+    escalador = StandardScaler()
+    linhas_treino = 0
+
+    with perfil.span('padronizacao') as span:
+        for lote in lotes():
+            escalador.partial_fit(lote.X)
+            linhas_treino += len(lote.y)
+        span.linhas_entrada = linhas_treino
+
+    if not linhas_treino:
+        raise ValueError("Nenhuma linha no período de treino.")
+
+    estimador = SGDClassifier(loss='log_loss', random_state=settings.TREINO_SEED)
+    modelo = ModeloRisco(tipo='sgd', colunas=COLUNAS_FEATURES, estimador=estimador, escalador=escalador)
+
+    for epoca in range(1, settings.TREINO_EPOCAS + 1):
+        with perfil.span(f'ajuste_epoca_{epoca}', linhas_entrada=linhas_treino):
+            for lote in lotes():
+                estimador.partial_fit(modelo.preparar(lote.X), lote.y, classes=CLASSES)
+
+    return modelo, {'linhas_treino': linhas_treino, 'linhas_ajuste': linhas_treino}
+
+
+def avaliar(modelo: ModeloRisco, lotes: Iterator[LoteTreino]) -> dict:
+    """
+        Avalia o modelo lote a lote, acumulando somente a matriz de confusão.
+
+    Returns:
+        dict: Linhas, acurácia, F1 macro, recall de cada categoria e matriz de confusão (linha = real).
+    """
+    k = len(CLASSES)
+    confusao = np.zeros((k, k), dtype=np.int64)
+
+    for lote in lotes:
+        previsto = modelo.prever(lote.X)
+        confusao += np.bincount(lote.y.astype(np.int64) * k + previsto, minlength=k * k).reshape(k, k)
+
+    total = int(confusao.sum())
+    acertos = np.diag(confusao)
+    reais = confusao.sum(axis=1)
+    previstos = confusao.sum(axis=0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        recall = np.where(reais > 0, acertos / reais, 0.0)
+        precisao = np.where(previstos > 0, acertos / previstos, 0.0)
+        f1 = np.where(recall + precisao > 0, 2 * recall * precisao / (recall + precisao), 0.0)
+
+    return {
+        'linhas': total,
+        'acuracia': round(float(acertos.sum() / total), 4) if total else None,
+        'f1_macro': round(float(f1.mean()), 4) if total else None,
+        'recall': {categoria: round(float(valor), 4) for categoria, valor in zip(CATEGORIAS_RISCO, recall)},
+        'matriz_confusao': confusao.tolist(),
+    }
+
+
+def _resumo_etapas(spans: list[dict]) -> list[dict]:
+    """Tempo, linhas/s e memória de cada etapa do treino (filhos do span ´treinar_modelo´)."""
+    return [
+        {
+            'etapa': span['nome'],
+            'segundos': span['duracao_s'],
+            'linhas': span['linhas_entrada'],
+            'linhas_por_s': span['linhas_por_s'],
+            'pico_rss_mb': span['pico_rss_mb'],
+            'pico_tracemalloc_mb': span['pico_tracemalloc_mb'],
+        }
+        for raiz in spans
+        for span in raiz['filhos']
+    ]
+
+
+def treinar_modelo(settings: Settings) -> ModeloRisco | None:
+    """
+        Treina o modelo de ´TREINO_MODELO´ com os dados da ´dados_csv´ e valida no período mais recente.
+        Grava em ´PATH_MODELOS´ o modelo (´<UUID>.joblib´) e o relatório (´<UUID>.json´) com o período,
+        as métricas da validação e o tempo, as linhas por segundo e o pico de memória de cada etapa.
+
+    Args:
+        settings (Settings): Configurações do treino.
+
+    Returns:
+        ModeloRisco | None: Modelo treinado, None se a ´dados_csv´ estiver vazia.
+    """
+    logger.info(f"{settings.APP_NAME} - v{settings.APP_VERSION} - treino ({settings.TREINO_MODELO})")
+
+    engine = get_sync_engine()
+    periodo = periodo_dados(engine)
+
+    if periodo is None:
+        logger.warning("A dados_csv está vazia, nada para treinar.")
+        return None
+
+    corte = data_corte(periodo, settings)
+    lotes = partial(ler_lotes_treino, engine, linhas_por_lote=settings.TREINO_LINHAS_POR_LOTE)
+    lotes_treino = partial(lotes, inicio=periodo[0], fim=corte - timedelta(days=1))
+
+    logger.info(f"Treino de {periodo[0]} a {corte - timedelta(days=1)}, validação de {corte} a {periodo[1]}.")
+
+    # O perfil mede as etapas mesmo sem ´PERFIL_ATIVO´, porque o tempo e a memória fazem parte do relatório.
+    perfil.iniciar(ativo=True, tracemalloc_ativo=settings.PERFIL_TRACEMALLOC)
+
+    try:
+        with perfil.span('treinar_modelo'):
+            if settings.TREINO_MODELO == 'hgb':
+                modelo, info = _treinar_hgb(lotes_treino, settings)
+            else:
+                modelo, info = _treinar_sgd(lotes_treino, settings)
+
+            with perfil.span('validacao') as span:
+                metricas = avaliar(modelo, lotes(inicio=corte, fim=periodo[1]))
+                span.linhas_entrada = metricas['linhas']
+
+        etapas = _resumo_etapas(perfil.exportar())
+    finally:
+        if settings.PERFIL_ATIVO:
+            perfil.finalizar(pasta=Path(settings.PATH_PERFIL), uuid=settings.UUID)
+        else:
+            perfil.encerrar()
+
+    pasta = Path(settings.PATH_MODELOS)
+    pasta.mkdir(parents=True, exist_ok=True)
+    joblib.dump(modelo, pasta / f"{settings.UUID}.joblib")
+
+    relatorio = {
+        'uuid': settings.UUID,
+        'modelo': settings.TREINO_MODELO,
+        'colunas': list(modelo.colunas),
+        'treino': {'inicio': str(periodo[0]), 'fim': str(corte - timedelta(days=1)), **info},
+        'validacao': {'inicio': str(corte), 'fim': str(periodo[1]), **metricas},
+        'etapas': etapas,
+    }
+    (pasta / f"{settings.UUID}.json").write_text(json.dumps(relatorio, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    for etapa in etapas:
+        logger.info(
+            f"{etapa['etapa']}: {etapa['segundos']:.3f}s, {etapa['linhas'] or 0} linhas "
+            f"({etapa['linhas_por_s'] or 0:,.0f} linhas/s), pico RSS {etapa['pico_rss_mb']} MB"
+        )
+    logger.info(
+        f"Validação: acurácia {metricas['acuracia']}, F1 macro {metricas['f1_macro']} "
+        f"({metricas['linhas']} linhas). Modelo gravado em {pasta / f'{settings.UUID}.joblib'}"
+    )
+
+    return modelo
+
+
+if __name__ == "__main__":
+    treinar_modelo(Settings())
@@ -0,0 +1,81 @@
+"""
+Daily aggregation (``agregar_por_dia_municipio``) against the previous per-group lambda version.
+
+FRP, DiaSemChuva, Latitude and Longitude must match exactly. RiscoFogo and Precipitacao are
+groupby means, summed in a different order than ``Series.mean()``, so they may differ from the
+lambda version by a few ULP (see docs/TRATAMENTO_DADOS.md).
+"""
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from source.carregar_dados import agregar_por_dia_municipio
+
+
+def _agregar_com_lambda(df: pd.DataFrame) -> pd.DataFrame:
+    """Agregação anterior, com uma função em Python para cada grupo."""
+    df = df.copy()
+    df['Data'] = pd.to_datetime(df['DataHora']).dt.date
+
+    df_daily = df.groupby(['Data', 'Municipio'], observed=True).agg({
+        'FRP': 'sum',
+        'RiscoFogo': lambda x: x[x != -999.0].mean(),
+        'DiaSemChuva': lambda x: x[x != -999.0].max(),
+        'Precipitacao': lambda x: x[x != -999.0].mean(),
+        'Latitude': 'mean',
+        'Longitude': 'mean'
+    }).reset_index()
+
+    return df_daily.dropna().reset_index(drop=True)
+
+
+def _focos(linhas: int = 20000, seed: int = 3) -> pd.DataFrame:
+    """Focos com -999, NaN, grupos só com -999 e grupos com mais de 128 linhas (outro caminho da soma)."""
+    rng = np.random.default_rng(seed)
+    municipios = [f'MUNICIPIO {i}' for i in range(40)]
+
+    df = pd.DataFrame({
+        'DataHora': pd.Timestamp('2024-08-01') + pd.to_timedelta(rng.integers(0, 10 * 24 * 60, linhas), unit='min'),
+        # Metade dos focos em um único município: grupos com centenas de linhas por dia.
+        'Municipio': np.where(rng.random(linhas) < 0.5, municipios[0], rng.choice(municipios, linhas)),
+        'FRP': rng.gamma(2.0, 30.0, linhas),
+        'Latitude': rng.uniform(-12.0, -2.0, linhas),
+        'Longitude': rng.uniform(-65.0, -48.0, linhas),
+        'DiaSemChuva': rng.integers(0, 60, linhas),
+        'RiscoFogo': rng.random(linhas),
+        'Precipitacao': rng.gamma(1.5, 4.0, linhas),
+    })
+
+    for campo in ['DiaSemChuva', 'RiscoFogo', 'Precipitacao']:
+        df.loc[rng.random(linhas) < 0.15, campo] = -999
+    df.loc[rng.random(linhas) < 0.02, 'Precipitacao'] = np.nan
+
+    # Um município em que o RiscoFogo é sempre -999: os grupos dele saem no ´dropna´.
+    df.loc[df['Municipio'] == municipios[1], 'RiscoFogo'] = -999.0
+
+    return df
+
+
+class TestAgregacao(unittest.TestCase):
+    def test_igual_a_agregacao_com_lambda(self):
+        df = _focos()
+
+        esperado = _agregar_com_lambda(df)
+        agregado = agregar_por_dia_municipio(df)
+
+        # Os dados cobrem grupos com mais de 128 linhas (outro caminho da soma do numpy).
+        tamanhos = df.groupby([pd.to_datetime(df['DataHora']).dt.date, 'Municipio']).size()
+        self.assertGreater(tamanhos.max(), 128)
+        self.assertNotIn('MUNICIPIO 1', set(agregado['Municipio']))
+
+        medias = ['RiscoFogo', 'Precipitacao']
+        pd.testing.assert_frame_equal(
+            agregado.drop(columns=medias), esperado[agregado.columns].drop(columns=medias), check_exact=True,
+        )
+        for campo in medias:
+            np.testing.assert_array_max_ulp(agregado[campo].to_numpy(), esperado[campo].to_numpy(), maxulp=8)
+
+
+if __name__ == "__main__":
+    unittest.main()
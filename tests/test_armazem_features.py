@@ -0,0 +1,137 @@
+"""
+Feature store (``construir_armazem``/``ArmazemFeatures``) built from a small SQLite ``dados_csv``.
+
+``ler``, ``fatia`` and ``lote_treino`` must return the same rows and values as ``ler_dados`` for
+the same municipalities and period, including empty periods, and reject unknown municipalities.
+"""
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+from source.armazem_features import ArmazemFeatures, construir_armazem
+from source.leitura_treino import COLUNA_TARGET, COLUNAS_FEATURES
+from source.tabela_dados import create_table_dados, gravar_dados, ler_dados
+from tests.test_tabela_dados import _linhas
+
+
+MUNICIPIOS = ['MUNICIPIO A', 'MUNICIPIO B', 'MUNICIPIO C', 'MUNICIPIO D']
+
+# (municípios, início, fim): períodos na virada do ano, um dia só, períodos vazios e sem limite.
+CONSULTAS = [
+    (None, None, None),
+    (None, '2023-12-25', '2024-01-05'),
+    (['MUNICIPIO B'], None, None),
+    (['MUNICIPIO B'], '2023-12-31', '2024-01-01'),
+    (['MUNICIPIO D', 'MUNICIPIO A'], '2024-01-10', None),
+    (['MUNICIPIO A', 'MUNICIPIO C'], None, '2023-12-20'),
+    (['MUNICIPIO C'], '2024-01-15', '2024-01-15'),
+    (['MUNICIPIO A'], '2024-01-05', '2024-01-04'),
+    (['MUNICIPIO A', 'MUNICIPIO B'], '2025-01-01', None),
+    (None, '2022-01-01', '2022-12-31'),
+]
+
+
+class TestArmazemFeatures(unittest.TestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.pasta = Path(pasta.name)
+        self.engine = create_engine(f"sqlite:///{self.pasta / 'dados.db'}")
+        self.addCleanup(self.engine.dispose)
+
+        df = _linhas('2023-12-10', '2024-01-25', MUNICIPIOS)
+        df[COLUNA_TARGET] = (df[COLUNA_TARGET] % 3).astype('Int8')
+        # Dias faltando, features nulas e linhas sem target.
+        df = df.loc[df.index % 7 != 3].reset_index(drop=True)
+        df.loc[df.index % 11 == 0, 'Precipitacao'] = np.nan
+        df.loc[df.index % 13 == 0, COLUNA_TARGET] = None
+
+        create_table_dados(self.engine)
+        with self.engine.begin() as conn:
+            gravar_dados(conn, df)
+
+        self.linhas = construir_armazem(self.engine, self.pasta / 'armazem', linhas_por_lote=16)
+        self.armazem = ArmazemFeatures(self.pasta / 'armazem')
+
+    def _esperado(self, municipios, inicio, fim) -> pd.DataFrame:
+        """Mesmas linhas lidas pelo ´ler_dados´, na ordem do armazém (município e data)."""
+        df = ler_dados(self.engine, inicio=inicio, fim=fim, municipios=municipios)
+        df['Data'] = pd.to_datetime(
+            df['Ano'].astype('int64') * 1000 + df['DiaAno'].astype('int64'), format='%Y%j',
+        ).astype('datetime64[ns]')
+
+        df = df.sort_values(['Municipio', 'Data'], ignore_index=True)
+        if municipios is not None:
+            df = df.sort_values('Municipio', key=lambda m: m.map(municipios.index), kind='stable', ignore_index=True)
+
+        return pd.DataFrame({
+            'Municipio': df['Municipio'].astype(object),
+            'Data': df['Data'],
+            **{coluna: df[coluna].astype('float64').to_numpy(np.float32) for coluna in COLUNAS_FEATURES},
+            COLUNA_TARGET: df[COLUNA_TARGET].astype('Int8'),
+        })
+
+    def test_meta(self):
+        self.assertEqual(self.linhas, len(ler_dados(self.engine)))
+        self.assertEqual(len(self.armazem), self.linhas)
+        self.assertEqual(self.armazem.municipios, MUNICIPIOS)
+        self.assertEqual(self.armazem.colunas, list(COLUNAS_FEATURES))
+
+    def test_ler_igual_a_ler_dados(self):
+        for municipios, inicio, fim in CONSULTAS:
+            with self.subTest(municipios=municipios, inicio=inicio, fim=fim):
+                lido = self.armazem.ler(municipios=municipios, inicio=inicio, fim=fim)
+                lido = lido.assign(Municipio=lido['Municipio'].astype(object))
+
+                pd.testing.assert_frame_equal(lido, self._esperado(municipios, inicio, fim), check_exact=True)
+
+    def test_fatia_igual_a_ler_dados(self):
+        colunas = ['RiscoFogo', 'Precipitacao', COLUNA_TARGET]
+
+        for municipios, inicio, fim in CONSULTAS:
+            for municipio in municipios or []:
+                with self.subTest(municipio=municipio, inicio=inicio, fim=fim):
+                    fatia = self.armazem.fatia(municipio, inicio=inicio, fim=fim, colunas=colunas)
+                    esperado = self._esperado([municipio], inicio, fim)
+
+                    np.testing.assert_array_equal(fatia['Data'], esperado['Data'].to_numpy('datetime64[D]'))
+                    for coluna in colunas[:-1]:
+                        np.testing.assert_array_equal(fatia[coluna], esperado[coluna].to_numpy())
+                    np.testing.assert_array_equal(
+                        fatia[COLUNA_TARGET], esperado[COLUNA_TARGET].fillna(-1).to_numpy(np.int8),
+                    )
+
+    def test_lote_treino_igual_a_ler_dados(self):
+        colunas = ['DiaSemChuva', 'RiscoFogo', 'Precipitacao']
+
+        for inicio, fim in [(None, None), ('2023-12-30', '2024-01-02'), ('2024-01-05', '2024-01-04')]:
+            with self.subTest(inicio=inicio, fim=fim):
+                lote = self.armazem.lote_treino(inicio=inicio, fim=fim, colunas=colunas)
+                esperado = self._esperado(None, inicio, fim).dropna(subset=[COLUNA_TARGET])
+
+                self.assertEqual(lote.colunas, tuple(colunas))
+                self.assertEqual(lote.X.dtype, np.float32)
+                self.assertEqual(lote.y.dtype, np.int8)
+                np.testing.assert_array_equal(lote.X, esperado[colunas].to_numpy(np.float32))
+                np.testing.assert_array_equal(lote.y, esperado[COLUNA_TARGET].to_numpy(np.int8))
+
+    def test_municipio_desconhecido(self):
+        with self.assertRaises(KeyError):
+            self.armazem.fatia('MUNICIPIO Z')
+
+        with self.assertRaises(KeyError):
+            self.armazem.ler(municipios=['MUNICIPIO A', 'MUNICIPIO Z'])
+
+        self.assertTrue(ler_dados(self.engine, municipios=['MUNICIPIO Z']).empty)
+
+    def test_coluna_desconhecida(self):
+        with self.assertRaises(ValueError):
+            self.armazem.ler(colunas=['Arquivo'])
+
+
+if __name__ == "__main__":
+    unittest.main()
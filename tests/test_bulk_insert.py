@@ -0,0 +1,120 @@
+"""
+Bulk loading paths of ``source.core.bulk_insert``.
+
+There is no PostgreSQL server in the test environment, so the PostgreSQL-specific paths are
+exercised on SQLite with the dialect name/driver patched (what ``bulk_insert`` branches on) or
+with a fake DBAPI cursor that records what ``COPY`` would receive.
+"""
+import asyncio
+import io
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Column, Float, Integer, MetaData, Table, Text, create_engine, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from source.carregar_dados import agregar_por_dia_municipio
+from source.core.bulk_insert import _copy_postgres, _match_columns
+from source.estado_features import TABELA_ESTADO, atualizar_estado, carregar_estado, create_table_estado
+
+
+def _estado(municipios: int = 3, dias: int = 40) -> pd.DataFrame:
+    datas = pd.date_range('2024-01-01', periods=dias)
+    return pd.DataFrame({
+        'Municipio': np.repeat([f'MUNICIPIO {i}' for i in range(municipios)], dias),
+        'Data': np.tile(datas, municipios),
+        'DiaSemChuva': 1.0,
+        'FRP': 2.0,
+        'Precipitacao': 3.0,
+        'RiscoFogo': 0.5,
+    })
+
+
+class _CursorCopy:
+    """Cursor do psycopg2 falso: guarda o CSV que o ´COPY´ receberia."""
+
+    def __init__(self):
+        self.csv = io.StringIO()
+
+    def copy_expert(self, sql, buffer):
+        self.csv.write(buffer.read())
+
+    def close(self):
+        pass
+
+
+class TestCopyPostgres(unittest.TestCase):
+    def test_inteiro_que_virou_float_vai_como_inteiro(self):
+        # O município B só tem DiaSemChuva -999: o máximo dele fica NaN e a coluna agregada vira float64.
+        # A linha de B sai no ´dropna´, mas o DiaSemChuva de A continua 5.0.
+        focos = pd.DataFrame({
+            'Data': pd.to_datetime(['2024-08-01'] * 4),
+            'Municipio': ['A', 'A', 'B', 'B'],
+            'FRP': [10.0, 20.0, 5.0, 7.0],
+            'Latitude': -5.0,
+            'Longitude': -50.0,
+            'DiaSemChuva': [5, 3, -999, -999],
+            'RiscoFogo': 0.5,
+            'Precipitacao': 0.0,
+        })
+        agregado = agregar_por_dia_municipio(focos).reset_index()
+        self.assertEqual(agregado['DiaSemChuva'].dtype, np.float64)
+
+        tabela = Table(
+            'dados_csv', MetaData(),
+            Column('Municipio', Text), Column('DiaSemChuva', Integer), Column('FRP', Float),
+        )
+        cursor = _CursorCopy()
+        conn = mock.Mock(dialect=postgresql.dialect())
+        conn.connection.cursor.return_value = cursor
+
+        _copy_postgres(conn, agregado, tabela, _match_columns(agregado, tabela))
+
+        # Colunas na ordem do DataFrame: Municipio, FRP, DiaSemChuva.
+        self.assertEqual(cursor.csv.getvalue().splitlines(), ['A,30.0,5'])
+
+
+class TestPostgresSemCopy(unittest.TestCase):
+    """Drivers do PostgreSQL sem ´copy_expert´ (asyncpg pelo ´run_sync´) usam INSERTs em lote."""
+
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.caminho = Path(pasta.name) / 'carga.db'
+        self.engine = create_engine(f"sqlite:///{self.caminho}")
+        self.addCleanup(self.engine.dispose)
+        create_table_estado(self.engine)
+
+    def test_estado_na_transacao_async(self):
+        engine_async = create_async_engine(f"sqlite+aiosqlite:///{self.caminho}")
+        df = _estado()
+
+        async def gravar():
+            try:
+                async with engine_async.begin() as conn:
+                    # Como o consumidor da carga assíncrona: ´atualizar_estado´ pelo ´run_sync´.
+                    with (
+                        mock.patch.object(engine_async.dialect, 'name', 'postgresql'),
+                        mock.patch.object(engine_async.dialect, 'driver', 'asyncpg'),
+                    ):
+                        return await conn.run_sync(atualizar_estado, df.iloc[0:0], df, None)
+            finally:
+                await engine_async.dispose()
+
+        linhas = asyncio.run(gravar())
+
+        historico, _ = carregar_estado(self.engine)
+        self.assertEqual(linhas, len(historico))
+        self.assertEqual(historico.groupby('Municipio').size().tolist(), [29, 29, 29])
+
+        with self.engine.connect() as conn:
+            self.assertEqual(conn.execute(text(f"SELECT COUNT(*) FROM {TABELA_ESTADO}")).scalar(), 87)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+"""
+Persistence of the municipality x day cube (``CuboDiario.salvar``/``carregar``).
+"""
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from source.cubo_diario import CuboDiario, calcular_janelas_calendario
+from source.features_moveis import JANELAS_MOVEIS
+from tests.test_features_incrementais import _dados
+
+
+class TestCuboDiario(unittest.TestCase):
+    def test_salvar_e_carregar(self):
+        df = _dados()
+        colunas = sorted({janela.coluna for janela in JANELAS_MOVEIS})
+        cubo = CuboDiario.construir(df, colunas=colunas)
+
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = Path(pasta) / 'cubo'
+            cubo.salvar(caminho)
+            # Gravar de novo troca a pasta inteira, sem deixar as pastas temporárias.
+            cubo.salvar(caminho)
+            self.assertEqual([item.name for item in Path(pasta).iterdir()], ['cubo'])
+            carregado = CuboDiario.carregar(caminho)
+
+            self.assertEqual(carregado.municipios.tolist(), cubo.municipios.tolist())
+            self.assertEqual(carregado.inicio, cubo.inicio)
+            np.testing.assert_array_equal(carregado.mascara, cubo.mascara)
+            for coluna in colunas:
+                np.testing.assert_array_equal(carregado.valores[coluna], cubo.valores[coluna])
+
+            pd.testing.assert_frame_equal(
+                calcular_janelas_calendario(df, JANELAS_MOVEIS, cubo=carregado),
+                calcular_janelas_calendario(df, JANELAS_MOVEIS, cubo=cubo),
+                check_exact=True,
+            )
+            del carregado
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Incremental feature engineering against a full load.
+
+The first part of the data goes through the saved window state (``estado_janelas`` in a sqlite
+database), like a previous load, and the second part gets its features from that state only.
+Its rows must match the same rows of a full load.
+"""
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+from source.carregar_dados import engenharia_features
+from source.estado_features import (
+    TABELA_ESTADO,
+    atualizar_estado,
+    calcular_limites_geograficos,
+    carregar_estado,
+    create_table_estado,
+)
+from source.registro_features import FEATURES_PADRAO
+
+
+# Features da seção 5 do docs/CALCULOS.md, calculadas somente quando pedidas.
+FEATURES_AVANCADAS = ['RiscoFogo_delta_1', 'Precipitacao_delta_1', 'Solo_Seco', 'Dias_com_Fogo_7']
+
+
+def _dados(municipios: int = 12, dias: int = 80, seed: int = 7) -> pd.DataFrame:
+    """Uma linha por município e dia (como sai da agregação), com dias faltando e dias sem fogo."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'Data': np.tile(pd.date_range('2024-06-01', periods=dias), municipios),
+        'Municipio': np.repeat([f'MUNICIPIO {i}' for i in range(municipios)], dias),
+    })
+    df = df.loc[rng.random(len(df)) < 0.8].reset_index(drop=True)
+
+    df['FRP'] = np.where(rng.random(len(df)) < 0.4, 0.0, rng.gamma(2.0, 150.0, len(df)))
+    df['RiscoFogo'] = rng.random(len(df))
+    df['Precipitacao'] = np.where(rng.random(len(df)) < 0.6, 0.0, rng.gamma(1.5, 4.0, len(df)))
+    df['DiaSemChuva'] = rng.integers(0, 30, len(df)).astype(float)
+    df['Latitude'] = rng.uniform(-12.0, -2.0, len(df))
+    df['Longitude'] = rng.uniform(-65.0, -48.0, len(df))
+
+    return df.sort_values(['Data', 'Municipio'], ignore_index=True)
+
+
+class TestFeaturesIncrementais(unittest.TestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.engine = create_engine(f"sqlite:///{Path(pasta.name) / 'estado.db'}")
+        self.addCleanup(self.engine.dispose)
+
+    def test_incremental_igual_a_carga_completa(self):
+        df = _dados()
+        features = [*FEATURES_PADRAO, *FEATURES_AVANCADAS]
+        corte = pd.Timestamp('2024-07-10')
+        anteriores, novos = df.loc[df['Data'] < corte], df.loc[df['Data'] >= corte]
+
+        limites = calcular_limites_geograficos(anteriores)
+        completa = engenharia_features(df, features=features, limites_geograficos=calcular_limites_geograficos(df))
+
+        create_table_estado(self.engine)
+        historico, _ = carregar_estado(self.engine)
+        atualizar_estado(self.engine, historico, anteriores, limites)
+
+        historico, limites = carregar_estado(self.engine)
+        limites = calcular_limites_geograficos(novos, anteriores=limites)
+        incremental = engenharia_features(novos, historico=historico, limites_geograficos=limites, features=features)
+
+        esperado = completa.loc[completa['Data'] >= corte].reset_index(drop=True)
+        pd.testing.assert_frame_equal(incremental.reset_index(drop=True), esperado)
+
+    def test_estado_antigo_recebe_colunas_novas(self):
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                f"CREATE TABLE {TABELA_ESTADO} "
+                "(Municipio TEXT, Data DATE, DiaSemChuva FLOAT, Precipitacao FLOAT, RiscoFogo FLOAT)"
+            ))
+
+        create_table_estado(self.engine)
+
+        historico, _ = carregar_estado(self.engine)
+        self.assertIn('FRP', historico.columns)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+"""
+Grid aggregation helpers (``source.grade``): cell ids at the grid edges, the predominant
+municipality of each (Data, Celula) and the ``celulas_municipio`` lookup table.
+"""
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from source.carregar_dados import agregar_por_dia_celula
+from source.grade import (
+    GRADE_LATITUDE,
+    GRADE_LONGITUDE,
+    celulas,
+    centros_celulas,
+    dimensoes_grade,
+    municipio_predominante,
+    tabela_celula_municipio,
+)
+
+
+class TestCelulas(unittest.TestCase):
+    def test_bordas_da_grade(self):
+        tamanho = 0.5
+        linhas, colunas = dimensoes_grade(tamanho)
+        self.assertEqual((linhas, colunas), (80, 80))
+
+        lat_min, lat_max = GRADE_LATITUDE
+        lon_min, lon_max = GRADE_LONGITUDE
+        quase = 1e-9
+
+        casos = [
+            # Cantos de dentro: o limite inferior é incluído.
+            (lat_min, lon_min, 0),
+            (lat_min, lon_max - quase, colunas - 1),
+            (lat_max - quase, lon_min, (linhas - 1) * colunas),
+            (lat_max - quase, lon_max - quase, linhas * colunas - 1),
+            # Na linha entre duas células a coordenada vai para a célula de cima/da direita.
+            (lat_min + tamanho, lon_min + tamanho, colunas + 1),
+            # O limite superior e tudo fora do retângulo ficam com -1.
+            (lat_max, lon_min, -1),
+            (lat_min, lon_max, -1),
+            (lat_min - quase, lon_min, -1),
+            (lat_min, lon_min - quase, -1),
+            (-90.0, 0.0, -1),
+            # Coordenadas nulas também.
+            (np.nan, -50.0, -1),
+            (-5.0, np.nan, -1),
+            (np.nan, np.nan, -1),
+        ]
+
+        latitudes, longitudes, esperados = map(np.array, zip(*casos))
+        codigos = celulas(latitudes, longitudes, tamanho)
+
+        self.assertEqual(codigos.dtype, np.int64)
+        np.testing.assert_array_equal(codigos, esperados)
+
+    def test_centro_volta_para_a_mesma_celula(self):
+        for tamanho in [0.1, 0.3, 1.0]:
+            with self.subTest(tamanho=tamanho):
+                linhas, colunas = dimensoes_grade(tamanho)
+                codigos = np.array([0, colunas - 1, colunas, linhas * colunas // 2, linhas * colunas - 1])
+
+                latitude, longitude = centros_celulas(codigos, tamanho)
+                np.testing.assert_array_equal(celulas(latitude, longitude, tamanho), codigos)
+
+    def test_tamanho_invalido(self):
+        for tamanho in [0.0, -0.1, 1e-4]:
+            with self.subTest(tamanho=tamanho), self.assertRaises(ValueError):
+                dimensoes_grade(tamanho)
+
+
+class TestMunicipioPredominante(unittest.TestCase):
+    def test_mais_focos_e_desempate_alfabetico(self):
+        focos = pd.DataFrame({
+            'Data': pd.to_datetime(['2024-08-01'] * 7 + ['2024-08-02'] * 5).date,
+            'Celula': [10, 10, 10, 10, 10, 11, 11, 10, 10, 10, 10, 10],
+            'Municipio': [
+                # 2024-08-01, célula 10: BELTERRA 3 focos, ALTAMIRA 2. Célula 11: empate.
+                'BELTERRA', 'ALTAMIRA', 'BELTERRA', 'ALTAMIRA', 'BELTERRA', 'PORTEL', 'ANAPU',
+                # 2024-08-02, célula 10: empate entre ITAITUBA e BELTERRA, e um foco sem município.
+                'ITAITUBA', 'BELTERRA', 'ITAITUBA', 'BELTERRA', None,
+            ],
+        })
+
+        resultado = municipio_predominante(focos).sort_values(['Data', 'Celula'], ignore_index=True)
+
+        self.assertEqual(
+            list(resultado.itertuples(index=False, name=None)),
+            [
+                (pd.Timestamp('2024-08-01').date(), 10, 'BELTERRA'),
+                (pd.Timestamp('2024-08-01').date(), 11, 'ANAPU'),
+                (pd.Timestamp('2024-08-02').date(), 10, 'BELTERRA'),
+            ],
+        )
+
+    def test_municipio_categorico(self):
+        focos = pd.DataFrame({
+            'Data': pd.to_datetime(['2024-08-01'] * 4),
+            'Celula': [5, 5, 5, 5],
+            # As categorias fora da ordem alfabética não mudam o desempate.
+            'Municipio': pd.Categorical(['PORTEL', 'ANAPU', 'PORTEL', 'ANAPU'], categories=['PORTEL', 'ANAPU']),
+        })
+
+        self.assertEqual(municipio_predominante(focos)['Municipio'].tolist(), ['ANAPU'])
+
+
+class TestCelulasMunicipio(unittest.TestCase):
+    def test_tabela_de_consulta(self):
+        tamanho = 1.0
+        # Dois municípios dividem a célula de (-5.5, -50.5) e um fica sozinho na de (-3.5, -60.5).
+        focos = pd.DataFrame({
+            'Data': pd.to_datetime(
+                ['2024-08-01'] * 3 + ['2024-08-02'] * 2 + ['2024-08-03'] * 2 + ['2024-08-01']
+            ).date,
+            'Municipio': ['ALTAMIRA', 'ALTAMIRA', 'ANAPU', 'ANAPU', 'ANAPU', 'ALTAMIRA', 'ANAPU', 'ITAITUBA'],
+            'FRP': 10.0,
+            'RiscoFogo': 0.5,
+            'DiaSemChuva': 3,
+            'Precipitacao': 0.0,
+            'Latitude': [-5.2, -5.9, -5.5, -5.1, -5.4, -5.3, -5.6, -3.5],
+            'Longitude': [-50.2, -50.7, -50.5, -50.9, -50.1, -50.5, -50.4, -60.5],
+        })
+
+        agregado = agregar_por_dia_celula(focos, tamanho)
+        tabela = tabela_celula_municipio(agregado, tamanho)
+
+        celula_dividida, celula_itaituba = celulas(np.array([-5.5, -3.5]), np.array([-50.5, -60.5]), tamanho)
+        esperado = pd.DataFrame({
+            'Celula': np.array([celula_itaituba, celula_dividida, celula_dividida], dtype=np.int64),
+            'Municipio': ['ITAITUBA', 'ALTAMIRA', 'ANAPU'],
+            # ALTAMIRA vence em 01/08 e no empate de 03/08, ANAPU em 02/08.
+            'Dias': [1, 2, 1],
+            'Latitude_centro': [-3.5, -5.5, -5.5],
+            'Longitude_centro': [-60.5, -50.5, -50.5],
+        }).sort_values(['Celula', 'Municipio'], ignore_index=True)
+
+        pd.testing.assert_frame_equal(tabela, esperado, check_dtype=False)
+        self.assertEqual(tabela['Celula'].dtype, np.int64)
+
+
+if __name__ == "__main__":
+    unittest.main()
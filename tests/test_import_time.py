@@ -0,0 +1,105 @@
+"""
+Import budget of the ``source`` package.
+
+Each check runs in a fresh interpreter, so modules cached by the test runner do not hide
+import costs. The budgets are generous (several times the measured value) so that the tests
+only fail when an import regains a side effect or starts pulling a heavy dependency.
+"""
+import os
+import subprocess
+import sys
+import textwrap
+import unittest
+from pathlib import Path
+
+
+RAIZ = Path(__file__).resolve().parents[1]
+
+# Segundos (tempo cumulativo do -X importtime, sem a inicialização do interpretador).
+ORCAMENTO_CORE = 0.75
+ORCAMENTO_CARREGAR_DADOS = 2.0
+
+
+def _executar(codigo: str, *args: str, **env: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args, "-c", textwrap.dedent(codigo)],
+        cwd=RAIZ,
+        env={**os.environ, "PYTHONPATH": str(RAIZ), **env},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def _tempo_import(modulo: str, repeticoes: int = 3) -> float:
+    """Menor tempo cumulativo (em segundos) de ``import modulo`` entre ``repeticoes`` execuções."""
+    melhor = float("inf")
+
+    for _ in range(repeticoes):
+        resultado = _executar(f"import {modulo}", "-X", "importtime")
+        for linha in resultado.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            partes = [parte.strip() for parte in linha.removeprefix("import time:").split("|")]
+            if len(partes) == 3 and partes[2] == modulo:
+                melhor = min(melhor, int(partes[1]) / 1e6)
+
+    return melhor
+
+
+class TestImportSemEfeitos(unittest.TestCase):
+
+    def test_import_nao_escreve_nada(self):
+        resultado = _executar("""
+            import source.core.settings
+            import source.core.database
+            import source.resources.logging
+            import source.carregar_dados
+        """)
+
+        self.assertEqual(resultado.stdout, "")
+        self.assertEqual(resultado.stderr, "")
+
+    def test_import_nao_cria_engine_nem_handlers(self):
+        resultado = _executar("""
+            import sys
+            import source.carregar_dados
+            from source.core import database
+            from source.resources.logging import get_logger
+
+            assert database._sync_engine is None
+            assert database._async_engine is None
+            assert [type(h).__name__ for h in get_logger().handlers] == ["_LazyInitHandler"]
+            assert "sklearn" not in sys.modules
+            assert "sqlalchemy.ext.asyncio" not in sys.modules
+            print("ok")
+        """)
+
+        self.assertEqual(resultado.stdout.strip(), "ok")
+
+    def test_engine_sincrona_unica_por_processo(self):
+        resultado = _executar("""
+            from source.core.database import get_sync_engine
+
+            assert get_sync_engine() is get_sync_engine()
+            print("ok")
+        """, ENVIRONMENT="TEST")
+
+        self.assertEqual(resultado.stdout.strip(), "ok")
+
+
+class TestOrcamentoImport(unittest.TestCase):
+
+    def test_import_source(self):
+        self.assertLess(_tempo_import("source"), 0.05)
+
+    def test_import_core(self):
+        for modulo in ("source.core.settings", "source.core.database", "source.resources.logging"):
+            with self.subTest(modulo=modulo):
+                self.assertLess(_tempo_import(modulo), ORCAMENTO_CORE)
+
+    def test_import_carregar_dados(self):
+        self.assertLess(_tempo_import("source.carregar_dados"), ORCAMENTO_CARREGAR_DADOS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+"""
+Streaming ingestion (``INGESTAO_STREAMING``) against reading the whole CSV.
+
+The same CSV goes through ``processar_arquivo`` with the chunk size patched to a few small values,
+so days and (Data, Municipio) groups cross chunk boundaries. The aggregated result must be exactly
+the one of the in-memory read, and an unsorted CSV must be rejected.
+"""
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from source.carregar_dados import processar_arquivo
+from source.core.settings import Settings
+
+
+def _csv_focos(linhas: int = 3000, dias: int = 12, seed: int = 11) -> pd.DataFrame:
+    """Focos ordenados por ´DataHora´, com -999 para a imputação e focos fora da Amazônia."""
+    rng = np.random.default_rng(seed)
+    municipios = np.array([f'MUNICIPIO {i}' for i in range(15)])
+    indice = rng.integers(0, len(municipios), linhas)
+    base_lat, base_lon = rng.uniform(-10.0, -2.0, len(municipios)), rng.uniform(-65.0, -50.0, len(municipios))
+
+    data_hora = (
+        pd.Timestamp('2024-08-01')
+        + pd.to_timedelta(rng.integers(0, dias, linhas), unit='D')
+        + pd.to_timedelta(rng.integers(0, 86400, linhas), unit='s')
+    )
+
+    df = pd.DataFrame({
+        'DataHora': data_hora.strftime('%Y/%m/%d %H:%M:%S'),
+        'Satelite': rng.choice(['AQUA_M-T', 'NPP-375', 'GOES-16'], linhas),
+        'Pais': np.where(rng.random(linhas) < 0.97, 'Brasil', 'Bolivia'),
+        'Estado': 'PARÁ',
+        'Municipio': municipios[indice],
+        'Bioma': np.where(rng.random(linhas) < 0.9, 'Amazônia', 'Cerrado'),
+        'DiaSemChuva': rng.integers(0, 60, linhas).astype(float),
+        'Precipitacao': rng.gamma(1.0, 3.0, linhas).round(1),
+        'RiscoFogo': rng.random(linhas).round(2),
+        'FRP': rng.gamma(1.0, 50.0, linhas).round(1),
+        'Latitude': base_lat[indice] + rng.normal(0.0, 0.03, linhas),
+        'Longitude': base_lon[indice] + rng.normal(0.0, 0.03, linhas),
+    })
+
+    for campo in ['DiaSemChuva', 'Precipitacao', 'RiscoFogo', 'FRP']:
+        df.loc[rng.random(linhas) < 0.05, campo] = -999
+
+    return df.sort_values('DataHora', ignore_index=True)
+
+
+class TestLeituraEmBlocos(unittest.TestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.pasta = Path(pasta.name)
+
+    def _salvar(self, df: pd.DataFrame) -> Path:
+        caminho = self.pasta / 'focos.csv'
+        df.to_csv(caminho, index=False)
+        return caminho
+
+    def _processar(self, caminho: Path, linhas_por_bloco: int | None = None) -> pd.DataFrame:
+        settings = Settings(INGESTAO_STREAMING=linhas_por_bloco is not None)
+
+        if linhas_por_bloco is None:
+            return processar_arquivo(caminho, settings)
+
+        with mock.patch('source.carregar_dados.estimar_linhas_por_bloco', return_value=linhas_por_bloco):
+            return processar_arquivo(caminho, settings)
+
+    def test_streaming_igual_a_leitura_completa(self):
+        df = _csv_focos()
+        caminho = self._salvar(df)
+        esperado = self._processar(caminho)
+
+        # Com 250 linhas por dia, um dia sempre atravessa o limite de algum bloco de 37 ou 101 linhas.
+        # O bloco de 400 linhas é maior que um dia e o de 1000 tem vários dias.
+        datas = pd.to_datetime(df['DataHora']).dt.date
+        for linhas_por_bloco in [37, 101, 400, 1000]:
+            with self.subTest(linhas_por_bloco=linhas_por_bloco):
+                limites = datas.iloc[linhas_por_bloco::linhas_por_bloco].to_numpy()
+                anteriores = datas.iloc[linhas_por_bloco - 1:-1:linhas_por_bloco].to_numpy()
+                self.assertTrue((limites == anteriores[:len(limites)]).any())
+
+                streaming = self._processar(caminho, linhas_por_bloco)
+                pd.testing.assert_frame_equal(streaming, esperado, check_exact=True)
+
+    def test_arquivo_fora_de_ordem(self):
+        df = _csv_focos(linhas=600, dias=6)
+        # Um foco do primeiro dia no final do arquivo, depois desse dia já ter sido agregado.
+        df = pd.concat([df, df.iloc[[0]]], ignore_index=True)
+        caminho = self._salvar(df)
+
+        with self.assertRaisesRegex(ValueError, 'não está ordenado'):
+            self._processar(caminho, linhas_por_bloco=50)
+
+
+if __name__ == "__main__":
+    unittest.main()
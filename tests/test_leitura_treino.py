@@ -0,0 +1,94 @@
+"""
+Training batches read from ``dados_csv`` (``ler_lotes_treino``) on SQLite, against ``ler_dados``.
+"""
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import create_engine
+
+from source.leitura_treino import COLUNA_TARGET, COLUNAS_FEATURES, _converter_linhas, ler_lotes_treino
+from source.tabela_dados import create_table_dados, gravar_dados, ler_dados
+from tests.test_tabela_dados import _linhas
+
+
+class TestLeituraTreino(unittest.TestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.engine = create_engine(f"sqlite:///{Path(pasta.name) / 'dados.db'}")
+        self.addCleanup(self.engine.dispose)
+
+        df = _linhas('2024-07-01', '2024-08-09', ['MUNICIPIO A', 'MUNICIPIO B', 'MUNICIPIO C'])
+        df[COLUNA_TARGET] = df[COLUNA_TARGET] % 3
+        # Features nulas (NULL no banco) em algumas linhas e linhas sem target, que ficam fora dos lotes.
+        df.loc[df.index % 11 == 0, 'Precipitacao'] = np.nan
+        df.loc[df.index % 17 == 0, 'DiaSemChuva'] = None
+        df[COLUNA_TARGET] = df[COLUNA_TARGET].astype('Int8')
+        df.loc[df.index % 13 == 0, COLUNA_TARGET] = None
+
+        create_table_dados(self.engine)
+        with self.engine.begin() as conn:
+            gravar_dados(conn, df)
+
+        self.dados = ler_dados(self.engine).dropna(subset=[COLUNA_TARGET]).reset_index(drop=True)
+        self.assertLess(len(self.dados), len(df))
+
+    def _esperado(self, colunas, dados=None) -> tuple[np.ndarray, np.ndarray]:
+        dados = self.dados if dados is None else dados
+        X = dados[list(colunas)].astype('float64').to_numpy(dtype=np.float32)
+        return X, dados[COLUNA_TARGET].to_numpy(dtype=np.int8)
+
+    def test_lotes_iguais_ao_ler_dados(self):
+        for colunas in [None, ['RiscoFogo', 'Ano', 'DiaSemChuva', 'Precipitacao']]:
+            for linhas_por_lote in [1, 7, 64, 10_000]:
+                with self.subTest(colunas=colunas, linhas_por_lote=linhas_por_lote):
+                    lotes = list(ler_lotes_treino(self.engine, colunas=colunas, linhas_por_lote=linhas_por_lote))
+
+                    # Cada lote tem no máximo ´linhas_por_lote´ linhas (menos as sem target).
+                    self.assertTrue(all(0 < len(lote.y) <= linhas_por_lote for lote in lotes))
+
+                    for lote in lotes:
+                        self.assertEqual(lote.X.dtype, np.float32)
+                        self.assertEqual(lote.y.dtype, np.int8)
+                        self.assertTrue(lote.X.flags.c_contiguous)
+                        self.assertEqual(lote.colunas, COLUNAS_FEATURES if colunas is None else tuple(colunas))
+
+                    X, y = self._esperado(lotes[0].colunas)
+                    self.assertTrue(np.isnan(X).any())
+                    np.testing.assert_array_equal(np.concatenate([lote.X for lote in lotes]), X)
+                    np.testing.assert_array_equal(np.concatenate([lote.y for lote in lotes]), y)
+
+    def test_filtro_de_periodo_e_municipio(self):
+        colunas = ['RiscoFogo', 'Precipitacao']
+        lotes = list(ler_lotes_treino(
+            self.engine, colunas=colunas, inicio='2024-07-10', fim='2024-07-20',
+            municipios=['MUNICIPIO B'], linhas_por_lote=4,
+        ))
+
+        dados = ler_dados(
+            self.engine, inicio='2024-07-10', fim='2024-07-20', municipios=['MUNICIPIO B'],
+        ).dropna(subset=[COLUNA_TARGET])
+        X, y = self._esperado(colunas, dados)
+
+        np.testing.assert_array_equal(np.concatenate([lote.X for lote in lotes]), X)
+        np.testing.assert_array_equal(np.concatenate([lote.y for lote in lotes]), y)
+
+    def test_colunas_invalidas(self):
+        for colunas in [['Municipio'], [COLUNA_TARGET], []]:
+            with self.subTest(colunas=colunas), self.assertRaises(ValueError):
+                next(ler_lotes_treino(self.engine, colunas=colunas))
+
+    def test_converter_linhas_com_nulos(self):
+        linhas = [(1, 2.5), (3, 4.0)]
+        np.testing.assert_array_equal(_converter_linhas(linhas, 2), np.array([[1, 2.5], [3, 4.0]], dtype=np.float32))
+
+        # O ´np.fromiter´ não aceita None: as linhas passam pelo ´np.array´, que troca o nulo por NaN.
+        convertidas = _converter_linhas([(1, None), (None, 4.0)], 2)
+        self.assertEqual(convertidas.dtype, np.float32)
+        np.testing.assert_array_equal(convertidas, np.array([[1, np.nan], [np.nan, 4.0]], dtype=np.float32))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+"""
+``dados_csv`` on SQLite: upsert by (Municipio, Ano, DiaAno), migration of a keyless legacy table
+and date range queries (``consulta_dados``/``ler_dados``) that cross a year boundary.
+"""
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, inspect, text
+
+from source.tabela_dados import (
+    CHAVE_DADOS,
+    COLUNAS_DADOS,
+    TABELA_DADOS,
+    create_table_dados,
+    gravar_dados,
+    ler_dados,
+)
+
+
+def _linhas(inicio: str, fim: str, municipios: list[str], seed: int = 5) -> pd.DataFrame:
+    """Uma linha por município e dia, com todas as colunas da ´dados_csv´."""
+    rng = np.random.default_rng(seed)
+    datas = pd.date_range(inicio, fim)
+
+    df = pd.DataFrame({
+        'Data': np.tile(datas, len(municipios)),
+        'Municipio': np.repeat(municipios, len(datas)),
+    })
+    df['Ano'] = df['Data'].dt.year
+    df['Mes'] = df['Data'].dt.month
+    df['Dia'] = df['Data'].dt.day
+    df['DiaAno'] = df['Data'].dt.dayofyear
+
+    for coluna, (tipo, _) in COLUNAS_DADOS.items():
+        if coluna not in df.columns:
+            df[coluna] = rng.random(len(df)) if tipo == 'FLOAT' else rng.integers(0, 5, len(df))
+    df['Arquivo'] = 'focos.csv'
+
+    return df.drop(columns='Data')
+
+
+class TestTabelaDados(unittest.TestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.engine = create_engine(f"sqlite:///{Path(pasta.name) / 'dados.db'}")
+        self.addCleanup(self.engine.dispose)
+
+    def _contar(self, tabela: str = TABELA_DADOS) -> int:
+        with self.engine.connect() as conn:
+            return conn.execute(text(f"SELECT COUNT(*) FROM {tabela}")).scalar_one()
+
+    def test_recarga_do_mesmo_dia_substitui_a_linha(self):
+        create_table_dados(self.engine)
+        df = _linhas('2024-08-01', '2024-08-10', ['MUNICIPIO A', 'MUNICIPIO B'])
+
+        with self.engine.begin() as conn:
+            gravar_dados(conn, df)
+
+        recarga = df.loc[df['DiaAno'] == df['DiaAno'].min()].assign(RiscoFogo=9.5, Arquivo='focos_novo.csv')
+        with self.engine.begin() as conn:
+            gravar_dados(conn, recarga)
+
+        self.assertEqual(self._contar(), len(df))
+
+        lido = ler_dados(self.engine, inicio='2024-08-01', fim='2024-08-01')
+        self.assertEqual(len(lido), 2)
+        self.assertEqual(lido['RiscoFogo'].tolist(), [9.5, 9.5])
+        self.assertEqual(lido['Arquivo'].tolist(), ['focos_novo.csv', 'focos_novo.csv'])
+
+    def test_tabela_legada_sem_chave_e_migrada(self):
+        df = _linhas('2024-08-01', '2024-08-05', ['MUNICIPIO A', 'MUNICIPIO B'])
+        # Linhas repetidas do mesmo município e dia, e uma linha sem município.
+        legado = pd.concat([df, df.iloc[:3].assign(RiscoFogo=-1.0), df.iloc[[0]].assign(Municipio=None)])
+        legado.to_sql(TABELA_DADOS, self.engine, index=False)
+
+        create_table_dados(self.engine)
+
+        inspetor = inspect(self.engine)
+        self.assertEqual(inspetor.get_pk_constraint(TABELA_DADOS)['constrained_columns'], list(CHAVE_DADOS))
+        self.assertFalse(inspetor.has_table(f'{TABELA_DADOS}_legado'))
+        self.assertEqual(self._contar(), len(df))
+
+        lido = ler_dados(self.engine)
+        self.assertFalse(lido.duplicated(list(CHAVE_DADOS)).any())
+        self.assertEqual(lido['Municipio'].isna().sum(), 0)
+
+    def test_tabela_de_focos_brutos_nao_e_migrada(self):
+        pd.DataFrame({'DataHora': ['2024/08/01 10:00:00'], 'Municipio': ['MUNICIPIO A']}).to_sql(
+            TABELA_DADOS, self.engine, index=False,
+        )
+
+        with self.assertRaisesRegex(ValueError, 'não é uma tabela de features'):
+            create_table_dados(self.engine)
+
+    def test_periodos_na_virada_do_ano(self):
+        create_table_dados(self.engine)
+        municipios = ['MUNICIPIO A', 'MUNICIPIO B', 'MUNICIPIO C']
+        df = _linhas('2023-12-01', '2025-01-31', municipios)
+
+        with self.engine.begin() as conn:
+            gravar_dados(conn, df)
+
+        datas = pd.to_datetime(dict(year=df['Ano'], month=df['Mes'], day=df['Dia']))
+        periodos = [
+            ('2023-12-28', '2024-01-03', None),
+            ('2024-12-30', '2025-01-02', None),
+            ('2024-12-31', '2024-12-31', None),
+            ('2023-12-31', '2025-01-01', ['MUNICIPIO B']),
+            ('2023-12-15', '2024-02-29', ['MUNICIPIO A', 'MUNICIPIO C']),
+            ('2025-01-15', None, None),
+            (None, '2023-12-03', None),
+            ('2024-01-05', '2024-01-04', None),
+        ]
+
+        for inicio, fim, filtro in periodos:
+            with self.subTest(inicio=inicio, fim=fim, municipios=filtro):
+                esperado = pd.Series(True, index=df.index)
+                if inicio is not None:
+                    esperado &= datas >= pd.Timestamp(inicio)
+                if fim is not None:
+                    esperado &= datas <= pd.Timestamp(fim)
+                if filtro is not None:
+                    esperado &= df['Municipio'].isin(filtro)
+
+                lido = ler_dados(self.engine, inicio=inicio, fim=fim, municipios=filtro)
+
+                chaves = df.loc[esperado, ['Ano', 'DiaAno', 'Municipio']].sort_values(['Ano', 'DiaAno', 'Municipio'])
+                self.assertEqual(
+                    list(lido[['Ano', 'DiaAno', 'Municipio']].itertuples(index=False, name=None)),
+                    [(int(a), int(d), m) for a, d, m in chaves.itertuples(index=False, name=None)],
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()